@@ -6,9 +6,13 @@ from .expr.simplify import distribute_mult
 from .expr.compression import apply_compression, invert_compression
 from .model import MixedSignalModel
 from .generator.verilog import VerilogGenerator
+from .generator.python import PythonGenerator
+from .generator.c import CGenerator
 from .eqn.deriv import Deriv
 from .eqn.cases import eqn_case
 from .expr.expr import (to_real, to_sint, to_uint, min_op, max_op, sum_op,
                         clamp_op, compress_uint, mt19937, lcg_op)
 from .expr.table import Table, RealTable, SIntTable, UIntTable
-from .function import Function, MultiFunction
\ No newline at end of file
+from .function import Function, MultiFunction
+from .sim.simulator import Simulator, split_chunks
+from .sweep import sweep_models
\ No newline at end of file
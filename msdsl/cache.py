@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from numbers import Number
+from zipfile import BadZipFile
+
+import numpy as np
+
+# incremented whenever the way in which results are stored changes, so that old cache entries are not used
+CACHE_VERSION = 1
+
+# default limit on the total size of the files in a cache directory (bytes)
+DEFAULT_MAX_SIZE = 256*(1<<20)
+
+class ArrayCache:
+    """
+    Content-addressed cache for the results of numerical functions, such as the discretization of linear dynamical
+    systems, that is kept on disk so that it persists between runs.  Each result is stored in its own .npz file, named
+    by a hash of the function name and arguments.  When the total size of the files exceeds max_size, the files that
+    were least recently used are removed.
+
+    :param directory:   Directory where the cache files are kept (created if needed).
+    :param max_size:    Maximum total size of the cache files, in bytes.
+    """
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        # save settings
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def call(self, func, *args, **kwargs):
+        """
+        Returns func(*args, **kwargs), using the cached result if there is one.  The arguments may be numbers, strings,
+        None, numpy arrays, and lists or tuples of these, and the same goes for the result (see pack_value).
+        """
+        key = hash_call(func, args, kwargs)
+        result = self.load(key)
+        if result is None:
+            result = func(*args, **kwargs)
+            self.save(key, result)
+        else:
+            result = result[0]
+        return result
+
+    def path(self, key):
+        return self.directory / f'{key}.npz'
+
+    def load(self, key):
+        # returns a tuple containing the cached value, or None if there is no cached value
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                value = unpack_value(json.loads(str(data['structure'])), data)
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError, BadZipFile):
+            # the file is not valid (e.g., it was only partially written), so it is removed
+            remove_file(path)
+            return None
+
+        # update the access time for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return (value,)
+
+    def save(self, key, value):
+        # pack the value into arrays
+        arrays = {}
+        structure = pack_value(value, arrays)
+
+        # write to a temporary file, then rename it, so that other processes never see a partially written file
+        self.directory.mkdir(exist_ok=True, parents=True)
+        path = self.path(key)
+        tmp_path = path.with_name(f'{key}.{os.getpid()}.tmp.npz')
+        np.savez(tmp_path, structure=np.array(json.dumps(structure)), **arrays)
+        os.replace(tmp_path, path)
+
+        # remove old files if needed
+        self.evict()
+
+    def evict(self):
+        # remove the least recently used files until the total size is within the limit
+        entries = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_size:
+                break
+            remove_file(path)
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob('*.npz'):
+            remove_file(path)
+
+def cached_call(cache, func, *args, **kwargs):
+    """
+    Returns func(*args, **kwargs), using the given ArrayCache if it is not None.
+    """
+    if cache is None:
+        return func(*args, **kwargs)
+    else:
+        return cache.call(func, *args, **kwargs)
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def hash_call(func, args, kwargs):
+    # hash of a function call, which is used as the name of the cache file
+    h = hashlib.sha256()
+    h.update(f'{CACHE_VERSION}:{func.__module__}.{func.__qualname__}'.encode('utf-8'))
+    hash_value(h, list(args))
+    hash_value(h, sorted(kwargs.items()))
+    return h.hexdigest()
+
+def hash_value(h, value):
+    if value is None:
+        h.update(b'N')
+    elif isinstance(value, (str, bool)):
+        h.update(f'{type(value).__name__}:{value!r};'.encode('utf-8'))
+    elif isinstance(value, Number):
+        # numbers are converted to float so that, e.g., 1 and 1.0 give the same result
+        h.update(f'F:{float(value)!r};'.encode('utf-8'))
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(f'A:{value.dtype.str}:{value.shape};'.encode('utf-8'))
+        h.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'L:{len(value)}['.encode('utf-8'))
+        for elem in value:
+            hash_value(h, elem)
+        h.update(b']')
+    else:
+        raise Exception(f'Cannot hash value of type {type(value).__name__} for the cache.')
+
+def pack_value(value, arrays):
+    """
+    Converts a value into a JSON-compatible structure, adding the arrays that it contains to the given dictionary.
+
+    :param value:   None, a number, a numpy array, or a list or tuple of these (which may be nested).
+    :param arrays:  Dictionary to which arrays are added.  Their names are referred to by the structure.
+    """
+    if value is None:
+        return ['none']
+    elif isinstance(value, (list, tuple)):
+        return [type(value).__name__, [pack_value(elem, arrays) for elem in value]]
+    elif isinstance(value, (Number, np.ndarray)):
+        name = f'arr_{len(arrays)}'
+        arrays[name] = np.asarray(value)
+        return ['array' if isinstance(value, np.ndarray) else 'scalar', name]
+    else:
+        raise Exception(f'Cannot store value of type {type(value).__name__} in the cache.')
+
+def unpack_value(structure, arrays):
+    # inverse of pack_value
+    kind = structure[0]
+    if kind == 'none':
+        return None
+    elif kind == 'list':
+        return [unpack_value(elem, arrays) for elem in structure[1]]
+    elif kind == 'tuple':
+        return tuple(unpack_value(elem, arrays) for elem in structure[1])
+    elif kind == 'array':
+        return arrays[structure[1]]
+    elif kind == 'scalar':
+        return arrays[structure[1]].item()
+    else:
+        raise ValueError(f'Unknown cache entry type: {kind}')
+
+def main():
+    from tempfile import TemporaryDirectory
+    from scipy.linalg import expm
+
+    with TemporaryDirectory() as directory:
+        cache = ArrayCache(directory)
+        A = np.array([[-1.0, 0.5], [0.0, -2.0]])
+        print(cache.call(expm, A))
+        print(cache.call(expm, A))
+        print(list(Path(directory).glob('*.npz')))
+
+if __name__ == '__main__':
+    main()
@@ -5,25 +5,33 @@ from msdsl.expr.format import RealFormat, UIntFormat
 from msdsl.expr.expr import wrap_constants, promote_operands, EqualTo, Sum, Product, prod_op, sum_op, ModelExpr
 from msdsl.expr.signals import DigitalSignal, Signal
 from msdsl.expr.svreal import UndefinedRange
+from msdsl.expr.traverse import transform_expr
 
 def subst_case(expr, sel_bit_settings):
-    if isinstance(expr, EqnCase):
-        # select the appropriate case
-        case = expr.get_case(sel_bit_settings)
-
-        # apply case substitution again (allows for nested cases)
-        case = subst_case(case, sel_bit_settings)
-
-        # return result
-        return case
-    elif isinstance(expr, EqualTo):
-        return EqualTo(subst_case(expr.lhs, sel_bit_settings), subst_case(expr.rhs, sel_bit_settings))
-    elif isinstance(expr, Sum):
-        return sum_op(subst_case(operand, sel_bit_settings) for operand in expr.operands)
-    elif isinstance(expr, Product):
-        return prod_op(subst_case(operand, sel_bit_settings) for operand in expr.operands)
-    else:
-        return expr
+    def children(node):
+        if isinstance(node, EqnCase):
+            # select the appropriate case; it is visited in turn, which allows for nested cases
+            return [node.get_case(sel_bit_settings)]
+        elif isinstance(node, EqualTo):
+            return [node.lhs, node.rhs]
+        elif isinstance(node, (Sum, Product)):
+            return node.operands
+        else:
+            return []
+
+    def combine(node, operands):
+        if isinstance(node, EqnCase):
+            return operands[0]
+        elif isinstance(node, EqualTo):
+            return EqualTo(*operands)
+        elif isinstance(node, Sum):
+            return sum_op(operands)
+        elif isinstance(node, Product):
+            return prod_op(operands)
+        else:
+            return node
+
+    return transform_expr(expr, children, combine)
 
 def address_to_settings(address, sel_bits):
     # sanity checks
@@ -65,6 +73,8 @@ def eqn_case(cases, sel_bits: List[DigitalSignal]):
         return EqnCase(cases=cases, sel_bits=sel_bits)
 
 class EqnCase(ModelExpr):
+    __slots__ = ('cases', 'sel_bits')
+
     def __init__(self, cases, sel_bits):
         # save settings
         self.cases = cases
@@ -1,8 +1,13 @@
+import os
 from typing import List
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
 
 from msdsl.expr.signals import AnalogSignal, Signal
-from msdsl.expr.simplify import distribute_mult, extract_coeffs
+from msdsl.expr.simplify import linear_coeffs
 from msdsl.util import list2dict
 from msdsl.eqn.deriv import deriv_str, Deriv
 from msdsl.expr.analyze import signal_names
@@ -10,6 +15,10 @@ from msdsl.eqn.lds import LDS
 from msdsl.eqn.eqn_list import EqnList
 from msdsl.eqn.cases import subst_case
 
+# minimum number of systems for which lds_from_systems uses a process pool by default, since starting the processes
+# takes longer than solving a few small systems
+PARALLEL_MIN_SYSTEMS = 64
+
 class EqnSys(EqnList):
     def subst_case(self, sel_bit_settings):
         return EqnSys([subst_case(expr=eqn, sel_bit_settings=sel_bit_settings) for eqn in self])
@@ -20,6 +29,24 @@ class EqnSys(EqnList):
         states = states if states is not None else []
         outputs = outputs if outputs is not None else []
 
+        # build the matrices describing the system of equations, then solve for the LDS
+        U, V, unknowns, knowns = self.to_matrices(inputs=inputs, states=states, outputs=outputs)
+        return lds_from_matrices(U=U, V=V, unknowns=unknowns, knowns=knowns, inputs=signal_names(inputs),
+                                 states=signal_names(states), outputs=signal_names(outputs))
+
+    def to_matrices(self, inputs: List[Signal]=None, states: List[Signal]=None, outputs: List[Signal]=None):
+        """
+        Writes the system of equations as U*x = V*y, where x contains the unknown variables (internal signals,
+        outputs, and derivatives of states) and y contains the known variables (inputs and states).
+
+        :return:    Tuple (U, V, unknowns, knowns), where U and V are sparse matrices, and unknowns and knowns map
+                    signal names to the corresponding indices in x and y.
+        """
+        # set defaults
+        inputs = inputs if inputs is not None else []
+        states = states if states is not None else []
+        outputs = outputs if outputs is not None else []
+
         # create list of derivatives of state variables
         deriv_dict = {deriv.name: deriv for deriv in self.get_derivs()}
         derivs = list(deriv_dict.values())
@@ -46,75 +73,148 @@ class EqnSys(EqnList):
         internal_name_set = set(signal_names(self.get_all_signals())) - external_names
 
         # indices of known and unknown variables
-        unknowns = list2dict(list(internal_name_set) + signal_names(outputs) + signal_names(derivs))
+        unknowns = list2dict(sorted(internal_name_set) + signal_names(outputs) + signal_names(derivs))
         knowns   = list2dict(signal_names(inputs) + signal_names(states))
 
         # sanity checks
         assert not(len(self) > len(unknowns)), f'System of equations is over-constrained with {len(self)} equations and {len(unknowns)} unknowns.'
         assert not (len(self) < len(unknowns)), f'System of equations is under-constrained with {len(self)} equations and {len(unknowns)} unknowns.'
 
-        # build up matrices
-        U = np.zeros((len(self), len(unknowns)), dtype=float)
-        V = np.zeros((len(self), len(knowns)), dtype=float)
+        # build up matrices in coordinate form, since each equation usually only involves a few signals
+        U_rows, U_cols, U_vals = [], [], []
+        V_rows, V_cols, V_vals = [], [], []
 
         for row, eqn in enumerate(self):
-            # prepare equation for analysis
-            eqn = eqn.lhs - eqn.rhs
-            eqn = distribute_mult(eqn)
-
-            # extract coefficients of signals (note that some signals may be repeated - we deal with this in the next step
-            coeffs, others = extract_coeffs(eqn)
+            # extract the coefficients of signals in lhs - rhs, walking through the equation once
+            coeffs, others = linear_coeffs([(+1, eqn.lhs), (-1, eqn.rhs)])
             assert len(others) == 0, \
-                'The following terms are not yet handled: ['+ ', '.join(str(other) for other in others)+']'
-
-            # sum up all of the coefficients for each signal
-            for coeff, signal in coeffs:
-                if signal.name in unknowns:
-                    U[row, unknowns[signal.name]] += +coeff
-                elif signal.name in knowns:
-                    V[row,   knowns[signal.name]] += -coeff
+                'The following terms are not yet handled: ['+ ', '.join(str(other) for _, other in others)+']'
+
+            # record the coefficients
+            for name, coeff in coeffs.items():
+                if name in unknowns:
+                    U_rows.append(row)
+                    U_cols.append(unknowns[name])
+                    U_vals.append(+coeff)
+                elif name in knowns:
+                    V_rows.append(row)
+                    V_cols.append(knowns[name])
+                    V_vals.append(-coeff)
                 else:
-                    raise Exception('Variable is not marked as known vs. unknown: ' + signal.name)
-
-        # solve for unknowns in terms of knowns
-        M = np.linalg.solve(U, V)
-
-        # separate into A, B, C, D matrices
-        if len(states) > 0:
-            A = np.zeros((len(states), len(states)), dtype=float)
-            for row, out_state in enumerate(signal_names(states)):
-                for col, in_state in enumerate(signal_names(states)):
-                    A[row, col] = M[unknowns[deriv_str(out_state)], knowns[in_state]]
-        else:
-            A = None
-
-        if len(states) > 0 and len(inputs) > 0:
-            B = np.zeros((len(states), len(inputs)), dtype=float)
-            for row, out_state in enumerate(signal_names(states)):
-                for col, in_input in enumerate(signal_names(inputs)):
-                    B[row, col] = M[unknowns[deriv_str(out_state)], knowns[in_input]]
-        else:
-            B = None
-
-        if len(outputs) > 0 and len(states) > 0:
-            C = np.zeros((len(outputs), len(states)), dtype=float)
-            for row, out_output in enumerate(signal_names(outputs)):
-                for col, in_state in enumerate(signal_names(states)):
-                    C[row, col] = M[unknowns[out_output], knowns[in_state]]
-        else:
-            C = None
-
-        if len(outputs) > 0 and len(inputs) > 0:
-            D = np.zeros((len(outputs), len(inputs)), dtype=float)
-            for row, out_output in enumerate(signal_names(outputs)):
-                for col, in_input in enumerate(signal_names(inputs)):
-                    D[row, col] = M[unknowns[out_output], knowns[in_input]]
-        else:
-            D = None
-
-        return LDS(A=A, B=B, C=C, D=D)
-
-# additional classes
+                    raise Exception('Variable is not marked as known vs. unknown: ' + name)
+
+        # convert to sparse matrices (duplicate entries are summed).  explicit zeros are removed so that systems with
+        # the same coefficients have the same representation (see system_key).
+        U = coo_matrix((U_vals, (U_rows, U_cols)), shape=(len(self), len(unknowns)), dtype=float).tocsc()
+        V = coo_matrix((V_vals, (V_rows, V_cols)), shape=(len(self), len(knowns)), dtype=float).tocsc()
+        U.eliminate_zeros()
+        V.eliminate_zeros()
+
+        return U, V, unknowns, knowns
+
+# additional functions
+
+def lds_from_matrices(U, V, unknowns, knowns, inputs: List[str], states: List[str], outputs: List[str], dt=None,
+                      cache=None):
+    """
+    Solves a system of equations written as U*x = V*y (see EqnSys.to_matrices) for a linear dynamical system.  This
+    function only depends on the matrices and signal names, so it can be run in another process.
+
+    :param inputs:  Names of the input signals.
+    :param states:  Names of the state signals.
+    :param outputs: Names of the output signals.
+    :param dt:      If given, the LDS is discretized using this timestep.
+    :param cache:   Optional ArrayCache used to store the discretized LDS (see LDS.discretize).
+    """
+    # solve for unknowns in terms of knowns (M = inv(U)*V), but only for the unknowns that are needed: the state
+    # derivatives and the outputs.  the rows of inv(U) for those unknowns are found by solving transpose(U)*X = E,
+    # where the columns of E are unit vectors, reusing the same LU factorization for all of them.
+    needed = [unknowns[deriv_str(state)] for state in states] + \
+             [unknowns[output] for output in outputs]
+    M = {}
+    if len(needed) > 0:
+        E = np.zeros((len(unknowns), len(needed)), dtype=float)
+        E[needed, range(len(needed))] = 1
+        U_inv_rows = np.atleast_2d(splu(U).solve(E, trans='T').T)
+        M_rows = np.atleast_2d((V.T @ U_inv_rows.T).T)
+        M = {idx: M_rows[k, :] for k, idx in enumerate(needed)}
+
+    # separate into A, B, C, D matrices
+    if len(states) > 0:
+        A = np.zeros((len(states), len(states)), dtype=float)
+        for row, out_state in enumerate(states):
+            for col, in_state in enumerate(states):
+                A[row, col] = M[unknowns[deriv_str(out_state)]][knowns[in_state]]
+    else:
+        A = None
+
+    if len(states) > 0 and len(inputs) > 0:
+        B = np.zeros((len(states), len(inputs)), dtype=float)
+        for row, out_state in enumerate(states):
+            for col, in_input in enumerate(inputs):
+                B[row, col] = M[unknowns[deriv_str(out_state)]][knowns[in_input]]
+    else:
+        B = None
+
+    if len(outputs) > 0 and len(states) > 0:
+        C = np.zeros((len(outputs), len(states)), dtype=float)
+        for row, out_output in enumerate(outputs):
+            for col, in_state in enumerate(states):
+                C[row, col] = M[unknowns[out_output]][knowns[in_state]]
+    else:
+        C = None
+
+    if len(outputs) > 0 and len(inputs) > 0:
+        D = np.zeros((len(outputs), len(inputs)), dtype=float)
+        for row, out_output in enumerate(outputs):
+            for col, in_input in enumerate(inputs):
+                D[row, col] = M[unknowns[out_output]][knowns[in_input]]
+    else:
+        D = None
+
+    lds = LDS(A=A, B=B, C=C, D=D)
+
+    # discretize if needed
+    if dt is not None:
+        lds = lds.discretize(dt=dt, cache=cache)
+
+    return lds
+
+def system_key(U, V, unknowns):
+    """
+    Returns a hashable key for a system of equations written as U*x = V*y (see EqnSys.to_matrices).  Systems with the
+    same key have the same solution, so it can be used to avoid solving identical systems more than once.
+    """
+    retval = [tuple(unknowns)]
+    for mat in [U, V]:
+        mat = mat.tocsc()
+        mat.sort_indices()
+        retval.extend([mat.shape, mat.indptr.tobytes(), mat.indices.tobytes(), mat.data.tobytes()])
+    return tuple(retval)
+
+def lds_from_systems(systems, inputs: List[str], states: List[str], outputs: List[str], dt=None, workers=None,
+                     cache=None):
+    """
+    Runs lds_from_matrices for a list of systems, using a pool of processes if there are many systems.
+
+    :param systems: List of (U, V, unknowns, knowns) tuples (see EqnSys.to_matrices).
+    :param workers: Number of processes to use.  If None, the number of CPUs is used when there are at least
+                    PARALLEL_MIN_SYSTEMS systems, and otherwise the systems are solved in this process.
+    :param cache:   Optional ArrayCache used to store the discretized LDS objects (see LDS.discretize).
+    :return:        List of LDS objects, in the same order as the systems.
+    """
+    # set defaults
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(systems) >= PARALLEL_MIN_SYSTEMS else 1
+
+    # process the systems
+    func = partial(lds_from_matrices, inputs=inputs, states=states, outputs=outputs, dt=dt, cache=cache)
+    if workers > 1 and len(systems) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(systems)//(4*workers))
+            return list(executor.map(func, *zip(*systems), chunksize=chunksize))
+    else:
+        return [func(*system) for system in systems]
 
 def main():
     x = AnalogSignal('x')
@@ -2,6 +2,9 @@ from numbers import Number
 
 import numpy as np
 import scipy.linalg
+from math import factorial
+
+from msdsl.cache import cached_call
 
 class LDS:
     def __init__(self, A=None, B=None, C=None, D=None):
@@ -11,34 +14,42 @@ class LDS:
         self.C = C
         self.D = D
 
-    def discretize(self, dt: Number):
-        # discretize A
-        if self.A is not None:
-            A_tilde = scipy.linalg.expm(dt * self.A)
-        else:
-            A_tilde = None
+    def discretize(self, dt: Number, cache=None):
+        """
+        Returns the discretized form of this LDS, using a zero-order hold on the inputs.
 
-        # discretize B
-        if self.A is not None and self.B is not None:
-            I = np.eye(*self.A.shape) # identity matrix with shape of A
-            B_tilde = np.linalg.solve(self.A, (A_tilde - I).dot(self.B))
-        else:
-            B_tilde = None
+        :param dt:      Timestep.
+        :param cache:   Optional ArrayCache (see msdsl.cache) used to store the result, so that it is not recomputed
+                        in later runs with the same matrices and timestep.
+        """
+        A_tilde, B_tilde, C_tilde, D_tilde = cached_call(cache, discretize_matrices, self.A, self.B, self.C,
+                                                         self.D, dt)
+        return LDS(A=A_tilde, B=B_tilde, C=C_tilde, D=D_tilde)
 
-        # discretize C
-        if self.C is not None:
-            C_tilde = self.C.copy()
-        else:
-            C_tilde = None
+    def discretize_batch(self, dts, cache=None):
+        """
+        Returns a list of discretized forms of this LDS, one for each timestep in dts.  This is much faster than
+        calling discretize for each timestep, since A is only decomposed once (see discretize_batch_matrices).
 
-        # discretize D
-        if self.D is not None:
-            D_tilde = self.D.copy()
+        :param dts:     List of timesteps.
+        :param cache:   Optional ArrayCache (see msdsl.cache) used to store the results.
+        """
+        dts = np.asarray(dts, dtype=float)
+        if self.A is not None:
+            # a B matrix with no columns is used if there is no B matrix
+            B = self.B if self.B is not None else np.zeros((self.A.shape[0], 0), dtype=float)
+            A_tilde, B_tilde = cached_call(cache, discretize_batch_matrices, self.A, B, dts)
+            if self.B is None:
+                B_tilde = [None]*len(dts)
         else:
-            D_tilde = None
+            A_tilde, B_tilde = [None]*len(dts), [None]*len(dts)
 
-        # return result
-        return LDS(A=A_tilde, B=B_tilde, C=C_tilde, D=D_tilde)
+        retval = []
+        for k in range(len(dts)):
+            retval.append(LDS(A=A_tilde[k], B=B_tilde[k],
+                              C=self.C.copy() if self.C is not None else None,
+                              D=self.D.copy() if self.D is not None else None))
+        return retval
 
     # overloaded methods
 
@@ -56,6 +67,100 @@ class LDS:
         # return result
         return retval
 
+def discretize_matrices(A, B, C, D, dt: Number):
+    # discretize A
+    if A is not None:
+        A_tilde = scipy.linalg.expm(dt * A)
+    else:
+        A_tilde = None
+
+    # discretize B
+    if A is not None and B is not None:
+        I = np.eye(*A.shape) # identity matrix with shape of A
+        B_tilde = np.linalg.solve(A, (A_tilde - I).dot(B))
+    else:
+        B_tilde = None
+
+    # discretize C
+    if C is not None:
+        C_tilde = C.copy()
+    else:
+        C_tilde = None
+
+    # discretize D
+    if D is not None:
+        D_tilde = D.copy()
+    else:
+        D_tilde = None
+
+    # return result
+    return A_tilde, B_tilde, C_tilde, D_tilde
+
+# eigendecompositions whose eigenvectors have a condition number larger than this are considered to be
+# numerically defective, in which case a Schur decomposition is used instead
+EIG_MAX_COND = 1e8
+
+# number of Taylor series terms used to evaluate the phi functions near zero
+PHI_NUM_TERMS = 20
+
+# returns the eigendecomposition (lam, V, V_inv) of A, or None if A is (nearly) defective
+def calc_eig_decomp(A):
+    lam, V = np.linalg.eig(A)
+    if np.linalg.cond(V) > EIG_MAX_COND:
+        return None
+    return lam, V, np.linalg.inv(V)
+
+# returns the functions phi_0(z), ..., phi_m(z) for an array of z values, stacked along a new last axis.  these are
+# defined by phi_0(z) = e^z and phi_{k+1}(z) = (phi_k(z) - 1/k!)/z, which is equivalent to
+# phi_k(z) = integral(e^((1-x)*z)*x^(k-1)/(k-1)!) from 0 to 1 for k >= 1.  the recurrence loses precision for small z,
+# so a Taylor series is used when |z| < 1.
+def calc_phi(z, m):
+    z = np.asarray(z, dtype=complex)
+    small = np.abs(z) < 1
+    z_large = np.where(small, 1, z)
+    retval = np.zeros(z.shape + (m+1,), dtype=complex)
+    retval[..., 0] = np.exp(z)
+    for k in range(1, m+1):
+        # recurrence
+        rec = (retval[..., k-1] - 1/factorial(k-1))/z_large
+
+        # Taylor series: sum(z^n/(n+k)!)
+        ser = np.zeros(z.shape, dtype=complex)
+        for n in reversed(range(PHI_NUM_TERMS)):
+            ser = ser*z/(n+k+1) + 1
+        ser /= factorial(k)
+
+        retval[..., k] = np.where(small, ser, rec)
+    return retval
+
+# returns the ZOH discretization of the LDS (A, B) for each timestep in dts, as a tuple of arrays (A_tilde, B_tilde)
+# whose shapes are (len(dts), num_state, num_state) and (len(dts), num_state, num_input).  the ZOH input integral is
+# integral(e^(tau*A)) from 0 to t = V*diag(t*phi_1(t*lam))*V^-1, which is valid even when A is singular.
+def discretize_batch_matrices(A, B, dts):
+    dts = np.asarray(dts, dtype=float)
+    eig = calc_eig_decomp(A)
+    if eig is None:
+        # fallback: augmented matrix exponential for each t, after reduction to Schur form
+        T, Q = scipy.linalg.schur(A, output='complex')
+        n, m = B.shape
+        M = np.zeros((n+m, n+m), dtype=complex)
+        M[:n, :n] = T
+        M[:n, n:] = Q.conj().T.dot(B)
+        A_tilde, B_tilde = [], []
+        for dt in dts:
+            E = scipy.linalg.expm(dt*M)
+            A_tilde.append(Q.dot(E[:n, :n]).dot(Q.conj().T))
+            B_tilde.append(Q.dot(E[:n, n:]))
+        A_tilde = np.array(A_tilde).reshape((len(dts), n, n))
+        B_tilde = np.array(B_tilde).reshape((len(dts), n, m))
+        return np.real(A_tilde), np.real(B_tilde)
+    lam, V, V_inv = eig
+    z = np.multiply.outer(dts, lam)
+    phi = calc_phi(z, 1)
+    A_tilde = np.einsum('ij,tj,jk->tik', V, phi[..., 0], V_inv)
+    B_tilde = np.einsum('ij,tj,jk->tik', V, dts[:, np.newaxis]*phi[..., 1], V_inv.dot(B))
+    return np.real(A_tilde), np.real(B_tilde)
+
 class LdsCollection:
     def __init__(self):
         self.A = None
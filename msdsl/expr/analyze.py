@@ -1,7 +1,10 @@
 from typing import List, Set, Union
 
-from msdsl.expr.expr import ModelOperator
+from msdsl.expr.expr import ModelExpr, ModelOperator, Constant, RandomInteger, UNKNOWN_KEY
+from msdsl.expr.format import RealFormat, IntFormat
+from msdsl.expr.svreal import RangeOf, WidthOf, ExponentOf, RangeOperator
 from msdsl.expr.signals import Signal
+from msdsl.expr.traverse import iter_expr, transform_expr
 
 def signal_name(s: Signal):
     return s.name
@@ -10,14 +13,188 @@ def signal_names(l: Union[List[Signal], Set[Signal]]):
     return [signal_name(elem) for elem in l]
 
 def walk_expr(expr, cond_fun):
+    # operators themselves are not returned, only the leaves below them that satisfy cond_fun
+    children = lambda node: node.operands if isinstance(node, ModelOperator) else []
+    return [node for node in iter_expr(expr, children)
+            if cond_fun(node) and not isinstance(node, ModelOperator)]
+
+def format_names(format_):
+    # names of the signals whose range, width, or exponent is used in the definition of a format
+    if not isinstance(format_, RealFormat):
+        return []
+
+    children = lambda node: node.operands if isinstance(node, RangeOperator) else []
     retval = []
+    for attr in [format_.range_, format_.width, format_.exponent]:
+        retval.extend(node.name for node in iter_expr(attr, children)
+                      if isinstance(node, (RangeOf, WidthOf, ExponentOf)))
+
+    return retval
+
+def expr_dependencies(expr):
+    """
+    Returns the names of the signals that an expression depends on, without duplicates.  This includes the signals
+    that are read by the expression (including the control signals of random number generators), as well as the
+    signals that are referred to by the formats of its subexpressions.
+
+    :param expr:    Expression to be analyzed.
+    """
+    def children(node):
+        if isinstance(node, ModelOperator):
+            return node.operands
+        elif isinstance(node, RandomInteger):
+            return [elem for elem in [node.clk, node.rst, node.cke, node.seed] if isinstance(elem, ModelExpr)]
+        else:
+            return []
+
+    retval = {}
+    for node in iter_expr(expr, children, unique=True):
+        if isinstance(node, Signal):
+            retval[node.name] = None
+        if isinstance(node, ModelExpr):
+            retval.update((name, None) for name in format_names(node.format_))
+
+    return list(retval)
+
+def format_key(format_):
+    # hashable representation of a format.  range, width, and exponent expressions are represented by their string
+    # forms, which are exact since numbers are printed with full precision.
+    if isinstance(format_, RealFormat):
+        return (RealFormat, str(format_.range_), str(format_.width), str(format_.exponent))
+    elif isinstance(format_, IntFormat):
+        return (type(format_), format_.width, format_.min_val, format_.max_val)
+    else:
+        raise Exception(f'Unknown format type: {format_.__class__.__name__}')
+
+class ExprKey(tuple):
+    # keys of deeply nested expressions are deeply nested tuples, so the hash is computed only once for each key
+    # (hashing a key then only requires the hashes of its immediate elements)
+    def __hash__(self):
+        if not hasattr(self, '_hash'):
+            self._hash = super().__hash__()
+        return self._hash
+
+# keys are interned as they are created, so that equal keys are usually the same object.  comparing two keys then
+# only requires comparing their immediate elements, since the keys of their operands are matched by identity.  the
+# table is cleared when it reaches INTERNED_KEYS_SIZE entries so that it does not grow without bound; keys created
+# before that are still valid, but they are compared element by element.
+INTERNED_KEYS = {}
+INTERNED_KEYS_SIZE = 1<<20
+
+def expr_key(expr, memo=None, interned=None):
+    """
+    Returns a hashable key that describes the structure of an expression: its type, format, attributes, and the keys
+    of its operands.  Two expressions with the same key compute the same value, so the key can be used to detect
+    common subexpressions.  Expressions that contain random number generators have internal state, so they never
+    match one another, and None is returned in that case.  The keys of operators are cached (see ModelExpr.key), so
+    subexpressions that already have keys are not analyzed again.
+
+    :param expr:        Expression to be analyzed.
+    :param memo:        Optional dictionary used to cache the keys of subexpressions (by object identity), which
+                        avoids re-analyzing subexpressions that appear in several places.
+    :param interned:    Optional dictionary used to make equal keys the same object, in addition to the interning that
+                        is always done when keys are created.
+    """
+    def children(node):
+        if isinstance(node, ModelOperator) and node._key is UNKNOWN_KEY:
+            return node.operands
+        else:
+            return []
 
-    if cond_fun(expr):
-        retval.append(expr)
+    def combine(node, operands):
+        if isinstance(node, ModelOperator):
+            if node._key is UNKNOWN_KEY:
+                node._key = intern_key(combine_key(node, operands), INTERNED_KEYS, INTERNED_KEYS_SIZE)
+            key = node._key
+        else:
+            # signals are not cached since their keys are cheap to compute (and their names can be changed)
+            key = combine_key(node, operands)
+        if interned is not None:
+            key = intern_key(key, interned)
+        return key
 
-    if isinstance(expr, ModelOperator):
-        retval = []
-        for operand in expr.operands:
-            retval.extend(walk_expr(operand, cond_fun))
+    # the expression itself is stored in the memo along with its key, so that its id is not reused
+    return transform_expr(expr, children, combine, memo)
 
+def intern_key(key, interned, size=None):
+    if key is None:
+        return None
+    retval = interned.get(key)
+    if retval is None:
+        if (size is not None) and (len(interned) >= size):
+            interned.clear()
+        retval = interned[key] = key
     return retval
+
+class ExprTable:
+    """
+    Dictionary-like container indexed by expressions.  Since "==" builds an EqualTo expression, expressions cannot be
+    used as dictionary keys directly; instead, they are indexed by their structural keys (see ModelExpr.key), so that
+    separately constructed but identical expressions share the same entry.  Expressions that do not have a key (i.e.,
+    those containing random number generators) are indexed by identity.
+
+    :param structural:  If False, all expressions are indexed by identity, so that only the same expression object
+                        matches an entry.
+    """
+    def __init__(self, structural=True):
+        # save settings
+        self.structural = structural
+
+        # maps indices to (expr, value) tuples.  the expression is stored so that its id is not reused.
+        self.entries = {}
+
+    def index(self, expr):
+        key = expr.key() if self.structural else None
+        return key if key is not None else id(expr)
+
+    def __contains__(self, expr):
+        return self.index(expr) in self.entries
+
+    def __getitem__(self, expr):
+        return self.entries[self.index(expr)][1]
+
+    def __setitem__(self, expr, value):
+        self.entries[self.index(expr)] = (expr, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, expr, default=None):
+        entry = self.entries.get(self.index(expr))
+        return entry[1] if entry is not None else default
+
+    def setdefault(self, expr, default=None):
+        return self.entries.setdefault(self.index(expr), (expr, default))[1]
+
+    def items(self):
+        return list(self.entries.values())
+
+def expr_attrs(expr):
+    # attributes of an expression, which are stored in slots (see ModelExpr) except for subclasses that do not
+    # define __slots__
+    attrs = {}
+    for cls in type(expr).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name != '__weakref__' and hasattr(expr, name):
+                attrs[name] = getattr(expr, name)
+    attrs.update(getattr(expr, '__dict__', {}))
+    return attrs
+
+def combine_key(expr, operands):
+    # computes the key of an expression given the keys of its operands
+    if isinstance(expr, Signal):
+        return (Signal, expr.name)
+    elif isinstance(expr, Constant):
+        return (type(expr), type(expr.value).__name__, repr(expr.value), format_key(expr.format_))
+    elif isinstance(expr, RandomInteger):
+        return None
+    elif isinstance(expr, ModelOperator):
+        if any(operand is None for operand in operands):
+            return None
+        else:
+            # other attributes, such as the amount of a shift or the bits being accessed
+            attrs = tuple(sorted((name, value) for name, value in expr_attrs(expr).items()
+                                 if name not in {'operands', 'format_', '_key'}))
+            return ExprKey((type(expr), format_key(expr.format_), attrs, tuple(operands)))
+    else:
+        return None
@@ -2,13 +2,34 @@ from functools import reduce
 from typing import List, Tuple
 from numbers import Number, Integral, Real
 from math import floor, ceil
-from copy import deepcopy
+from copy import copy
 
-from msdsl.expr.format import RealFormat, SIntFormat, UIntFormat, Format, IntFormat
+from msdsl.expr.format import RealFormat, SIntFormat, UIntFormat, Format, IntFormat, intern_format
 
 # constant wrapping
 
+# constants with small integer values (e.g., the -1 used for negation, or the 0 and 1 in case tables) come up often,
+# so they are shared rather than being created each time that they are wrapped.  like formats, constants are not
+# modified after they are created.
+SMALL_CONSTANT_LIMIT = 256
+SMALL_CONSTANTS = {}
+
 def wrap_constant(operand):
+    if isinstance(operand, ModelExpr):
+        # checked first since most operands are already expressions
+        return operand
+    elif isinstance(operand, Real) and (-SMALL_CONSTANT_LIMIT <= operand <= SMALL_CONSTANT_LIMIT) and \
+            (operand == int(operand)):
+        # the type and representation are used as the key so that, e.g., 1, 1.0, and True are kept separate, as
+        # are 0.0 and -0.0
+        key = (type(operand), repr(operand))
+        if key not in SMALL_CONSTANTS:
+            SMALL_CONSTANTS[key] = new_constant(operand)
+        return SMALL_CONSTANTS[key]
+    else:
+        return new_constant(operand)
+
+def new_constant(operand):
     if isinstance(operand, Integral):
         if operand < 0:
             return SIntConstant(operand)
@@ -47,9 +68,44 @@ def promote_operand(operand, promoted_cls):
 def promote_operands(operands, promoted_cls):
     return [promote_operand(operand=operand, promoted_cls=promoted_cls) for operand in operands]
 
+# marks expressions whose structural key has not been computed yet (None is a valid key)
+UNKNOWN_KEY = object()
+
 class ModelExpr:
+    __slots__ = ('format_', '_key')
+
     def __init__(self, format_):
         self.format_ = format_
+        self._key = UNKNOWN_KEY
+
+    # structural comparison.  "==" builds an EqualTo expression, so expressions cannot be compared or hashed directly;
+    # these methods are used instead when expressions need to be matched by their structure.
+
+    def key(self):
+        """
+        Returns a hashable key that describes the structure of this expression (see msdsl.expr.analyze.expr_key).
+        The key is computed once and then cached, along with the keys of the subexpressions.
+
+        :return: key of the expression, or None if it contains random number generators
+        """
+        if self._key is UNKNOWN_KEY:
+            # imported here to avoid a circular import
+            from msdsl.expr.analyze import expr_key
+            return expr_key(self)
+        else:
+            return self._key
+
+    def clear_key(self):
+        # must be called if the format or operands of an expression are changed after its key may have been computed
+        self._key = UNKNOWN_KEY
+
+    def structural_hash(self):
+        key = self.key()
+        return hash(key) if key is not None else id(self)
+
+    def structurally_equals(self, other):
+        key = self.key()
+        return (self is other) or ((key is not None) and isinstance(other, ModelExpr) and (key == other.key()))
 
     # arithmetic operations
 
@@ -133,6 +189,8 @@ class ModelExpr:
 # general operator types -- not intended to be instantiated directly
 
 class ModelOperator(ModelExpr):
+    __slots__ = ('operands',)
+
     def __init__(self, operands: List, format_):
         # call the super constructor
         super().__init__(format_=format_)
@@ -141,6 +199,8 @@ class ModelOperator(ModelExpr):
         self.operands = wrap_constants(operands)
 
 class UnaryOperator(ModelOperator):
+    __slots__ = ()
+
     def __init__(self, operand, format_):
         super().__init__(operands=[operand], format_=format_)
 
@@ -149,6 +209,8 @@ class UnaryOperator(ModelOperator):
         return self.operands[0]
 
 class BinaryOperator(ModelOperator):
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, format_):
         super().__init__(operands=[lhs, rhs], format_=format_)
 
@@ -161,6 +223,8 @@ class BinaryOperator(ModelOperator):
         return self.operands[1]
 
 class ComparisonOperator(BinaryOperator):
+    __slots__ = ()
+
     comp_op = None
 
     def __init__(self, lhs, rhs):
@@ -173,17 +237,19 @@ class ComparisonOperator(BinaryOperator):
         lhs, rhs = promote_operands([lhs, rhs], format_cls)
 
         # call the super constructor
-        super().__init__(lhs=lhs, rhs=rhs, format_=UIntFormat(width=1))
+        super().__init__(lhs=lhs, rhs=rhs, format_=intern_format(UIntFormat(width=1)))
 
     def __str__(self):
         return f'{self.lhs} {self.comp_op} {self.rhs}'
 
 class ArithmeticOperator(ModelOperator):
+    __slots__ = ()
+
     initial = None
 
     def __init__(self, operands):
         # determine the output format
-        format_ = reduce(self.function, [operand.format_ for operand in operands])
+        format_ = intern_format(reduce(self.function, [operand.format_ for operand in operands]))
 
         # call the super constructor
         super().__init__(operands=operands, format_=format_)
@@ -232,6 +298,8 @@ class ArithmeticOperator(ModelOperator):
             return cls(operands)
 
 class BitwiseOperator(ModelOperator):
+    __slots__ = ()
+
     def __init__(self, operands):
         # wrap constants as needed
         operands = wrap_constants(operands)
@@ -244,7 +312,7 @@ class BitwiseOperator(ModelOperator):
         width = max(operand.format_.width for operand in operands)
 
         # Call the super constructor
-        super().__init__(operands=operands, format_=UIntFormat(width=width))
+        super().__init__(operands=operands, format_=intern_format(UIntFormat(width=width)))
 
 # Sum
 
@@ -269,6 +337,8 @@ def sum_op(operands):
     return Sum.flatten(operands)
 
 class Sum(ArithmeticOperator):
+    __slots__ = ()
+
     initial = 0
 
     @classmethod
@@ -297,6 +367,8 @@ def prod_op(operands):
     return Product.flatten(operands)
 
 class Product(ArithmeticOperator):
+    __slots__ = ()
+
     initial = 1
 
     @classmethod
@@ -339,6 +411,8 @@ def min_op(operands):
     return Min.flatten(operands)
 
 class Min(ArithmeticOperator):
+    __slots__ = ()
+
     initial = +float('inf')
 
     @classmethod
@@ -378,6 +452,8 @@ def max_op(operands):
     return Max.flatten(operands)
 
 class Max(ArithmeticOperator):
+    __slots__ = ()
+
     initial = -float('inf')
 
     @classmethod
@@ -395,20 +471,28 @@ class Max(ArithmeticOperator):
 # bitwise operations that work on any number of arguments
 
 class BitwiseAnd(BitwiseOperator):
+    __slots__ = ()
+
     def __str__(self):
         return '(' + '&'.join(str(operand) for operand in self.operands) + ')'
 
 class BitwiseOr(BitwiseOperator):
+    __slots__ = ()
+
     def __str__(self):
         return '(' + '|'.join(str(operand) for operand in self.operands) + ')'
 
 class BitwiseXor(BitwiseOperator):
+    __slots__ = ()
+
     def __str__(self):
         return '(' + '^'.join(str(operand) for operand in self.operands) + ')'
 
 # unary bitwise operations
 
 class BitwiseInv(UnaryOperator):
+    __slots__ = ()
+
     def __init__(self, operand):
         # wrap constant if needed
         operand = wrap_constant(operand)
@@ -424,6 +508,8 @@ class BitwiseInv(UnaryOperator):
         return f'(~{self.operand})'
 
 class ArithmeticShift(UnaryOperator):
+    __slots__ = ('shift',)
+
     shift_op = None
 
     @classmethod
@@ -449,9 +535,9 @@ class ArithmeticShift(UnaryOperator):
 
         # create the output format
         if isinstance(operand.format_, UIntFormat):
-            format_ = UIntFormat(width=width, min_val=min_val, max_val=max_val)
+            format_ = intern_format(UIntFormat(width=width, min_val=min_val, max_val=max_val))
         elif isinstance(operand.format_, SIntFormat):
-            format_ = SIntFormat(width=width, min_val=min_val, max_val=max_val)
+            format_ = intern_format(SIntFormat(width=width, min_val=min_val, max_val=max_val))
         else:
             raise Exception('Unknown format type.')
 
@@ -465,6 +551,8 @@ class ArithmeticShift(UnaryOperator):
         return f'({self.operand}{self.shift_op}{self.shift})'
 
 class ArithmeticLeftShift(ArithmeticShift):
+    __slots__ = ()
+
     shift_op = '<<<'
 
     @classmethod
@@ -476,6 +564,8 @@ class ArithmeticLeftShift(ArithmeticShift):
         return (in_format.width + shift)
 
 class ArithmeticRightShift(ArithmeticShift):
+    __slots__ = ()
+
     shift_op = '>>>'
 
     @classmethod
@@ -487,6 +577,8 @@ class ArithmeticRightShift(ArithmeticShift):
         return max(in_format.width - shift, 1)
 
 class BitwiseAccess(UnaryOperator):
+    __slots__ = ('msb', 'lsb')
+
     def __init__(self, operand, key):
         # wrap constant if needed
         operand = wrap_constant(operand)
@@ -521,9 +613,9 @@ class BitwiseAccess(UnaryOperator):
 
         # create the output format
         if isinstance(operand.format_, UIntFormat):
-            format_ = UIntFormat(width=width)
+            format_ = intern_format(UIntFormat(width=width))
         elif isinstance(operand.format_, SIntFormat):
-            format_ = SIntFormat(width=width)
+            format_ = intern_format(SIntFormat(width=width))
         else:
             raise Exception('Unknown format type.')
 
@@ -540,21 +632,33 @@ class BitwiseAccess(UnaryOperator):
 # specific comparison operations
 
 class LessThan(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '<'
 
 class LessThanOrEquals(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '<='
 
 class GreaterThan(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '>'
 
 class GreaterThanOrEquals(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '>='
 
 class EqualTo(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '=='
 
 class NotEqualTo(ComparisonOperator):
+    __slots__ = ()
+
     comp_op = '!='
 
 # concatenation of digital signals
@@ -583,9 +687,11 @@ def concatenate(operands):
         return Concatenate(operands)
 
 class Concatenate(ModelOperator):
+    __slots__ = ()
+
     def __init__(self, operands):
         width = sum(operand.format_.width for operand in operands)
-        super().__init__(operands=operands, format_=UIntFormat(width=width))
+        super().__init__(operands=operands, format_=intern_format(UIntFormat(width=width)))
 
     def __str__(self):
         return '{' + ', '.join(str(operand) for operand in self.operands) + '}'
@@ -639,12 +745,14 @@ def array(elements: List, address: ModelExpr, real_range_hint: Number=None,
             # bump up range a little bit for RealFormat to avoid rounding issues
             # TODO: is there a cleaner way to handle this?
             if isinstance(output_format, RealFormat):
-                output_format = RealFormat(range_=1.01*output_format.range_)
+                output_format = intern_format(RealFormat(range_=1.01*output_format.range_))
 
         # create the Array object
         return Array(elements=elements, address=address, output_format=output_format)
 
 class Array(ModelOperator):
+    __slots__ = ()
+
     def __init__(self, elements: List, address, output_format: Format):
         super().__init__(operands=elements+[address], format_=output_format)
 
@@ -716,6 +824,20 @@ def case_table(values: List, default):
 
 # generic type conversion
 
+def with_format(expr: ModelExpr, format_: Format):
+    """
+    Returns a version of *expr* with a different format, without modifying *expr*.  Only the expression node itself is
+    copied; its operands are shared with the original expression, since expressions are not modified in place.
+
+    :param expr:    expression to be retyped
+    :param format_: format of the new expression
+    :return:        retyped expression
+    """
+    retval = copy(expr)
+    retval.format_ = format_
+    retval.clear_key()
+    return retval
+
 def handle_type_conversion(operand, make_constant, make_class):
     if isinstance(operand, Constant):
         return make_constant(operand.value)
@@ -726,6 +848,8 @@ def handle_type_conversion(operand, make_constant, make_class):
         return make_class(operand)
 
 class TypeConversion(UnaryOperator):
+    __slots__ = ()
+
     input_format_cls = None
     output_format_cls = None
 
@@ -760,6 +884,8 @@ def uint_to_sint(operand, width=None):
     return handle_type_conversion(operand=operand, make_constant=make_constant, make_class=make_class)
 
 class UIntToSInt(TypeConversion):
+    __slots__ = ()
+
     input_format_cls  = UIntFormat
     output_format_cls = SIntFormat
 
@@ -768,7 +894,7 @@ class UIntToSInt(TypeConversion):
         if width is None:
             output_format = SIntFormat.from_values([operand.format_.min_val, operand.format_.max_val])
         else:
-            output_format = SIntFormat(width=width)
+            output_format = intern_format(SIntFormat(width=width))
             assert output_format.can_represent(operand.format_.min_val), \
                 f'The given signed integer width {width} cannot represent the operand min value {operand.format.min_val}.'
             assert output_format.can_represent(operand.format_.max_val), \
@@ -793,6 +919,8 @@ def sint_to_uint(operand, width=None):
     return handle_type_conversion(operand=operand, make_constant=make_constant, make_class=make_class)
 
 class SIntToUInt(TypeConversion):
+    __slots__ = ()
+
     input_format_cls  = SIntFormat
     output_format_cls = UIntFormat
 
@@ -801,7 +929,7 @@ class SIntToUInt(TypeConversion):
         if width is None:
             output_format = UIntFormat.from_values([operand.format_.min_val, operand.format_.max_val])
         else:
-            output_format = UIntFormat(width=width)
+            output_format = intern_format(UIntFormat(width=width))
             assert output_format.can_represent(operand.format_.min_val), \
                 f'The given unsigned integer width {width} cannot represent the operand min value {operand.format_.min_val}.'
             assert output_format.can_represent(operand.format_.max_val), \
@@ -825,6 +953,8 @@ def sint_to_real(operand):
     return handle_type_conversion(operand=operand, make_constant=make_constant, make_class=make_class)
 
 class SIntToReal(TypeConversion):
+    __slots__ = ()
+
     input_format_cls  = SIntFormat
     output_format_cls = RealFormat
 
@@ -849,6 +979,8 @@ def real_to_sint(operand, width=None):
     return handle_type_conversion(operand=operand, make_constant=make_constant, make_class=make_class)
 
 class RealToSInt(TypeConversion):
+    __slots__ = ()
+
     input_format_cls  = RealFormat
     output_format_cls = SIntFormat
 
@@ -864,7 +996,7 @@ class RealToSInt(TypeConversion):
             max_int_val = int(ceil(operand.format_.range_))
             output_format = SIntFormat.from_values([min_int_val, max_int_val])
         else:
-            output_format = SIntFormat(width=width)
+            output_format = intern_format(SIntFormat(width=width))
 
         # call the superconstructor
         super().__init__(operand=operand, output_format=output_format)
@@ -888,10 +1020,10 @@ def to_uint(operand, width=None):
     elif isinstance(operand.format_, UIntFormat):
         # This is a kind of tricky case, even though it doesn't likely come up too often.  If the width is specified
         # and doesn't match that of the operand, then we have to return a version of the operand with the requested
-        # width.  A deepcopy is used because this function is not supposed to mutate its arguments.
+        # width.  A shallow copy is used because this function is not supposed to mutate its arguments.
         if (width is not None) and (width != operand.format_.width):
-            operand = deepcopy(operand)
-            operand.format_ = UIntFormat(width=width, min_val=operand.format_.min_val, max_val=operand.format_.max_val)
+            operand = with_format(operand, intern_format(UIntFormat(
+                width=width, min_val=operand.format_.min_val, max_val=operand.format_.max_val)))
 
         return operand
     else:
@@ -910,11 +1042,11 @@ def to_sint(operand, width=None):
     elif isinstance(operand.format_, SIntFormat):
         # This is a kind of tricky case, even though it doesn't likely come up too often.  If the width is specified
         # and doesn't match that of the operand, then we have to return a version of the operand with the requested
-        # width.  A deepcopy is used because this function is not supposed to mutate its arguments.
+        # width.  A shallow copy is used because this function is not supposed to mutate its arguments.
 
         if (width is not None) and (width != operand.format_.width):
-            operand = deepcopy(operand)
-            operand.format_ = SIntFormat(width=width, min_val=operand.format_.min_val, max_val=operand.format_.max_val)
+            operand = with_format(operand, intern_format(SIntFormat(
+                width=width, min_val=operand.format_.min_val, max_val=operand.format_.max_val)))
 
         return operand
     elif isinstance(operand.format_, UIntFormat):
@@ -941,6 +1073,8 @@ def to_real(operand):
 # numeric constants
 
 class Constant(ModelExpr):
+    __slots__ = ('value',)
+
     def __init__(self, value: Number, format_: Format):
         self.value = value
         super().__init__(format_=format_)
@@ -952,6 +1086,8 @@ class RealConstant(Constant):
     """
     Container for a constant real datatype within MSDSL.
     """
+    __slots__ = ()
+
     def __init__(self, value: Number):
         # determine constant format
         format_ = RealFormat.from_value(value)
@@ -963,6 +1099,8 @@ class SIntConstant(Constant):
     """
     Container for a constant signed integer datatype within MSDSL.
     """
+    __slots__ = ()
+
     def __init__(self, value: Integral, width: Integral=None):
         # check input
         assert isinstance(value, Integral), f'{self.__class__.__name__} requires an integer value, but was given a {value.__class__.__name__}.'
@@ -971,7 +1109,7 @@ class SIntConstant(Constant):
         if width is None:
             format_ = SIntFormat.from_value(value)
         else:
-            format_ = SIntFormat(width=width, min_val=value, max_val=value)
+            format_ = intern_format(SIntFormat(width=width, min_val=value, max_val=value))
 
         # call the super constructor
         super().__init__(value=value, format_=format_)
@@ -980,6 +1118,8 @@ class UIntConstant(Constant):
     """
     Container for a constant unsigned integer datatype within MSDSL.
     """
+    __slots__ = ()
+
     def __init__(self, value: Integral, width: Integral=None):
         # check input
         assert isinstance(value, Integral), f'{self.__class__.__name__} requires an integer value, but was given a {value.__class__.__name__}.'
@@ -988,7 +1128,7 @@ class UIntConstant(Constant):
         if width is None:
             format_ = UIntFormat.from_value(value)
         else:
-            format_ = UIntFormat(width=width, min_val=value, max_val=value)
+            format_ = intern_format(UIntFormat(width=width, min_val=value, max_val=value))
 
         # call the super constructor
         super().__init__(value=value, format_=format_)
@@ -996,9 +1136,11 @@ class UIntConstant(Constant):
 # Compress UInt
 
 class CompressUInt(UnaryOperator):
+    __slots__ = ()
+
     def __init__(self, operand):
         range_ = operand.format_.width + 1
-        super().__init__(operand=operand, format_=RealFormat(range_=range_))
+        super().__init__(operand=operand, format_=intern_format(RealFormat(range_=range_)))
 
 def compress_uint(x):
     return CompressUInt(x)
@@ -1010,6 +1152,8 @@ def clamp_op(val_expr, min_expr, max_expr):
 # Random integer generator
 
 class RandomInteger(ModelExpr):
+    __slots__ = ('clk', 'rst', 'cke', 'seed')
+
     def __init__(self, clk=None, rst=None, cke=None,
                  seed=None, signed=False):
         # save settings
@@ -1020,18 +1164,18 @@ class RandomInteger(ModelExpr):
 
         # determine the output format
         if signed:
-            format_ = SIntFormat(width=32)
+            format_ = intern_format(SIntFormat(width=32))
         else:
-            format_ = UIntFormat(width=32)
+            format_ = intern_format(UIntFormat(width=32))
 
         # call the super constructor
         super().__init__(format_=format_)
 
 class MT19937(RandomInteger):
-    pass
+    __slots__ = ()
 
 class LCG(RandomInteger):
-    pass
+    __slots__ = ()
 
 def mt19937(clk=None, rst=None, cke=None, seed=None):
     return MT19937(clk=clk, rst=rst, cke=cke, seed=seed)
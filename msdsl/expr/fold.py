@@ -0,0 +1,179 @@
+from copy import copy
+from numbers import Integral
+
+from msdsl.expr.expr import (ModelOperator, Constant, Sum, Product, Array, SIntToReal, RealToSInt, UIntToSInt,
+                             SIntToUInt, RealConstant, SIntConstant, UIntConstant, sum_op, prod_op, wrap_constant)
+from msdsl.expr.format import RealFormat, IntFormat, UIntFormat, SIntFormat
+from msdsl.expr.traverse import transform_expr
+
+# list of (classes, rule) tuples, in the order in which the rules were registered
+FOLD_RULES = []
+
+def fold_rule(*classes):
+    """
+    Decorator that registers a rule used by fold_expr.  The rule is called as rule(expr) for expressions that are
+    instances of one of the given classes, after the operands of the expression have been folded.  It returns an
+    equivalent expression, or None if the rule does not apply.  Rules must not return an expression of the same form
+    as the one that they were given, since rules are applied repeatedly until none of them apply.
+
+    :param classes: Expression classes to which the rule applies.
+    """
+    def decorator(rule):
+        FOLD_RULES.append((classes, rule))
+        return rule
+    return decorator
+
+def fold_expr(expr, memo=None):
+    """
+    Folds constants and removes redundant operations in an expression, working from the bottom up.  The value of
+    the result is the same as that of the original expression, and integer results keep their original format, but
+    real-valued subexpressions may end up with different (usually smaller) ranges.
+
+    :param expr:    Expression to be folded.
+    :param memo:    Optional dictionary used to cache the results for subexpressions (by object identity).  Sharing
+                    the same dictionary between expressions preserves the sharing of their common subexpressions.
+    """
+    children = lambda node: node.operands if isinstance(node, ModelOperator) else []
+    return transform_expr(wrap_constant(expr), children, combine_folded, memo)
+
+def combine_folded(expr, operands):
+    # rebuild the expression if any of its operands changed
+    if isinstance(expr, ModelOperator) and any(new is not old for new, old in zip(operands, expr.operands)):
+        result = rebuild(expr, operands)
+    else:
+        result = expr
+
+    # apply rules until none of them apply
+    while True:
+        for classes, rule in FOLD_RULES:
+            if isinstance(result, classes):
+                new_result = rule(result)
+                if new_result is not None:
+                    result = new_result
+                    break
+        else:
+            break
+
+    # make sure that the format is still compatible
+    result = match_format(result, expr.format_)
+    if result is None:
+        result = with_operands(expr, operands)
+
+    return result
+
+def rebuild(expr, operands):
+    if isinstance(expr, Sum):
+        return sum_op(operands)
+    elif isinstance(expr, Product):
+        return prod_op(operands)
+    else:
+        return with_operands(expr, operands)
+
+def with_operands(expr, operands):
+    # shallow copy of an expression with different operands, keeping its format
+    if all(new is old for new, old in zip(operands, expr.operands)):
+        return expr
+    else:
+        retval = copy(expr)
+        retval.operands = list(operands)
+        retval.clear_key()
+        return retval
+
+def match_format(expr, format_):
+    # returns a version of expr that can be used in place of an expression with the given format, or None if that is
+    # not possible.  integer widths have to be preserved, since they affect operations such as concatenation.
+    if isinstance(format_, RealFormat):
+        if isinstance(expr.format_, RealFormat):
+            return expr
+        elif isinstance(expr, Constant):
+            return RealConstant(float(expr.value))
+        return None
+    elif isinstance(format_, IntFormat):
+        if type(expr.format_) is type(format_) and expr.format_.width == format_.width:
+            return expr
+        elif isinstance(expr, Constant) and format_.can_represent(expr.value):
+            if isinstance(format_, SIntFormat):
+                return SIntConstant(expr.value, width=format_.width)
+            elif isinstance(format_, UIntFormat):
+                return UIntConstant(expr.value, width=format_.width)
+        return None
+    else:
+        raise Exception(f'Unknown format type: {format_.__class__.__name__}')
+
+def is_constant(expr, value):
+    return isinstance(expr, Constant) and expr.value == value
+
+# folding rules
+
+@fold_rule(Sum)
+def fold_sum(expr: Sum):
+    # x+0, as well as sums that contain several constants or other sums
+    constants = [operand for operand in expr.operands if isinstance(operand, Constant)]
+    if len(constants) > 1 or any(is_constant(operand, 0) or isinstance(operand, Sum) for operand in expr.operands):
+        return sum_op(expr.operands)
+
+@fold_rule(Product)
+def fold_product(expr: Product):
+    # x*1 and x*0, as well as products that contain several constants or other products
+    constants = [operand for operand in expr.operands if isinstance(operand, Constant)]
+    if len(constants) > 1 or any(is_constant(operand, 1) or is_constant(operand, 0) or isinstance(operand, Product)
+                                 or (isinstance(operand, Array) and operand.all_zeros) for operand in expr.operands):
+        return prod_op(expr.operands)
+
+@fold_rule(Array)
+def fold_array(expr: Array):
+    # select the element directly if the address is constant (which includes if_ with a constant condition)
+    if isinstance(expr.address, Constant):
+        if isinstance(expr.address.value, Integral) and 0 <= expr.address.value < len(expr):
+            return expr.elements[expr.address.value]
+
+    # arrays whose elements are all the same don't need the address.  this only holds if the address cannot go past
+    # the end of the array, since the value is zero in that case (unless the elements are zero as well).
+    if expr.all_zeros:
+        return expr.elements[0]
+    elif (1<<expr.address.format_.width) == len(expr):
+        keys = [element.key() for element in expr.elements]
+        if all(element is expr.elements[0] for element in expr.elements) or \
+                (keys[0] is not None and all(key == keys[0] for key in keys)):
+            return expr.elements[0]
+
+@fold_rule(RealToSInt)
+def fold_real_to_sint(expr: RealToSInt):
+    # to_sint(to_real(x)) for a signed integer x, as long as the width is not changed
+    if isinstance(expr.operand, SIntToReal) and expr.operand.operand.format_.width == expr.format_.width:
+        return expr.operand.operand
+
+@fold_rule(SIntToUInt)
+def fold_sint_to_uint(expr: SIntToUInt):
+    # to_uint(to_sint(x)) for an unsigned integer x, as long as the width is not changed
+    if isinstance(expr.operand, UIntToSInt) and expr.operand.operand.format_.width == expr.format_.width:
+        return expr.operand.operand
+    elif isinstance(expr.operand, Constant) and expr.format_.can_represent(expr.operand.value):
+        return UIntConstant(expr.operand.value, width=expr.format_.width)
+
+@fold_rule(UIntToSInt)
+def fold_uint_to_sint(expr: UIntToSInt):
+    if isinstance(expr.operand, Constant) and expr.format_.can_represent(expr.operand.value):
+        return SIntConstant(expr.operand.value, width=expr.format_.width)
+
+@fold_rule(SIntToReal)
+def fold_sint_to_real(expr: SIntToReal):
+    if isinstance(expr.operand, Constant):
+        return RealConstant(float(expr.operand.value))
+
+def main():
+    from msdsl.expr.signals import AnalogSignal, DigitalSignal
+    from msdsl.expr.expr import array, to_real, to_sint
+    from msdsl.expr.extras import if_
+
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+    s = DigitalSignal('s', width=8, signed=True)
+
+    print(fold_expr(array([1.0, 1.0], s[0])*a + b))
+    print(fold_expr(if_(1, a, b)*2.0))
+    print(fold_expr(array([a, b], s[0])*array([0.0, 0.0], s[1])))
+    print(fold_expr(to_real(to_sint(to_real(s), width=8))))
+
+if __name__ == '__main__':
+    main()
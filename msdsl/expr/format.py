@@ -3,7 +3,32 @@ from numbers import Number
 
 from msdsl.expr.svreal import RangeExpr, range_max
 
+# formats are not modified after they are created (set_this_cycle modifies a copy), so a single instance can be shared
+# by all of the expressions that have the same format.  the cache is cleared when it reaches FORMAT_CACHE_SIZE entries
+# so that it does not grow without bound.
+FORMAT_CACHE = {}
+FORMAT_CACHE_SIZE = 1<<16
+
+def intern_format(format_):
+    """
+    Returns a shared instance of the given format if it can be cached, otherwise the format itself.
+
+    :param format_: Format to be interned.
+    """
+    key = format_.cache_key()
+    if key is None:
+        return format_
+
+    retval = FORMAT_CACHE.get(key)
+    if retval is None:
+        if len(FORMAT_CACHE) >= FORMAT_CACHE_SIZE:
+            FORMAT_CACHE.clear()
+        retval = FORMAT_CACHE[key] = format_
+    return retval
+
 class Format:
+    __slots__ = ()
+
     shortname = None
 
     @classmethod
@@ -24,7 +49,13 @@ class Format:
     def cover(cls, formats):
         raise NotImplementedError
 
+    def cache_key(self):
+        # key used to look up this format in FORMAT_CACHE, or None if it should not be cached
+        return None
+
 class RealFormat(Format):
+    __slots__ = ('range_', 'width', 'exponent')
+
     # format shortname to aid with human-readable output
     shortname = 'real'
 
@@ -39,7 +70,7 @@ class RealFormat(Format):
         range_ = max(abs(value) for value in values)
 
         # return format
-        return RealFormat(range_=range_)
+        return intern_format(RealFormat(range_=range_))
 
     def __add__(self, other):
         if isinstance(other, RealFormat):
@@ -85,12 +116,22 @@ class RealFormat(Format):
             f'Function can only be applied to a list of {cls.__name__} objects.'
 
         range_ = range_max([format_.range_ for format_ in formats])
-        return cls(range_=range_)
+        return intern_format(cls(range_=range_))
+
+    def cache_key(self):
+        # only formats with a numeric range and automatic width and exponent are cached.  the type of the range is
+        # included so that, e.g., ranges of 1 and 1.0 are kept separate.
+        if isinstance(self.range_, RangeExpr) or self.width is not None or self.exponent is not None:
+            return None
+        else:
+            return (type(self), type(self.range_), self.range_)
 
     def __str__(self):
         return (f'{self.__class__.__name__}(range={self.range_})')
 
 class IntFormat(Format):
+    __slots__ = ('width', 'min_val', 'max_val')
+
     def __init__(self, width, min_val, max_val):
         self.width = width
         self.min_val = min_val
@@ -165,7 +206,7 @@ class IntFormat(Format):
         width = max(cls.width_of(value) for value in values)
 
         # return new format
-        return cls(width=width, min_val=min(values), max_val=max(values))
+        return intern_format(cls(width=width, min_val=min(values), max_val=max(values)))
 
     @classmethod
     def cover(cls, formats):
@@ -179,12 +220,17 @@ class IntFormat(Format):
         max_val = max([format_.max_val for format_ in formats])
 
         # return new format
-        return cls(width=width, min_val=min_val, max_val=max_val)
+        return intern_format(cls(width=width, min_val=min_val, max_val=max_val))
+
+    def cache_key(self):
+        return (type(self), self.width, self.min_val, self.max_val)
 
     def __str__(self):
         return (f'{self.__class__.__name__}(width={self.width}, min_val={self.min_val}, max_val={self.max_val})')
 
 class SIntFormat(IntFormat):
+    __slots__ = ()
+
     # format shortname to aid with human-readable output
     shortname = 'sint'
 
@@ -216,6 +262,8 @@ class SIntFormat(IntFormat):
             return (value).bit_length() + 1
 
 class UIntFormat(IntFormat):
+    __slots__ = ()
+
     # format shortname to aid with human-readable output
     shortname = 'uint'
 
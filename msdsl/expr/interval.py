@@ -0,0 +1,330 @@
+from numbers import Number
+from math import inf, isfinite
+
+from svreal import DEF_LONG_WIDTH_REAL, DEF_SHORT_WIDTH_REAL
+
+from msdsl.expr.expr import (ModelExpr, ModelOperator, Constant, Sum, Product, Array, Min, Max, SIntToReal,
+                             with_format)
+from msdsl.expr.format import RealFormat, IntFormat
+from msdsl.expr.signals import Signal
+from msdsl.expr.analyze import format_key
+from msdsl.expr.fold import with_operands
+from msdsl.expr.svreal import range_sum, range_product
+from msdsl.expr.traverse import transform_expr
+
+# margin applied to ranges computed for arrays, matching the one used by array() to avoid problems when elements are
+# rounded to the output format
+ARRAY_MARGIN = 1.01
+
+# key used for the terms of the affine form that represent rounding errors
+ROUNDING = 'rounding'
+
+class Bounds:
+    """
+    Bounds on the value of an expression, which are tracked in two ways.  The first is an interval [lo, hi], whose
+    ends may be infinite.  The second is an affine form, const + sum(coeff*e), where each e is an unknown value
+    within [-range_, +range_].  The affine form keeps track of which signal each term comes from, so terms that
+    cancel each other out (e.g., a*x - b*x) are combined before computing the range.  Ranges in the affine form may
+    be symbolic (RangeExpr), while the interval is always numeric.
+
+    :param lo:      Lower end of the interval.
+    :param hi:      Upper end of the interval.
+    :param const:   Constant term of the affine form.
+    :param terms:   Dictionary mapping keys to (coeff, range_) tuples for the remaining terms of the affine form.
+    """
+    def __init__(self, lo=-inf, hi=+inf, const=0, terms=None):
+        # set defaults
+        if terms is None:
+            terms = {}
+
+        # save settings
+        self.const = const
+        self.terms = terms
+
+        # the affine form also bounds the value if all of its ranges are numeric
+        affine_range = self.affine_range(const=False)
+        if isinstance(affine_range, Number):
+            lo = max(lo, const - affine_range)
+            hi = min(hi, const + affine_range)
+        self.lo = lo
+        self.hi = hi
+
+    @classmethod
+    def constant(cls, value):
+        return cls(lo=value, hi=value, const=value)
+
+    @classmethod
+    def opaque(cls, key, range_, lo=-inf, hi=+inf):
+        # unknown value within +/- range_, which is correlated with other values that have the same key
+        return cls(lo=lo, hi=hi, terms={key: (1, range_)})
+
+    @property
+    def is_constant(self):
+        return len(self.terms) == 0 and self.lo == self.hi
+
+    @property
+    def numeric_range(self):
+        # range implied by the interval, or None if the interval is not bounded
+        if isfinite(self.lo) and isfinite(self.hi):
+            return max(abs(self.lo), abs(self.hi))
+        else:
+            return None
+
+    def affine_range(self, const=True, rounding=True):
+        # range implied by the affine form (may be symbolic).  if "rounding" is False, the terms that represent
+        # rounding errors are left out.
+        operands = [abs(self.const)] if const else []
+        operands += [range_product([abs(coeff), range_]) for key, (coeff, range_) in self.terms.items()
+                     if rounding or not is_rounding_key(key)]
+        return range_sum(operands)
+
+    def add_error(self, key, error):
+        # adds an independent error within +/- error (e.g., due to rounding), which may be symbolic.  a symbolic error
+        # cannot be applied to the interval; this only happens when the interval is unbounded on at least one side,
+        # in which case the range of the format (and hence the error) is not replaced by a numeric one.
+        if isinstance(error, Number):
+            if error == 0:
+                return self
+            lo, hi = self.lo - error, self.hi + error
+        else:
+            lo, hi = self.lo, self.hi
+        terms = dict(self.terms)
+        terms[key] = (1, error)
+        return Bounds(lo=lo, hi=hi, const=self.const, terms=terms)
+
+    def scale(self, k):
+        lo, hi = sorted([mul_bound(k, self.lo), mul_bound(k, self.hi)])
+        terms = {key: (k*coeff, range_) for key, (coeff, range_) in self.terms.items()}
+        return Bounds(lo=lo, hi=hi, const=k*self.const, terms=terms)
+
+    def __add__(self, other):
+        terms = dict(self.terms)
+        for key, (coeff, range_) in other.terms.items():
+            if key in terms:
+                terms[key] = (terms[key][0] + coeff, range_)
+            else:
+                terms[key] = (coeff, range_)
+        terms = {key: value for key, value in terms.items() if value[0] != 0}
+        return Bounds(lo=self.lo+other.lo, hi=self.hi+other.hi, const=self.const+other.const, terms=terms)
+
+def is_rounding_key(key):
+    return isinstance(key, tuple) and len(key) > 0 and key[0] == ROUNDING
+
+def rounding_error(format_, bounds=None, width=None):
+    """
+    Returns a bound on the error when a value is rounded to the given format in fixed-point, i.e., one LSB.  If the
+    exponent is determined by the range, the LSB is at most 2*range/(2**(width-1)-1) (see CALC_EXP in svreal.sv).  If
+    the range is symbolic but "bounds" gives a numeric range, that range is used instead, since the format will be
+    tightened to it.
+
+    :param format_: Format to which the value is rounded.
+    :param bounds:  Optional Bounds of the value.
+    :param width:   Width to use if the format does not specify one (by default, the width of a long real).
+    """
+    if not isinstance(format_, RealFormat):
+        return 0
+    if isinstance(format_.exponent, Number):
+        return 2.0**format_.exponent
+    if isinstance(format_.width, Number):
+        width = format_.width
+    elif width is None:
+        width = DEF_LONG_WIDTH_REAL
+    range_ = format_.range_
+    if (not isinstance(range_, Number)) and (bounds is not None) and (bounds.numeric_range is not None):
+        range_ = bounds.numeric_range
+    return range_product([2.0/((2.0**(width-1))-1.0), range_])
+
+def constant_error(value):
+    # constants that are multiplied by other values are represented as short reals, with a range that is 1% larger
+    # than the value itself (see MUL_CONST_REAL)
+    return rounding_error(RealFormat(range_=1.01*abs(value)), width=DEF_SHORT_WIDTH_REAL)
+
+def mul_bound(a, b):
+    # multiplication in which 0*inf is 0, since a zero factor is exact
+    if a == 0 or b == 0:
+        return 0
+    else:
+        return a*b
+
+def format_bounds(key, format_):
+    # bounds implied by a format alone
+    if isinstance(format_, RealFormat):
+        if isinstance(format_.range_, Number):
+            return Bounds.opaque(key, format_.range_, lo=-format_.range_, hi=+format_.range_)
+        else:
+            return Bounds.opaque(key, format_.range_)
+    elif isinstance(format_, IntFormat):
+        range_ = max(abs(format_.min_val), abs(format_.max_val))
+        return Bounds.opaque(key, range_, lo=format_.min_val, hi=format_.max_val)
+    else:
+        raise Exception(f'Unknown format type: {format_.__class__.__name__}')
+
+def expr_bounds(expr: ModelExpr, operands, signals=None, key=None):
+    """
+    Computes bounds for an expression given the bounds of its operands.
+
+    :param expr:        Expression to be analyzed.
+    :param operands:    List of Bounds for the operands of the expression.
+    :param signals:     Optional dictionary mapping signal names to their Bounds.  Other signals are only assumed to
+                        be within the range of their formats.
+    :param key:         Optional key used for the terms of the affine form that come from the expression itself.
+                        Defaults to id(expr), so the expression has to be kept alive while the bounds are in use.
+    """
+    # set defaults
+    if signals is None:
+        signals = {}
+    if key is None:
+        key = id(expr)
+
+    if isinstance(expr, Constant):
+        return Bounds.constant(expr.value)
+    elif isinstance(expr, Signal):
+        if expr.name in signals:
+            return signals[expr.name]
+        else:
+            return format_bounds(('signal', expr.name), expr.format_)
+    elif isinstance(expr, Sum):
+        retval = operands[0]
+        for operand in operands[1:]:
+            retval = retval + operand
+
+        # in fixed-point, constants are rounded to their own formats, and each operand is then rounded to the format
+        # of the sum
+        error = [rounding_error(operand.format_) for operand in expr.operands if isinstance(operand, Constant)]
+        error += [rounding_error(expr.format_, retval)]*len(operands)
+        return retval.add_error((ROUNDING, key), range_sum(error))
+    elif isinstance(expr, Product):
+        # multiplication by constants is exact apart from rounding, so the affine form is kept in that case
+        constants = [(operand.lo, constant_error(operand.lo)) for operand in operands if operand.is_constant]
+        others = [operand for operand in operands if not operand.is_constant]
+        k = 1
+        for constant, _ in constants:
+            k *= constant
+        if len(others) == 0:
+            retval = Bounds.constant(k)
+        elif len(others) == 1:
+            retval = others[0].scale(k)
+        else:
+            # otherwise the interval is computed from the products of the ends of the intervals
+            lo, hi = 1, 1
+            for operand in operands:
+                products = [mul_bound(a, b) for a in [lo, hi] for b in [operand.lo, operand.hi]]
+                lo, hi = min(products), max(products)
+            range_ = range_product([operand.affine_range() for operand in operands])
+            retval = Bounds.opaque(key, range_, lo=lo, hi=hi)
+
+        # the constants are rounded to their own formats (an error of e in one constant changes the product by e
+        # times the other factors), and the product is rounded to its format
+        error = [rounding_error(expr.format_, retval)]
+        for i, (_, error_i) in enumerate(constants):
+            factors = [abs(constant) for j, (constant, _) in enumerate(constants) if j != i]
+            factors += [operand.affine_range() for operand in others]
+            error.append(range_product([error_i] + factors))
+        return retval.add_error((ROUNDING, key), range_sum(error))
+    elif isinstance(expr, Array):
+        elements = operands[:-1]
+        retval = Bounds.opaque(key, expr.format_.range_, lo=min(element.lo for element in elements),
+                               hi=max(element.hi for element in elements))
+        # the selected value may be held in a short real
+        error = rounding_error(expr.format_, retval, width=DEF_SHORT_WIDTH_REAL)
+        return retval.add_error((ROUNDING, key), error)
+    elif isinstance(expr, Min):
+        retval = Bounds.opaque(key, expr.format_.range_, lo=min(operand.lo for operand in operands),
+                               hi=min(operand.hi for operand in operands))
+        return retval.add_error((ROUNDING, key), rounding_error(expr.format_, retval))
+    elif isinstance(expr, Max):
+        retval = Bounds.opaque(key, expr.format_.range_, lo=max(operand.lo for operand in operands),
+                               hi=max(operand.hi for operand in operands))
+        return retval.add_error((ROUNDING, key), rounding_error(expr.format_, retval))
+    elif isinstance(expr, SIntToReal):
+        return Bounds.opaque(key, expr.format_.range_, lo=operands[0].lo, hi=operands[0].hi)
+    else:
+        return format_bounds(key, expr.format_)
+
+def tightened_range(expr: ModelExpr, bounds: Bounds):
+    """
+    Returns a tighter range for a real-valued expression based on its bounds, or None if the range cannot be
+    improved.  Only expressions whose width and exponent are determined automatically are considered.
+    """
+    format_ = expr.format_
+    if not (isinstance(format_, RealFormat) and format_.width is None and format_.exponent is None):
+        return None
+
+    # numeric range based on the interval.  this can replace a symbolic range (e.g., at the output of a clamp).  the
+    # interval includes rounding errors, so it is never zero unless the expression is exactly zero, in which case the
+    # range is left as is.
+    range_ = bounds.numeric_range
+    if range_ is not None:
+        if range_ <= 0:
+            return None
+        if isinstance(expr, Array):
+            range_ *= ARRAY_MARGIN
+        if (not isinstance(format_.range_, Number)) or (range_ < format_.range_):
+            return range_
+        else:
+            return None
+
+    # symbolic range based on the affine form.  for sums and products, this is never larger than the range computed
+    # by the format rules (apart from rounding errors), since it is computed the same way, except that terms are
+    # combined first.  the range is only changed if some terms were combined, and then the rounding errors are
+    # included.
+    if isinstance(expr, (Sum, Product)):
+        if not same_range(bounds.affine_range(rounding=False), format_.range_):
+            return bounds.affine_range()
+
+    return None
+
+def same_range(a, b):
+    """
+    Returns True if two ranges (numbers or RangeExprs) are known to be the same.
+    """
+    return (a is b) or (format_key(RealFormat(range_=a)) == format_key(RealFormat(range_=b)))
+
+def tighten_expr(expr: ModelExpr, signals=None, memo=None):
+    """
+    Tightens the ranges of the real-valued subexpressions of an expression using interval and affine arithmetic.  The
+    expression itself is not modified: subexpressions whose ranges can be improved are rebuilt with new formats (see
+    with_format), as are the operators above them, while the rest of the tree is shared with the original expression.
+
+    :param expr:    Expression to be analyzed.
+    :param signals: Optional dictionary mapping signal names to their Bounds.
+    :param memo:    Optional dictionary used to cache the results for subexpressions (by object identity).  Sharing
+                    the same dictionary between expressions preserves the sharing of their common subexpressions.
+    :return:        Tuple (expr, bounds) containing the new expression and its Bounds.
+    """
+    def combine(node, results):
+        if not isinstance(node, ModelOperator):
+            return node, expr_bounds(node, [], signals=signals)
+
+        # rebuild the node if any of its operands changed.  the terms that come from the node are identified by the
+        # original node, which is kept alive by the memo.
+        rebuilt = with_operands(node, [operand for operand, _ in results])
+        bounds = expr_bounds(rebuilt, [operand_bounds for _, operand_bounds in results], signals=signals,
+                             key=id(node))
+        range_ = tightened_range(rebuilt, bounds)
+        if range_ is not None:
+            rebuilt = with_format(rebuilt, RealFormat(range_=range_))
+        return rebuilt, bounds
+
+    children = lambda node: node.operands if isinstance(node, ModelOperator) else []
+    return transform_expr(expr, children, combine, memo)
+
+def main():
+    from msdsl.expr.signals import AnalogSignal
+    from msdsl.expr.expr import clamp_op
+
+    a = AnalogSignal('a', range_=2.0)
+    b = AnalogSignal('b')
+
+    # the terms in "a" cancel out
+    expr = 0.75*a + 0.25*(a + b) - a
+    print(expr.format_)
+    print(tighten_expr(expr)[0].format_)
+
+    # clamping gives a numeric range
+    expr = clamp_op(b, -1.5, 0.5)
+    print(expr.format_)
+    print(tighten_expr(expr)[0].format_)
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,22 @@ from collections import OrderedDict
 
 from msdsl.expr.expr import Constant, Sum, sum_op, Product
 from msdsl.expr.signals import Signal
+from msdsl.expr.traverse import transform_expr
 
 def distribute_mult(expr):
+    # distribute multiplication in a bottom-up fashion
+    return transform_expr(expr, distribute_children, distribute_combine)
+
+def distribute_children(expr):
+    if isinstance(expr, Sum) or (isinstance(expr, Product) and len(expr.operands) == 2):
+        return expr.operands
+    else:
+        return []
+
+def distribute_combine(expr, operands):
     if isinstance(expr, Sum):
-        # distribute multiplication in a bottom-up fashion
-        operands = [distribute_mult(operand) for operand in expr.operands]
         return sum_op(operands)
     elif isinstance(expr, Product) and len(expr.operands) == 2:
-        # distribute multiplication in a bottom-up fashion
-        operands = [distribute_mult(operand) for operand in expr.operands]
-
         if isinstance(operands[0], Constant) and isinstance(operands[1], Sum):
             const, sum_operands = operands[0], operands[1].operands
         elif isinstance(operands[1], Constant) and isinstance(operands[0], Sum):
@@ -39,7 +45,6 @@ def extract_coeffs(expr: Sum):
             others.append(expr)
     else:
         for operand in expr.operands:
-            print(operand, type(operand))
             if isinstance(operand, Signal):
                 pairs.append((1, operand))
             elif isinstance(operand, Product) and len(operand.operands) == 2:
@@ -62,6 +67,44 @@ def extract_coeffs_from_product(p: Product):
     else:
         return None
 
+def linear_coeffs(terms):
+    """
+    Extracts the coefficients of a linear combination of signals in a single pass, without building intermediate
+    expressions (unlike distribute_mult followed by extract_coeffs).  Sums are expanded, and products are expanded if
+    all but one of their operands are constants, with the constants being applied to the coefficients of the terms
+    of the remaining operand.
+
+    :param terms:   List of (scale, expr) tuples, representing the sum of scale*expr.  For example, an equation
+                    lhs == rhs can be analyzed by passing [(+1, lhs), (-1, rhs)].
+    :return:        Tuple (coeffs, others), where coeffs maps signal names to their total coefficients, and others is a
+                    list of (scale, expr) tuples for terms that are not linear in a signal.
+    """
+    coeffs, others = {}, []
+
+    stack = list(reversed(terms))
+    while len(stack) > 0:
+        scale, expr = stack.pop()
+        if isinstance(expr, Signal):
+            coeffs[expr.name] = coeffs.get(expr.name, 0) + scale
+        elif isinstance(expr, Sum):
+            stack.extend((scale, operand) for operand in reversed(expr.operands))
+        elif isinstance(expr, Product):
+            non_constants = [operand for operand in expr.operands if not isinstance(operand, Constant)]
+            if len(non_constants) == 1:
+                for operand in expr.operands:
+                    if isinstance(operand, Constant):
+                        scale = scale*operand.value
+                stack.append((scale, non_constants[0]))
+            else:
+                others.append((scale, expr))
+        elif isinstance(expr, Constant) and expr.value == 0:
+            # zero terms (e.g., the right-hand side of "x == 0") do not contribute anything
+            continue
+        else:
+            others.append((scale, expr))
+
+    return coeffs, others
+
 def collect_terms(expr):
     # only apply this operation to Sum expressions
     if not isinstance(expr, Sum):
@@ -101,6 +144,9 @@ def main():
     print('pairs: ' + str({k: v.name for k, v in pairs}))
     print('others: ' + str([str(other) for other in others]))
 
+    coeffs, others = linear_coeffs([(+1, a+3*(b-c)), (-1, 2*(d+a))])
+    print('coeffs: ' + str(coeffs))
+
     def simplify(expr):
         return collect_terms(distribute_mult(expr))
 
@@ -1,5 +1,6 @@
 from pathlib import Path
 from math import ceil, log2
+import numpy as np
 from svreal import (RealType, fixed2real, real2fixed,
                     real2recfn, recfn2real, DEF_HARD_FLOAT_SIG_WIDTH,
                     DEF_HARD_FLOAT_EXP_WIDTH)
@@ -251,3 +252,18 @@ class RealTable(Table):
 
         # return the exponent
         return exp
+
+def table_values(table: Table):
+    """
+    Returns the contents of a table as an array of integers, padded with zeros out to the full address range.  The
+    values of a RealTable are given as signed fixed-point integers, since that is how they appear in the memory file.
+    """
+    if isinstance(table, RealTable):
+        offset = 1<<(table.width-1)
+        mask = (1<<table.width)-1
+        vals = [((real2fixed(val, exp=table.exp, width=table.width, treat_as_unsigned=True) + offset) & mask) - offset
+                for val in table.vals]
+    else:
+        vals = [int(val) for val in table.vals]
+    vals += [0]*((1<<table.addr_bits) - len(vals))
+    return np.array(vals, dtype=np.int64)
@@ -0,0 +1,71 @@
+def iter_expr(expr, children, unique=False):
+    """
+    Iterates over the nodes of an expression tree in pre-order (i.e., each node comes before its children, and
+    children are visited from left to right).  An explicit stack is used rather than recursion, so there is no limit
+    on the depth of the tree.
+
+    :param expr:        Root of the tree.
+    :param children:    Function that returns the list of children of a node.
+    :param unique:      If True, nodes that appear in several places (as the same object) are only visited the first
+                        time that they appear.  Otherwise they are visited each time.
+    """
+    visited = set()
+    stack = [expr]
+    while len(stack) > 0:
+        node = stack.pop()
+        if unique:
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+        yield node
+        stack.extend(reversed(children(node)))
+
+def transform_expr(expr, children, combine, memo=None):
+    """
+    Computes a result for each node of an expression tree in post-order (i.e., children first, from left to right),
+    and returns the result for the root.  An explicit stack is used rather than recursion, so there is no limit on
+    the depth of the tree.  The result for a node that appears in several places (as the same object) is only
+    computed once.
+
+    :param expr:        Root of the tree.
+    :param children:    Function that returns the list of children of a node whose results are needed to compute
+                        the result of the node itself.  It is called once per node.
+    :param combine:     Function called as combine(node, results), where results is a list of the results for the
+                        children of the node, which returns the result for the node.
+    :param memo:        Optional dictionary mapping id(node) to a tuple (node, result).  Nodes that are already in the
+                        dictionary are not visited again, so the same dictionary can be shared across several calls.
+                        The node is stored along with its result so that its id is not reused.
+    """
+    # set defaults
+    if memo is None:
+        memo = {}
+
+    # the children of nodes that have been expanded, but not yet combined
+    pending = {}
+
+    stack = [expr]
+    while len(stack) > 0:
+        node = stack[-1]
+        if id(node) in memo:
+            stack.pop()
+        elif id(node) in pending:
+            stack.pop()
+            results = [memo[id(child)][1] for child in pending.pop(id(node))]
+            memo[id(node)] = (node, combine(node, results))
+        else:
+            # the node is combined once all of its children have been processed.  since children are pushed in
+            # reverse order, they are processed from left to right.
+            pending[id(node)] = list(children(node))
+            stack.extend(reversed(pending[id(node)]))
+
+    return memo[id(expr)][1]
+
+def main():
+    # add up the leaves of a nested list without recursion
+    tree = [1, [2, [3, 4]], 5]
+    children = lambda node: node if isinstance(node, list) else []
+    print(list(iter_expr(tree, children)))
+    print(transform_expr(tree, children, lambda node, results: sum(results) if isinstance(node, list) else node))
+
+if __name__ == '__main__':
+    main()
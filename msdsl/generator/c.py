@@ -0,0 +1,1121 @@
+from typing import List, Union
+from numbers import Number, Integral
+from pathlib import Path
+import ctypes
+import datetime
+import json
+import random
+import subprocess
+import numpy as np
+
+from svreal import RealType, DEF_SHORT_WIDTH_REAL
+from msdsl.generator.generator import CodeGenerator
+from msdsl.expr.expr import ModelExpr, wrap_constant, Constant, \
+    ArithmeticOperator, ComparisonOperator, BitwiseOperator, Concatenate, Array, \
+    TypeConversion, SIntToReal, UIntToSInt, BitwiseInv, ArithmeticShift, \
+    BitwiseAccess, RealToSInt, SIntToUInt, BitwiseAnd, BitwiseOr, BitwiseXor, \
+    ArithmeticRightShift, ArithmeticLeftShift, LessThan, LessThanOrEquals, \
+    GreaterThan, GreaterThanOrEquals, EqualTo, NotEqualTo, Sum, Product, Min, \
+    Max, CompressUInt, RandomInteger, MT19937, LCG
+from msdsl.expr.table import Table, RealTable, table_values
+from msdsl.expr.format import UIntFormat, SIntFormat, RealFormat, IntFormat
+from msdsl.expr.signals import Signal, AnalogSignal, DigitalSignal, AnalogInput, AnalogOutput, DigitalOutput, \
+    DigitalInput, DigitalParameter, RealParameter
+from msdsl.generator.tree_op import tree_op
+from msdsl.generator.svreal import eval_range_expr
+from msdsl.sim.fixed import (FixedPointEvaluator, FormatLookup, fixed_format, width_exp_format, from_real,
+                             assign_real)
+
+BITWISE_OP = {
+    BitwiseAnd: '&',
+    BitwiseOr: '|',
+    BitwiseXor: '^'
+}
+
+SHIFT_OP = {
+    ArithmeticLeftShift: '<<',
+    ArithmeticRightShift: '>>'
+}
+
+COMP_OP = {
+    LessThan: '<',
+    LessThanOrEquals: '<=',
+    GreaterThan: '>',
+    GreaterThanOrEquals: '>=',
+    EqualTo: '==',
+    NotEqualTo: '!='
+}
+
+# C keywords and names used by the generated code itself, which cannot be used for signals
+RESERVED_NAMES = {
+    'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do', 'double', 'else', 'enum', 'extern',
+    'float', 'for', 'goto', 'if', 'inline', 'int', 'long', 'register', 'restrict', 'return', 'short', 'signed',
+    'sizeof', 'static', 'struct', 'switch', 'typedef', 'union', 'unsigned', 'void', 'volatile', 'while', 's', 'k',
+    'n', 'real_in', 'digital_in', 'real_out', 'digital_out', 'real_params', 'digital_params', 'real_t',
+    'state_t', 'step', 'step_impl', 'run', 'init_state', 'state_size', 'model_info', 'wrap_sint', 'wrap_uint',
+    'shl', 'frexp', 'floor', 'ldexp'
+}
+
+HEADER = '''\
+#include <stdint.h>
+#include <string.h>
+#include <math.h>
+
+static inline int64_t wrap_sint(int64_t v, int w) {
+    return ((int64_t) (((uint64_t) v) << (64-w))) >> (64-w);
+}
+
+static inline int64_t wrap_uint(int64_t v, int w) {
+    return (w >= 64) ? v : ((int64_t) (((uint64_t) v) & ((UINT64_C(1) << w) - 1)));
+}
+
+static inline int64_t shl(int64_t v, int n) {
+    return (int64_t) (((uint64_t) v) << n);
+}
+'''
+
+class CGenerator(CodeGenerator):
+    """
+    Generates C code that simulates the model, as an alternative to generating SystemVerilog.  The generated file
+    defines a state_t structure along with the following functions, which are intended to be called through ctypes
+    (see CModel):
+
+    size_t state_size(void): size of state_t in bytes.
+    const char* model_info(void): JSON description of the inputs, outputs, and parameters of the model.
+    void init_state(state_t* s, const real_t* real_params, const int64_t* digital_params)
+    void step(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out)
+    void run(state_t* s, int64_t n, const real_t* real_in, const int64_t* digital_in, real_t* real_out,
+             int64_t* digital_out): runs step() for n cycles, with inputs and outputs stored cycle by cycle.
+
+    Real numbers are represented either as doubles (RealType.FloatReal), matching Simulator with the same real type,
+    or as fixed-point int64 values (RealType.FixedPoint), reproducing svreal's fixed-point arithmetic exactly.  In
+    the latter case, the formats of all signals are determined when the code is generated, so the ranges of analog
+    inputs and outputs must be provided, and real parameters take on the values given here.
+
+    :param real_type:   Representation of real numbers: RealType.FloatReal (default) or RealType.FixedPoint.
+    :param ranges:      Dictionary mapping the names of analog inputs and outputs to their ranges.  Only used with
+                        RealType.FixedPoint.
+    :param params:      Dictionary mapping real parameter names to their values.  Only used with
+                        RealType.FixedPoint; parameters that are not listed take on their default values.
+    """
+
+    extension = 'c'
+    sequential = True
+    streamable = False
+
+    def __init__(self, *args, real_type=RealType.FloatReal, ranges=None, params=None, **kwargs):
+        # set defaults
+        if ranges is None:
+            ranges = {}
+        if params is None:
+            params = {}
+
+        # call the super constructor
+        super().__init__(*args, **kwargs)
+
+        # save settings
+        if real_type not in {RealType.FloatReal, RealType.FixedPoint}:
+            raise Exception(f'Unsupported real type: {real_type}')
+        self.real_type = real_type
+        self.ranges = ranges
+        self.params = params
+
+        # fixed-point formats of signals are determined by an evaluator, which is created when the module starts.
+        # the formats of temporary signals are tracked separately.
+        self.signals = {}
+        self.evaluator = None
+        self.formats = {}
+
+        # code placed in other parts of the file, which is assembled by end_module
+        self.name = None
+        self.ios = []
+        self.real_params = []
+        self.digital_params = []
+        self.fields = []
+        self.tables = []
+        self.inits = []
+        self.registers = []
+        self.updates = []
+        self.probes = []
+
+    @property
+    def fixed(self):
+        return self.real_type == RealType.FixedPoint
+
+    @property
+    def real_c_type(self):
+        return 'int64_t' if self.fixed else 'double'
+
+    def make_section(self, label):
+        self.comment(label)
+
+    def expr_to_signal(self, expr: ModelExpr):
+        # before starting, make sure that the expression is wrapped in case it is a number
+        expr = wrap_constant(expr)
+
+        if isinstance(expr, Signal):
+            return expr
+        elif isinstance(expr, Constant):
+            return self.make_constant(expr)
+        elif isinstance(expr, ArithmeticOperator):
+            return self.make_arithmetic_operator(expr)
+        elif isinstance(expr, CompressUInt):
+            return self.make_compress_uint(expr)
+        elif isinstance(expr, RandomInteger):
+            return self.make_random_integer(expr)
+        elif isinstance(expr, BitwiseInv):
+            return self.make_bitwise_inv(expr)
+        elif isinstance(expr, BitwiseOperator):
+            return self.make_bitwise_operator(expr)
+        elif isinstance(expr, ComparisonOperator):
+            return self.make_comparison_operator(expr)
+        elif isinstance(expr, Concatenate):
+            return self.make_concatenation(expr)
+        elif isinstance(expr, Array):
+            return self.make_array(expr)
+        elif isinstance(expr, ArithmeticShift):
+            return self.make_arithmetic_shift(expr)
+        elif isinstance(expr, BitwiseAccess):
+            return self.make_bitwise_access(expr)
+        elif isinstance(expr, TypeConversion):
+            return self.make_type_conversion(expr)
+        else:
+            raise Exception(f'Unknown expression type: {expr.__class__.__name__}')
+
+    def make_signal(self, signal: Signal):
+        # variables are declared when they are assigned, but their names have to be valid
+        self.check_name(signal.name)
+        self.signals[signal.name] = signal
+
+    def make_probe(self, s: Signal):
+        if isinstance(s, Signal):
+            self.probes.append(s)
+        else:
+            raise Exception('Invalid signal type.')
+
+    def make_assign(self, input_: Signal, output: Signal, check_format=True):
+        if isinstance(input_.format_, RealFormat) and isinstance(output.format_, RealFormat):
+            self.declare(output, self.align(input_, self.format_of(output)))
+        elif ((not check_format) or
+              ((isinstance(input_.format_, SIntFormat) and isinstance(output.format_, SIntFormat)) or
+               (isinstance(input_.format_, UIntFormat) and isinstance(output.format_, UIntFormat)))):
+            self.declare(output, self.wrap(input_.name, output.format_))
+        else:
+            raise Exception(f'Input and output formats do not match: {input_.name} with {input_.format_} vs. {output.name} with {output.format_}')
+
+    def make_mem(self, next_: Signal, curr: Signal, init: Union[Number, DigitalParameter, RealParameter]=0,
+                 clk: Signal=None, rst: Signal=None, ce: Signal = None, check_format=True):
+        # determine the value stored in the register
+        if isinstance(next_.format_, RealFormat) and isinstance(curr.format_, RealFormat):
+            value = self.align(next_, self.format_of(curr))
+        elif ((not check_format) or
+              ((isinstance(next_.format_, SIntFormat) and isinstance(curr.format_, SIntFormat)) or
+              (isinstance(next_.format_, UIntFormat) and isinstance(curr.format_, UIntFormat)))):
+            value = self.wrap(next_.name, curr.format_)
+        else:
+            raise Exception(
+                f'Next and current formats do not match: {next_.name} '
+                f'with {next_.format_} vs. {curr.name} with {curr.format_}'
+            )
+
+        # initialize the register
+        init_str = self.init_str(init, curr)
+        self.make_register(curr, init_str)
+
+        # the clock enable and reset are applied to the value, in that order.  the reset value is stored in the
+        # state, since it may depend on parameters.
+        if ce is not None:
+            value = f'({self.control_str(ce)}) ? ({value}) : {curr.name}'
+        if rst is not None:
+            self.fields.append(f'{self.c_type(curr.format_)} {self.init_name(curr)};')
+            self.inits.append(f's->{self.init_name(curr)} = {init_str};')
+            value = f'({self.control_str(rst)}) ? s->{self.init_name(curr)} : ({value})'
+
+        # update the register
+        self.writeln(f's->{curr.name} = {value};')
+
+    def make_sync_rom(self, signal: Signal, table: Table, addr: Signal,
+                      clk: Signal=None, ce: Signal=None):
+        # store the contents of the table in the file.  real numbers are quantized in the same way as when they
+        # are written to a memory file.
+        vals = table_values(table)
+        if isinstance(table, RealTable):
+            if self.fixed:
+                vals = assign_real(vals, width_exp_format(table.width, table.exp), self.format_of(signal))
+            else:
+                vals = np.ldexp(vals, table.exp)
+        vals = self.make_table(vals, signal.format_)
+
+        # update the output
+        self.make_register(signal, '0')
+        value = f'{vals}[{addr.name} & {(1<<table.addr_bits)-1}]'
+        if ce is not None:
+            value = f'({self.control_str(ce)}) ? {value} : {signal.name}'
+        self.writeln(f's->{signal.name} = {value};')
+
+    def make_sync_ram(self, signal: AnalogSignal, format_: RealFormat, addr: DigitalSignal,
+                      clk: DigitalSignal=None, ce: DigitalSignal=None, we: DigitalSignal=None,
+                      din: DigitalSignal=None):
+        # the memory stores signed integers
+        mem = self.init_name(signal)
+        self.fields.append(f'int64_t {mem}[{1<<addr.format_.width}];')
+        self.make_register(signal, '0')
+
+        # read happens before write
+        data = Signal(name=next(self.namer), format_=format_)
+        self.formats[data.name] = width_exp_format(format_.width, format_.exponent)
+        self.writeln(f'const int64_t {data.name} = s->{mem}[{addr.name}];')
+        if self.fixed:
+            value = self.align(data, self.format_of(signal))
+        else:
+            value = f'ldexp((double) {data.name}, {format_.exponent})'
+        if ce is not None:
+            value = f'({self.control_str(ce)}) ? ({value}) : {signal.name}'
+        self.writeln(f's->{signal.name} = {value};')
+
+        # write data if needed
+        if we is not None:
+            din_name = din.name if din is not None else '0'
+            self.writeln(f'if (({self.control_str(ce, 1)}) && ({self.control_str(we)})) {{')
+            self.indent()
+            self.writeln(f's->{mem}[{addr.name}] = {self.wrap(din_name, SIntFormat(width=format_.width))};')
+            self.dedent()
+            self.writeln('}')
+
+    def start_module(self, name: str, ios: List[Signal], real_params: List, digital_params: List=None):
+        # set defaults
+        if digital_params is None:
+            digital_params = []
+
+        # save settings
+        self.name = name
+        self.ios = ios
+        self.real_params = real_params
+        self.digital_params = digital_params
+
+        # check names that appear in the generated code
+        for signal in ios + real_params + digital_params:
+            self.make_signal(signal)
+        for real_param in real_params:
+            self.check_name(real_param.param_name)
+
+        # create the evaluator used to determine fixed-point formats
+        if self.fixed:
+            params = {real_param.param_name: self.params.get(real_param.param_name, real_param.default)
+                      for real_param in real_params}
+            unknown = set(self.params.keys()) - set(params.keys())
+            assert len(unknown) == 0, f'Unknown parameter(s): {sorted(unknown)}.'
+            self.evaluator = FixedPointEvaluator(signals=self.signals, ranges=self.ranges, params=params)
+
+        # the body of the step function is indented
+        self.indent()
+
+    def end_module(self):
+        self.dedent()
+
+        # the code written so far is the body of the step function
+        body = self.text
+        self.text = ''
+
+        # determine the order of inputs and outputs
+        real_inputs = [io for io in self.ios if isinstance(io, AnalogInput)]
+        digital_inputs = [io for io in self.ios if isinstance(io, DigitalInput)]
+        outputs = [io for io in self.ios if isinstance(io, (AnalogOutput, DigitalOutput))] + self.probes
+        real_outputs = [signal for signal in outputs if isinstance(signal.format_, RealFormat)]
+        digital_outputs = [signal for signal in outputs if isinstance(signal.format_, IntFormat)]
+
+        # print header
+        self.comment(f'Model generated on {datetime.datetime.now()}')
+        self.writeln()
+        self.write(HEADER)
+        self.writeln()
+        self.writeln(f'typedef {self.real_c_type} real_t;')
+        self.writeln()
+
+        # lookup tables
+        if len(self.tables) > 0:
+            self.comment('Lookup tables')
+            for line in self.tables:
+                self.writeln(line)
+            self.writeln()
+
+        # state of the model
+        self.writeln('typedef struct {')
+        self.indent()
+        for real_param in self.real_params:
+            self.writeln(f'real_t {real_param.signal_name};')
+        for dig_param in self.digital_params:
+            self.writeln(f'int64_t {dig_param.name};')
+        for line in self.fields:
+            self.writeln(line)
+        self.writeln('int64_t zzz_unused;')
+        self.dedent()
+        self.writeln('} state_t;')
+        self.writeln()
+
+        # description of the model
+        info = {
+            'name': self.name,
+            'real_type': self.real_type.value,
+            'real_inputs': [self.signal_info(signal) for signal in real_inputs],
+            'digital_inputs': [self.signal_info(signal) for signal in digital_inputs],
+            'real_outputs': [self.signal_info(signal) for signal in real_outputs],
+            'digital_outputs': [self.signal_info(signal) for signal in digital_outputs],
+            'real_params': [self.param_info(param) for param in self.real_params],
+            'digital_params': [{'name': param.name, 'default': param.default} for param in self.digital_params]
+        }
+        info = json.dumps(info).replace('\\', '\\\\').replace('"', '\\"')
+        self.writeln('size_t state_size(void) {')
+        self.writeln(f'{self.tab_string}return sizeof(state_t);')
+        self.writeln('}')
+        self.writeln()
+        self.writeln('const char* model_info(void) {')
+        self.writeln(f'{self.tab_string}return "{info}";')
+        self.writeln('}')
+        self.writeln()
+
+        # function used to initialize the state
+        self.writeln('void init_state(state_t* s, const real_t* real_params, const int64_t* digital_params) {')
+        self.indent()
+        self.writeln('memset(s, 0, sizeof(state_t));')
+        for k, real_param in enumerate(self.real_params):
+            if self.fixed:
+                # the value of the parameter was fixed when the code was generated
+                self.writeln(f'const real_t {real_param.param_name} = {self.fixed_param_value(real_param)};')
+            else:
+                self.writeln(f'const real_t {real_param.param_name} = real_params[{k}];')
+            self.writeln(f's->{real_param.signal_name} = {real_param.param_name};')
+        for k, dig_param in enumerate(self.digital_params):
+            self.writeln(f'const int64_t {dig_param.name} = digital_params[{k}];')
+            self.writeln(f's->{dig_param.name} = {dig_param.name};')
+        for line in self.inits:
+            self.writeln(line)
+        self.dedent()
+        self.writeln('}')
+        self.writeln()
+
+        # function used to simulate one cycle
+        self.writeln('static inline void step_impl(state_t* s, const real_t* real_in, const int64_t* digital_in, '
+                     'real_t* real_out, int64_t* digital_out) {')
+        self.indent()
+        self.comment('Load the state')
+        for real_param in self.real_params:
+            self.writeln(f'const real_t {real_param.signal_name} = s->{real_param.signal_name};')
+        for dig_param in self.digital_params:
+            self.writeln(f'const int64_t {dig_param.name} = s->{dig_param.name};')
+        for signal in self.registers:
+            self.writeln(f'const {self.c_type(signal.format_)} {signal.name} = s->{signal.name};')
+        self.comment('Read inputs')
+        for k, signal in enumerate(real_inputs):
+            self.writeln(f'const real_t {signal.name} = real_in[{k}];')
+        for k, signal in enumerate(digital_inputs):
+            self.writeln(f'const int64_t {signal.name} = digital_in[{k}];')
+        self.write(self.line_ending)
+        self.dedent()
+        self.write(body)
+        self.indent()
+        if len(self.updates) > 0:
+            self.write(self.line_ending)
+            self.comment('Update random number generators')
+            for line in self.updates:
+                self.writeln(line)
+        self.write(self.line_ending)
+        self.comment('Write outputs')
+        for k, signal in enumerate(real_outputs):
+            self.writeln(f'real_out[{k}] = {signal.name};')
+        for k, signal in enumerate(digital_outputs):
+            self.writeln(f'digital_out[{k}] = {signal.name};')
+        self.dedent()
+        self.writeln('}')
+        self.writeln()
+
+        # exported functions
+        self.writeln('void step(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, '
+                     'int64_t* digital_out) {')
+        self.writeln(f'{self.tab_string}step_impl(s, real_in, digital_in, real_out, digital_out);')
+        self.writeln('}')
+        self.writeln()
+        self.writeln('void run(state_t* s, int64_t n, const real_t* real_in, const int64_t* digital_in, '
+                     'real_t* real_out, int64_t* digital_out) {')
+        self.indent()
+        self.writeln('for (int64_t k=0; k<n; k++) {')
+        self.indent()
+        self.writeln(f'step_impl(s, real_in + k*{len(real_inputs)}, digital_in + k*{len(digital_inputs)}, '
+                     f'real_out + k*{len(real_outputs)}, digital_out + k*{len(digital_outputs)});')
+        self.dedent()
+        self.writeln('}')
+        self.dedent()
+        self.writeln('}')
+
+    def make_constant(self, expr: Constant):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+
+        if isinstance(expr.format_, RealFormat):
+            if self.fixed:
+                # the format and value are determined in the same way as in the fixed-point evaluator
+                value = self.evaluator.compile_expr(expr)
+                self.formats[output.name] = value.format_
+                self.declare(output, str(int(value(None))))
+            else:
+                self.declare(output, repr(float(expr.value)))
+        elif isinstance(expr.format_, IntFormat):
+            self.declare(output, self.int_literal(expr.value))
+        else:
+            raise ValueError(f'Unknown expression format type: ' + expr.format_.__class__.__name__)
+
+        return output
+
+    def make_arithmetic_operator(self, expr: ArithmeticOperator):
+        # first check for some special cases involving multiplication, which affect the fixed-point formats
+        if self.fixed and isinstance(expr, Product) and (len(expr.operands) == 2) and \
+                isinstance(expr.format_, RealFormat):
+            if isinstance(expr.operands[0], Constant) or isinstance(expr.operands[1], Constant):
+                return self.make_constant_mul_signal(expr=expr)
+            elif (isinstance(expr.operands[0], Array) and expr.operands[0].all_constants) or \
+                 (isinstance(expr.operands[1], Array) and expr.operands[1].all_constants):
+                return self.make_constant_array_mul_signal(expr=expr)
+
+        # compile the inputs to signals
+        inputs_ = [self.expr_to_signal(operand) for operand in expr.operands]
+
+        # define the operator used to build up the expression
+        def operator(a, b):
+            c = Signal(name=next(self.namer), format_=expr.function(a.format_, b.format_))
+
+            if isinstance(expr.format_, RealFormat) and self.fixed:
+                fa = self.format_of(a)
+                fb = self.format_of(b)
+                if isinstance(expr, Sum):
+                    # ADD_REAL
+                    fc = fixed_format(fa.range_ + fb.range_)
+                    value = self.wrap_fixed(f'{self.align(a, fc)} + {self.align(b, fc)}', fc)
+                elif isinstance(expr, Product):
+                    # MUL_REAL
+                    fc = fixed_format(fa.range_ * fb.range_)
+                    value = self.mul_real(a, b, fc)
+                elif isinstance(expr, (Min, Max)):
+                    # MIN_REAL and MAX_REAL
+                    fc = fixed_format(max(fa.range_, fb.range_))
+                    op = '<' if isinstance(expr, Min) else '>'
+                    value = f'({self.to_double(a)} {op} {self.to_double(b)}) ? {self.align(a, fc)} : ' \
+                            f'{self.align(b, fc)}'
+                else:
+                    raise Exception(f'Unknown arithmetic operator: {expr.__class__.__name__}')
+                self.formats[c.name] = fc
+            elif isinstance(expr, Sum):
+                value = f'{a.name} + {b.name}' if isinstance(expr.format_, RealFormat) else \
+                    f'(int64_t) (((uint64_t) {a.name}) + ((uint64_t) {b.name}))'
+            elif isinstance(expr, Product):
+                value = f'{a.name} * {b.name}' if isinstance(expr.format_, RealFormat) else \
+                    f'(int64_t) (((uint64_t) {a.name}) * ((uint64_t) {b.name}))'
+            elif isinstance(expr, Min):
+                value = f'({a.name} < {b.name}) ? {a.name} : {b.name}'
+            elif isinstance(expr, Max):
+                value = f'({a.name} > {b.name}) ? {a.name} : {b.name}'
+            else:
+                raise Exception(f'Unknown arithmetic operator: {expr.__class__.__name__}')
+
+            self.declare(c, value)
+            return c
+
+        # apply the operator in a tree-wise fashion, as in the generated SystemVerilog
+        output = tree_op(operands=inputs_, operator=operator)
+
+        # truncate integer results to the width of the output
+        if isinstance(expr.format_, IntFormat):
+            return self.make_wrap(output, expr.format_)
+        else:
+            return output
+
+    def make_constant_mul_signal(self, expr: Product):
+        # figure out which operand is the constant and which is the signal
+        if isinstance(expr.operands[0], Constant):
+            constant = expr.operands[0]
+            signal = self.expr_to_signal(expr.operands[1])
+        else:
+            constant = expr.operands[1]
+            signal = self.expr_to_signal(expr.operands[0])
+
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        in_format = self.format_of(signal)
+
+        if constant.value == -1:
+            # NEGATE_REAL
+            self.formats[output.name] = in_format
+            self.declare(output, self.wrap_fixed(f'-{signal.name}', in_format))
+        else:
+            # MUL_CONST_REAL: the constant is represented with a short width
+            const_range = 1.01*abs(float(constant.value))
+            const = Signal(name=next(self.namer), format_=constant.format_)
+            self.formats[const.name] = fixed_format(const_range, DEF_SHORT_WIDTH_REAL)
+            self.declare(const, str(int(from_real(float(constant.value), self.formats[const.name]))))
+
+            # the output range is computed from the constant itself, rather than from its representation
+            self.formats[output.name] = fixed_format(const_range*in_format.range_)
+            self.declare(output, self.mul_real(const, signal, self.formats[output.name]))
+
+        return output
+
+    def make_constant_array_mul_signal(self, expr: Product):
+        # figure out which operand is the constant array and which is the signal
+        if isinstance(expr.operands[0], Array) and expr.operands[0].all_constants:
+            constant_array = expr.operands[0]
+            signal = self.expr_to_signal(expr.operands[1])
+        else:
+            constant_array = expr.operands[1]
+            signal = self.expr_to_signal(expr.operands[0])
+
+        # the selected value is held in a short real number
+        range_ = eval_range_expr(constant_array.format_.range_, ranges=FormatLookup(self.evaluator, 'range_'),
+                                 params=self.evaluator.params)
+        array = Signal(name=next(self.namer), format_=constant_array.format_)
+        self.formats[array.name] = fixed_format(range_, DEF_SHORT_WIDTH_REAL)
+        values = [from_real(float(element.value), self.formats[array.name]) for element in constant_array.elements]
+        self.make_lookup(array, values, constant_array.address)
+
+        # multiply the array by the signal
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        self.formats[output.name] = fixed_format(self.formats[array.name].range_ * self.format_of(signal).range_)
+        self.declare(output, self.mul_real(array, signal, self.formats[output.name]))
+        return output
+
+    def make_compress_uint(self, expr: CompressUInt):
+        input_ = self.expr_to_signal(expr.operand)
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        in_width = expr.operand.format_.width
+
+        if self.fixed:
+            # number of bits needed to represent the input, and the bits following the leading one
+            count = next(self.namer)
+            self.writeln(f'const int64_t {count} = ({input_.name} == 0) ? 0 : '
+                         f'(64 - __builtin_clzll((uint64_t) {input_.name}));')
+            aligned = f'shl({input_.name}, {in_width} - {count}) & {self.int_literal((1<<(in_width-1))-1)}'
+
+            # combine the two parts and assign to the output
+            data = Signal(name=next(self.namer), format_=expr.format_)
+            self.formats[data.name] = RealFormat(range_=in_width+1, width=in_width+1+int(in_width).bit_length(),
+                                                 exponent=-in_width+1)
+            self.declare(data, f'shl({count}, {in_width-1}) | ({aligned})')
+            self.formats[output.name] = fixed_format(in_width+1)
+            self.declare(output, self.align(data, self.formats[output.name]))
+        else:
+            # write the input as m*(2**e), where 0.5 <= m < 1, so that e is the number of bits needed to represent
+            # the input.  then the fractional part of the result is determined by the bits following the leading one
+            exponent = next(self.namer)
+            mantissa = next(self.namer)
+            self.writeln(f'int {exponent};')
+            self.writeln(f'const double {mantissa} = frexp((double) {input_.name}, &{exponent});')
+            self.declare(output, f'({exponent} == 0) ? 0.0 : ({exponent} + 2*{mantissa} - 1)')
+
+        return output
+
+    def make_random_integer(self, expr: RandomInteger):
+        # validate input
+        assert expr.format_.width == 32, 'Only width 32 is supported at this time.'
+        if isinstance(expr, MT19937):
+            raise Exception('MT19937 is not supported by CGenerator; consider using lcg_op instead.')
+        elif not isinstance(expr, LCG):
+            raise Exception(f'Unsupported expression: {expr}')
+
+        # the state of the generator is stored under the name of its output
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        core = self.init_name(output)
+
+        # determine the seed, which has to be known when the state is initialized
+        param_names = [dig_param.name for dig_param in self.digital_params]
+        if expr.seed is None:
+            seed = str(random.randint(0, (1<<expr.format_.width)-1))
+        elif isinstance(expr.seed, Integral):
+            assert 0 <= expr.seed <= ((1<<expr.format_.width)-1), \
+                'Seed is out of range.'
+            seed = str(expr.seed)
+        elif self.control_str(expr.seed) in param_names:
+            seed = self.control_str(expr.seed)
+        else:
+            raise Exception(f'The seed of random number generator {output.name} must be a constant or parameter.')
+
+        # create the generator
+        self.fields.append(f'int64_t {core};')
+        self.inits.append(f's->{core} = {seed} & 0xffffffff;')
+
+        # read the output.  the generator is updated at the end of the cycle.
+        self.declare(output, f's->{core}')
+        self.updates.append(f's->{core} = ({self.control_str(expr.rst, 0)}) ? ({seed} & 0xffffffff) : '
+                            f'(({self.control_str(expr.cke, 1)}) ? ((int64_t) ((UINT64_C(69069)*s->{core} + 1) '
+                            f'& 0xffffffff)) : s->{core});')
+
+        return output
+
+    def make_array(self, expr: Array):
+        # make the output signal that will hold the results
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        if isinstance(expr.format_, RealFormat) and self.fixed:
+            self.formats[output.name] = self.evaluator.eval_format(expr.format_)
+
+        if expr.all_constants:
+            if isinstance(expr.format_, RealFormat) and self.fixed:
+                values = []
+                for element in expr.elements:
+                    value = self.evaluator.compile_expr(element)
+                    values.append(assign_real(value(None), value.format_, self.formats[output.name]))
+            elif isinstance(expr.format_, RealFormat):
+                values = [float(element.value) for element in expr.elements]
+            else:
+                values = [int(element.value) for element in expr.elements]
+            self.make_lookup(output, values, expr.address)
+        else:
+            # compile the array elements and address to signals
+            elements = [self.expr_to_signal(element) for element in expr.elements]
+            address = self.expr_to_signal(expr.address)
+
+            # extra step for analog signals -- they must be aligned to the output format
+            if isinstance(expr.format_, RealFormat):
+                elements = [self.align(element, self.format_of(output)) for element in elements]
+            else:
+                elements = [element.name for element in elements]
+
+            # now create the array, with a value of zero for addresses beyond the end of the array
+            self.writeln(f'{self.c_type(expr.format_)} {output.name};')
+            self.writeln(f'switch ({address.name}) {{')
+            self.indent()
+            for k, element in enumerate(elements):
+                self.writeln(f'case {k}: {output.name} = {element}; break;')
+            self.writeln(f'default: {output.name} = 0; break;')
+            self.dedent()
+            self.writeln('}')
+
+        return output
+
+    def make_lookup(self, output: Signal, values, address: ModelExpr):
+        # the last entry of the table is used for addresses beyond the end of the array, if they are possible
+        table = self.make_table(list(values) + [0], output.format_)
+        address = self.expr_to_signal(address)
+        length = len(values)
+        if (1<<address.format_.width) > length:
+            self.declare(output, f'{table}[({address.name} < {length}) ? {address.name} : {length}]')
+        else:
+            self.declare(output, f'{table}[{address.name}]')
+
+    def make_bitwise_inv(self, expr: BitwiseInv):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+        self.declare(output, f'{input_.name} ^ {self.int_literal((1<<expr.format_.width)-1)}')
+        return output
+
+    def make_bitwise_operator(self, expr: BitwiseOperator):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        inputs = [self.expr_to_signal(operand) for operand in expr.operands]
+        self.declare(output, f' {BITWISE_OP[type(expr)]} '.join(input_.name for input_ in inputs))
+        return output
+
+    def make_comparison_operator(self, expr: ComparisonOperator):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        lhs = self.expr_to_signal(expr.lhs)
+        rhs = self.expr_to_signal(expr.rhs)
+
+        if isinstance(lhs.format_, RealFormat) and isinstance(rhs.format_, RealFormat):
+            self.declare(output, f'({self.to_double(lhs)} {COMP_OP[type(expr)]} {self.to_double(rhs)}) ? 1 : 0')
+        else:
+            self.declare(output, f'({lhs.name} {COMP_OP[type(expr)]} {rhs.name}) ? 1 : 0')
+
+        return output
+
+    def make_concatenation(self, expr: Concatenate):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        inputs_ = [self.expr_to_signal(operand) for operand in expr.operands]
+
+        value = inputs_[0].name
+        for input_ in inputs_[1:]:
+            value = f'shl({value}, {input_.format_.width}) | {input_.name}'
+        self.declare(output, value)
+
+        return output
+
+    def make_arithmetic_shift(self, expr: ArithmeticShift):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+
+        if isinstance(expr, ArithmeticLeftShift):
+            value = f'shl({input_.name}, {expr.shift})'
+        elif isinstance(expr, ArithmeticRightShift):
+            value = f'{input_.name} >> {expr.shift}'
+        else:
+            raise Exception(f'Unknown shift type: {expr.__class__.__name__}')
+
+        self.declare(output, self.wrap(f'({value})', expr.format_))
+        return output
+
+    def make_bitwise_access(self, expr: BitwiseAccess):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+        value = f'({input_.name} >> {expr.lsb}) & {self.int_literal((1<<expr.format_.width)-1)}'
+
+        # the bits are re-interpreted as a signed value if necessary
+        if isinstance(expr.format_, SIntFormat):
+            value = self.wrap(f'({value})', expr.format_)
+
+        self.declare(output, value)
+        return output
+
+    def make_type_conversion(self, expr: TypeConversion):
+        # compile the input expression to a signal
+        input_ = self.expr_to_signal(expr.operand)
+        output = Signal(name=next(self.namer), format_=expr.format_)
+
+        # handle the various cases
+        if isinstance(expr, SIntToReal):
+            if self.fixed:
+                self.formats[output.name] = width_exp_format(input_.format_.width, 0)
+                self.declare(output, input_.name)
+            else:
+                self.declare(output, f'(double) {input_.name}')
+        elif isinstance(expr, RealToSInt):
+            # conversion always rounds down
+            if self.fixed:
+                self.declare(output, self.align(input_, width_exp_format(expr.format_.width, 0)))
+            else:
+                self.declare(output, self.wrap(f'((int64_t) floor({input_.name}))', expr.format_))
+        elif isinstance(expr, UIntToSInt):
+            # the value itself is unchanged
+            self.declare(output, input_.name)
+        elif isinstance(expr, SIntToUInt):
+            # trim off the sign bit
+            self.declare(output, f'{input_.name} & {self.int_literal((1<<(input_.format_.width-1))-1)}')
+        else:
+            raise ValueError(f'Unknown type conversion: {expr.__class__.__name__}')
+
+        return output
+
+    # fixed-point helper functions
+
+    def format_of(self, signal: Signal):
+        # numeric fixed-point format of a signal (only used with RealType.FixedPoint)
+        if not self.fixed:
+            return None
+        elif signal.name in self.formats:
+            return self.formats[signal.name]
+        else:
+            return self.evaluator.format_of(signal)
+
+    def align(self, signal: Signal, out_format: RealFormat):
+        # expression that assigns a real-valued signal to a signal with the given format (i.e., ASSIGN_REAL)
+        if not self.fixed:
+            return signal.name
+
+        lshift = self.format_of(signal).exponent - out_format.exponent
+        if lshift >= 64:
+            value = '0'
+        elif lshift > 0:
+            value = f'shl({signal.name}, {lshift})'
+        elif lshift == 0:
+            value = signal.name
+        else:
+            value = f'({signal.name} >> {min(-lshift, 63)})'
+
+        return self.wrap_fixed(value, out_format)
+
+    def mul_real(self, a: Signal, b: Signal, out_format: RealFormat):
+        # expression for the product of two fixed-point signals, assigned to the given format
+        fa = self.format_of(a)
+        fb = self.format_of(b)
+        prod = Signal(name=f'({a.name} * {b.name})', format_=out_format)
+        prod_format = RealFormat(range_=fa.range_ * fb.range_, width=fa.width + fb.width,
+                                 exponent=fa.exponent + fb.exponent)
+        if prod_format.width > 64:
+            raise Exception(f'Cannot multiply fixed-point numbers with a combined width of {prod_format.width}.')
+        self.formats[prod.name] = prod_format
+        return self.align(prod, out_format)
+
+    def to_double(self, signal: Signal):
+        # exact conversion of a real-valued signal to a double, used for comparisons
+        if self.fixed:
+            return f'ldexp((double) {signal.name}, {self.format_of(signal).exponent})'
+        else:
+            return signal.name
+
+    @staticmethod
+    def wrap_fixed(value, format_: RealFormat):
+        return f'wrap_sint({value}, {format_.width})'
+
+    def fixed_param_value(self, param: RealParameter):
+        return str(int(from_real(self.evaluator.params[param.param_name], self.format_of(param))))
+
+    # other helper functions
+
+    def declare(self, signal: Signal, value):
+        self.writeln(f'const {self.c_type(signal.format_)} {signal.name} = {value};')
+
+    def make_register(self, signal: Signal, init_str):
+        # registers are loaded from the state at the beginning of each cycle
+        self.registers.append(signal)
+        self.fields.append(f'{self.c_type(signal.format_)} {signal.name};')
+        self.inits.append(f's->{signal.name} = {init_str};')
+
+    def make_table(self, values, format_):
+        # creates a lookup table at the file level, returning its name
+        name = next(self.namer).upper()
+        if isinstance(format_, RealFormat) and not self.fixed:
+            values = ', '.join(repr(float(value)) for value in values)
+        else:
+            values = ', '.join(self.int_literal(value) for value in values)
+        self.tables.append(f'static const {self.c_type(format_)} {name}[] = {{{values}}};')
+        return name
+
+    def make_wrap(self, input_: Signal, format_: IntFormat):
+        output = Signal(name=next(self.namer), format_=format_)
+        self.declare(output, self.wrap(input_.name, format_))
+        return output
+
+    @staticmethod
+    def wrap(value, format_: IntFormat):
+        # expression that truncates an integer to the width of the given format
+        if isinstance(format_, SIntFormat):
+            return f'wrap_sint({value}, {format_.width})'
+        elif isinstance(format_, UIntFormat):
+            return f'wrap_uint({value}, {format_.width})'
+        else:
+            raise Exception(f'Unknown integer format type: {format_.__class__.__name__}')
+
+    def init_str(self, init, signal: Signal):
+        # determine string expression for an initial value, which is evaluated in init_state
+        if isinstance(signal.format_, RealFormat) and self.fixed:
+            if isinstance(init, Number):
+                value = init
+            elif isinstance(init, RealParameter):
+                value = self.evaluator.params[init.param_name]
+            elif isinstance(init, str):
+                value = self.evaluator.params[init]
+            else:
+                raise Exception(f'Could not determine string representation for initial value {init}')
+            return str(int(from_real(value, self.format_of(signal))))
+        elif isinstance(init, Number):
+            retval = repr(float(init)) if isinstance(signal.format_, RealFormat) else self.int_literal(init)
+        elif isinstance(init, RealParameter):
+            retval = init.param_name
+        elif isinstance(init, DigitalParameter):
+            retval = init.name
+        elif isinstance(init, str):
+            retval = init
+        else:
+            raise Exception(f'Could not determine string representation for initial value {init}')
+
+        if isinstance(signal.format_, IntFormat):
+            retval = self.wrap(retval, signal.format_)
+
+        return retval
+
+    def signal_info(self, signal: Signal):
+        retval = {'name': signal.name}
+        if isinstance(signal.format_, RealFormat) and self.fixed:
+            retval['width'] = self.format_of(signal).width
+            retval['exponent'] = self.format_of(signal).exponent
+        return retval
+
+    def param_info(self, param: RealParameter):
+        retval = self.signal_info(param)
+        retval['name'] = param.param_name
+        retval['default'] = param.default
+        if self.fixed:
+            retval['value'] = self.evaluator.params[param.param_name]
+        return retval
+
+    def c_type(self, format_):
+        if isinstance(format_, RealFormat):
+            return 'real_t'
+        elif isinstance(format_, IntFormat):
+            return 'int64_t'
+        else:
+            raise Exception(f'Unknown format type: {format_.__class__.__name__}')
+
+    @staticmethod
+    def int_literal(value):
+        value = int(value)
+        if value >= (1<<63):
+            return f'((int64_t) UINT64_C({value}))'
+        else:
+            return f'INT64_C({value})'
+
+    @staticmethod
+    def init_name(signal: Signal):
+        # name used to store additional state associated with a signal
+        return f'zzz_{signal.name}'
+
+    @staticmethod
+    def control_str(signal, default=None):
+        # handles optional clock enable, reset, and write enable signals, which may be given by name
+        if signal is None:
+            return str(default)
+        elif isinstance(signal, str):
+            return signal
+        else:
+            return signal.name
+
+    def comment(self, content=''):
+        self.writeln(f'// {content}')
+
+    @staticmethod
+    def check_name(name):
+        if (not name.isidentifier()) or (name in RESERVED_NAMES):
+            raise Exception(f'The signal name {name} cannot be used in generated C code.')
+
+class CModel:
+    """
+    Builds C code generated by CGenerator into a shared library using the system C compiler, and loads it with
+    ctypes.  The library is only rebuilt when the C file is newer than the library.
+
+    Example:
+        filename = model.compile_to_file(CGenerator())
+        sim = CModel(filename)
+        results = sim.run({'v_in': np.ones(1000000)})
+
+    :param filename:    Path to the C file.
+    :param params:      Optional dictionary mapping parameter names to values.  Parameters that are not listed here
+                        take on their default values.
+    :param cc:          Name of the C compiler.
+    :param flags:       List of compiler flags.
+    """
+
+    def __init__(self, filename, params=None, cc='cc', flags=None):
+        # set defaults
+        if flags is None:
+            # fused multiply-adds are disabled so that floating-point results match Simulator exactly
+            flags = ['-O3', '-march=native', '-ffp-contract=off']
+
+        # build the library if needed
+        filename = Path(filename).resolve()
+        lib = filename.with_suffix('.so')
+        if (not lib.exists()) or (lib.stat().st_mtime < filename.stat().st_mtime):
+            args = [cc] + flags + ['-shared', '-fPIC', '-o', str(lib), str(filename), '-lm']
+            subprocess.run(args, check=True)
+
+        # load the library
+        self.lib = ctypes.CDLL(str(lib))
+        self.lib.state_size.restype = ctypes.c_size_t
+        self.lib.model_info.restype = ctypes.c_char_p
+        self.lib.init_state.argtypes = [ctypes.c_void_p]*3
+        self.lib.run.argtypes = [ctypes.c_void_p, ctypes.c_int64] + [ctypes.c_void_p]*4
+
+        # read the description of the model
+        self.info = json.loads(self.lib.model_info().decode('utf-8'))
+        self.fixed = (self.info['real_type'] == RealType.FixedPoint.value)
+        self.real_dtype = np.int64 if self.fixed else np.float64
+
+        # initialize the state
+        self.state = ctypes.create_string_buffer(self.lib.state_size())
+        self.reset(params=params)
+
+    def reset(self, params=None):
+        """
+        Sets all registers to their initial values, and clears the contents of RAMs.
+
+        :param params:  Optional dictionary mapping parameter names to values.
+        """
+        # set defaults
+        if params is None:
+            params = {}
+
+        # determine parameter values
+        real_params = []
+        for param in self.info['real_params']:
+            value = params.get(param['name'], param['default'])
+            if self.fixed:
+                if value != param['value']:
+                    raise Exception(f'The value of real parameter {param["name"]} was fixed at {param["value"]} '
+                                    f'when the code was generated.')
+                value = from_real(value, RealFormat(range_=None, width=param['width'], exponent=param['exponent']))
+            real_params.append(value)
+        digital_params = [params.get(param['name'], param['default']) for param in self.info['digital_params']]
+        unknown = set(params.keys()) - set(param['name'] for param in self.info['real_params'] +
+                                           self.info['digital_params'])
+        assert len(unknown) == 0, f'Unknown parameter(s): {sorted(unknown)}.'
+
+        # call the initialization function
+        real_params = np.array(real_params + [0], dtype=self.real_dtype)
+        digital_params = np.array(digital_params + [0], dtype=np.int64)
+        self.lib.init_state(self.state, real_params.ctypes.data, digital_params.ctypes.data)
+
+    def run(self, inputs=None, n=None):
+        """
+        Simulates several clock cycles.
+
+        :param inputs:  Dictionary mapping input names to arrays of values, one per cycle.  Scalar values are held
+                        constant for the whole simulation.
+        :param n:       Number of cycles to simulate.  Defaults to the length of the input arrays.
+        :return:        Dictionary mapping the name of each output (and probe) to an array of its values.
+        """
+        # set defaults
+        if inputs is None:
+            inputs = {}
+        if n is None:
+            lengths = [len(value) for value in inputs.values() if np.ndim(value) > 0]
+            assert len(lengths) > 0, 'The number of cycles must be specified when all inputs are constant.'
+            n = min(lengths)
+
+        # pack the inputs into arrays with one row per cycle
+        real_in = np.zeros((n, len(self.info['real_inputs'])), dtype=self.real_dtype)
+        for k, signal in enumerate(self.info['real_inputs']):
+            real_in[:, k] = self.encode(self.cycle_values(inputs[signal['name']], n), signal)
+        digital_in = np.zeros((n, len(self.info['digital_inputs'])), dtype=np.int64)
+        for k, signal in enumerate(self.info['digital_inputs']):
+            digital_in[:, k] = self.cycle_values(inputs[signal['name']], n)
+
+        # run the simulation
+        real_out = np.zeros((n, len(self.info['real_outputs'])), dtype=self.real_dtype)
+        digital_out = np.zeros((n, len(self.info['digital_outputs'])), dtype=np.int64)
+        self.lib.run(self.state, n, real_in.ctypes.data, digital_in.ctypes.data, real_out.ctypes.data,
+                     digital_out.ctypes.data)
+
+        # unpack the outputs
+        results = {}
+        for k, signal in enumerate(self.info['real_outputs']):
+            results[signal['name']] = self.decode(real_out[:, k], signal)
+        for k, signal in enumerate(self.info['digital_outputs']):
+            results[signal['name']] = digital_out[:, k]
+        return results
+
+    def stream(self, chunks):
+        """
+        Simulates the model one chunk of inputs at a time, carrying the state over from one chunk to the next.  See
+        Simulator.stream for details.
+
+        :param chunks:  Iterable of dictionaries mapping input names to arrays of values.
+        :return:        Generator that yields a dictionary of outputs for each chunk.
+        """
+        for chunk in chunks:
+            yield self.run(chunk)
+
+    @staticmethod
+    def cycle_values(value, n):
+        # values of an input for n cycles.  arrays may be longer than that, while scalars are held constant.
+        if np.ndim(value) > 0:
+            value = np.asarray(value)[:n]
+        return np.broadcast_to(value, (n,))
+
+    def encode(self, value, signal):
+        if self.fixed:
+            return from_real(value, RealFormat(range_=None, width=signal['width'], exponent=signal['exponent']))
+        else:
+            return value
+
+    def decode(self, value, signal):
+        if self.fixed:
+            return np.ldexp(value, signal['exponent'])
+        else:
+            return value
+
+def main():
+    from msdsl.model import MixedSignalModel
+    from msdsl.eqn.deriv import Deriv
+
+    # generate code for an RC filter
+    m = MixedSignalModel('rc', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/1e-6])
+
+    gen = CGenerator(real_type=RealType.FixedPoint, ranges={'x': 1.0, 'y': 1.0})
+    m.compile(gen)
+    print(gen.text)
+
+if __name__ == '__main__':
+    main()
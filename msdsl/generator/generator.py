@@ -8,18 +8,43 @@ from msdsl.expr.format import RealFormat
 from msdsl.util import Namer
 
 class CodeGenerator:
+    # file extension used for the generated code
+    extension = 'sv'
+
+    # if True, assignments are compiled in the order in which they have to be evaluated, rather than in the order
+    # in which they were added to the model
+    sequential = False
+
+    # if True, the generated code is written in order from start to finish, so it can be sent directly to a file
+    # as it is generated
+    streamable = True
+
     def __init__(self, tab_string: str=None, line_ending: str=None, namer: Namer=None):
         # save settings
         self.tab_string = tab_string if tab_string is not None else '    '
         self.line_ending = line_ending if line_ending is not None else '\n'
         self.namer = namer if namer is not None else Namer()
 
-        # initialize variables
+        # initialize variables.  generated code is collected in a list of strings (rather than by repeatedly
+        # concatenating strings, which takes quadratic time), or written directly to a file if one has been opened
+        # with open_stream.
         self.tab_level = 0
-        self.text = ''
+        self.buffer = []
+        self.stream = None
 
     # concrete functions
 
+    @property
+    def text(self):
+        # join the buffer, keeping the result so that it does not have to be joined again
+        if len(self.buffer) > 1:
+            self.buffer = [''.join(self.buffer)]
+        return self.buffer[0] if len(self.buffer) > 0 else ''
+
+    @text.setter
+    def text(self, value):
+        self.buffer = [value] if len(value) > 0 else []
+
     def indent(self):
         self.tab_level += 1
 
@@ -28,14 +53,31 @@ class CodeGenerator:
         assert self.tab_level >= 0
 
     def write(self, string=''):
-        self.text += string
+        if self.stream is not None:
+            self.stream.write(string)
+        else:
+            self.buffer.append(string)
 
     def writeln(self, line=''):
         self.write(self.tab_level * self.tab_string + line + self.line_ending)
 
     def write_to_file(self, filename):
         with open(filename, 'w') as f:
-            f.write(self.text)
+            f.writelines(self.buffer)
+
+    def open_stream(self, filename):
+        """
+        Writes generated code directly to the given file from now on, rather than keeping it in memory.  Code that
+        has already been generated is written to the file first.
+        """
+        assert self.streamable, f'{self.__class__.__name__} does not support writing code directly to a file.'
+        self.stream = open(filename, 'w')
+        self.stream.writelines(self.buffer)
+        self.buffer = []
+
+    def close_stream(self):
+        self.stream.close()
+        self.stream = None
 
     ###############################
     # abstract methods
@@ -0,0 +1,607 @@
+from typing import List, Union
+from numbers import Number, Integral
+from pathlib import Path
+import importlib.util
+import keyword
+import random
+import datetime
+import numpy as np
+
+from msdsl.generator.generator import CodeGenerator
+from msdsl.expr.expr import ModelExpr, wrap_constant, Constant, \
+    ArithmeticOperator, ComparisonOperator, BitwiseOperator, Concatenate, Array, \
+    TypeConversion, SIntToReal, UIntToSInt, BitwiseInv, ArithmeticShift, \
+    BitwiseAccess, RealToSInt, SIntToUInt, BitwiseAnd, BitwiseOr, BitwiseXor, \
+    ArithmeticRightShift, ArithmeticLeftShift, LessThan, LessThanOrEquals, \
+    GreaterThan, GreaterThanOrEquals, EqualTo, NotEqualTo, Sum, Product, Min, \
+    Max, CompressUInt, RandomInteger, MT19937, LCG
+from msdsl.expr.table import Table, RealTable, table_values
+from msdsl.expr.format import UIntFormat, SIntFormat, RealFormat, IntFormat
+from msdsl.expr.signals import Signal, AnalogSignal, DigitalSignal, AnalogInput, AnalogOutput, DigitalOutput, \
+    DigitalInput, DigitalParameter, RealParameter
+from msdsl.generator.tree_op import tree_op
+
+BITWISE_OP = {
+    BitwiseAnd: '&',
+    BitwiseOr: '|',
+    BitwiseXor: '^'
+}
+
+SHIFT_OP = {
+    ArithmeticLeftShift: '<<',
+    ArithmeticRightShift: '>>'
+}
+
+COMP_OP = {
+    LessThan: '<',
+    LessThanOrEquals: '<=',
+    GreaterThan: '>',
+    GreaterThanOrEquals: '>=',
+    EqualTo: '==',
+    NotEqualTo: '!='
+}
+
+ARITH_OP = {
+    Sum:     lambda a, b: f'{a} + {b}',
+    Product: lambda a, b: f'{a} * {b}',
+    Min:     lambda a, b: f'np.minimum({a}, {b})',
+    Max:     lambda a, b: f'np.maximum({a}, {b})'
+}
+
+# names used by the generated code itself, which therefore cannot be used for signals
+RESERVED_NAMES = {'np', 'LCGCore', 'MT19937Core', 'init_state', 'step', 'state', 'inputs', 'params', 'lanes',
+                  'retval', '_shape', '_lane'}
+
+class PythonGenerator(CodeGenerator):
+    """
+    Generates a Python module that simulates the model, as an alternative to generating SystemVerilog.  The module
+    contains two functions:
+
+    init_state(lanes=None, **params): returns a dictionary holding the state of the model (parameter values,
+    registers, memories, and random number generators) at the beginning of the simulation.
+
+    step(state, inputs): simulates one clock cycle, given a dictionary mapping input names to their values.  The
+    state is updated in place, and a dictionary mapping the names of outputs and probes to their values during the
+    cycle is returned.
+
+    The body of step() is straight-line NumPy code with one statement per operation, so expressions are only
+    analyzed once, when the module is generated.  Real numbers are represented as floating-point values, and the
+    results match those of Simulator with RealType.FloatReal.  Values may be NumPy arrays, in which case several
+    copies of the model ("lanes") are simulated at once.  Like the SystemVerilog output, the generated module can
+    be written to disk and loaded later on (see load_module).
+    """
+
+    extension = 'py'
+    sequential = True
+    streamable = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # code placed in other parts of the module, which is assembled by end_module
+        self.name = None
+        self.ios = []
+        self.real_params = []
+        self.digital_params = []
+        self.tables = []
+        self.inits = []
+        self.registers = []
+        self.updates = []
+        self.probes = []
+
+    def make_section(self, label):
+        self.comment(label)
+
+    def expr_to_signal(self, expr: ModelExpr):
+        # before starting, make sure that the expression is wrapped in case it is a number
+        expr = wrap_constant(expr)
+
+        if isinstance(expr, Signal):
+            return expr
+        elif isinstance(expr, Constant):
+            return self.make_constant(expr)
+        elif isinstance(expr, ArithmeticOperator):
+            return self.make_arithmetic_operator(expr)
+        elif isinstance(expr, CompressUInt):
+            return self.make_compress_uint(expr)
+        elif isinstance(expr, RandomInteger):
+            return self.make_random_integer(expr)
+        elif isinstance(expr, BitwiseInv):
+            return self.make_bitwise_inv(expr)
+        elif isinstance(expr, BitwiseOperator):
+            return self.make_bitwise_operator(expr)
+        elif isinstance(expr, ComparisonOperator):
+            return self.make_comparison_operator(expr)
+        elif isinstance(expr, Concatenate):
+            return self.make_concatenation(expr)
+        elif isinstance(expr, Array):
+            return self.make_array(expr)
+        elif isinstance(expr, ArithmeticShift):
+            return self.make_arithmetic_shift(expr)
+        elif isinstance(expr, BitwiseAccess):
+            return self.make_bitwise_access(expr)
+        elif isinstance(expr, TypeConversion):
+            return self.make_type_conversion(expr)
+        else:
+            raise Exception(f'Unknown expression type: {expr.__class__.__name__}')
+
+    def make_signal(self, signal: Signal):
+        # variables do not have to be declared in Python, but their names have to be valid
+        self.check_name(signal.name)
+
+    def make_probe(self, s: Signal):
+        if isinstance(s, Signal):
+            self.probes.append(s.name)
+        else:
+            raise Exception('Invalid signal type.')
+
+    def make_assign(self, input_: Signal, output: Signal, check_format=True):
+        if isinstance(input_.format_, RealFormat) and isinstance(output.format_, RealFormat):
+            self.assignment(output, input_.name)
+        elif ((not check_format) or
+              ((isinstance(input_.format_, SIntFormat) and isinstance(output.format_, SIntFormat)) or
+               (isinstance(input_.format_, UIntFormat) and isinstance(output.format_, UIntFormat)))):
+            self.assignment(output, self.wrap(input_, output.format_))
+        else:
+            raise Exception(f'Input and output formats do not match: {input_.name} with {input_.format_} vs. {output.name} with {output.format_}')
+
+    def make_mem(self, next_: Signal, curr: Signal, init: Union[Number, DigitalParameter, RealParameter]=0,
+                 clk: Signal=None, rst: Signal=None, ce: Signal = None, check_format=True):
+        # determine the value stored in the register.  as in the generated SystemVerilog, integers are truncated to
+        # the width of the register.
+        if isinstance(next_.format_, RealFormat) and isinstance(curr.format_, RealFormat):
+            value = next_.name
+        elif ((not check_format) or
+              ((isinstance(next_.format_, SIntFormat) and isinstance(curr.format_, SIntFormat)) or
+              (isinstance(next_.format_, UIntFormat) and isinstance(curr.format_, UIntFormat)))):
+            value = self.wrap(next_, curr.format_)
+        else:
+            raise Exception(
+                f'Next and current formats do not match: {next_.name} '
+                f'with {next_.format_} vs. {curr.name} with {curr.format_}'
+            )
+
+        # determine string expression for the initial value
+        init_str = self.init_str(init)
+
+        # initialize the register
+        self.make_register(curr.name, init_str)
+
+        # the clock enable and reset are applied to the value, in that order.  the reset value is stored in the
+        # state, since it may depend on parameters.
+        if ce is not None:
+            value = f'np.where({self.control_str(ce)}, {value}, {curr.name})'
+        if rst is not None:
+            self.inits.append(f"state['{self.init_name(curr)}'] = {init_str}")
+            value = f"np.where({self.control_str(rst)}, state['{self.init_name(curr)}'], {value})"
+
+        # update the register
+        self.writeln(f"state['{curr.name}'] = {value}")
+
+    def make_sync_rom(self, signal: Signal, table: Table, addr: Signal,
+                      clk: Signal=None, ce: Signal=None):
+        # store the contents of the table in the module.  real numbers are quantized in the same way as when they
+        # are written to a memory file.
+        vals = table_values(table)
+        if isinstance(table, RealTable):
+            vals = self.make_table(np.ldexp(vals, table.exp))
+            self.make_register(signal.name, '0.0')
+        else:
+            vals = self.make_table(vals)
+            self.make_register(signal.name, '0')
+
+        # update the output
+        value = f'{vals}[{addr.name} & {(1<<table.addr_bits)-1}]'
+        if ce is not None:
+            value = f'np.where({self.control_str(ce)}, {value}, {signal.name})'
+        self.writeln(f"state['{signal.name}'] = {value}")
+
+    def make_sync_ram(self, signal: AnalogSignal, format_: RealFormat, addr: DigitalSignal,
+                      clk: DigitalSignal=None, ce: DigitalSignal=None, we: DigitalSignal=None,
+                      din: DigitalSignal=None):
+        # each lane has its own copy of the memory, which stores signed integers
+        mem = self.init_name(signal)
+        self.inits.append(f"state['{mem}'] = np.zeros((len(state['_lane']), {1<<addr.format_.width}), "
+                          f"dtype=np.int64)")
+        self.make_register(signal.name, '0.0')
+
+        # read happens before write
+        addr_name = next(self.namer)
+        data = next(self.namer)
+        self.writeln(f'{addr_name} = np.broadcast_to({addr.name}, _lane.shape)')
+        self.writeln(f"{data} = np.ldexp(state['{mem}'][_lane, {addr_name}], {format_.exponent}).reshape(_shape)")
+        value = data if ce is None else f'np.where({self.control_str(ce)}, {data}, {signal.name})'
+        self.writeln(f"state['{signal.name}'] = {value}")
+
+        # write to the lanes where the write enable is active
+        if we is not None:
+            write = next(self.namer)
+            data_format = SIntFormat(width=format_.width)
+            data_in = self.wrap(din if din is not None else Signal(name='0', format_=data_format), data_format)
+            self.writeln(f'{write} = np.broadcast_to(({self.control_str(ce, 1)} != 0) & '
+                         f'({self.control_str(we)} != 0), _lane.shape)')
+            self.writeln(f"state['{mem}'][_lane[{write}], {addr_name}[{write}]] = "
+                         f"np.broadcast_to({data_in}, _lane.shape)[{write}]")
+
+    def start_module(self, name: str, ios: List[Signal], real_params: List, digital_params: List=None):
+        # set defaults
+        if digital_params is None:
+            digital_params = []
+
+        # save settings
+        self.name = name
+        self.ios = ios
+        self.real_params = real_params
+        self.digital_params = digital_params
+
+        # check names that appear in the generated code
+        for io in ios:
+            self.check_name(io.name)
+        for real_param in real_params:
+            self.check_name(real_param.param_name)
+            self.check_name(real_param.signal_name)
+        for dig_param in digital_params:
+            self.check_name(dig_param.name)
+
+        # the body of the step function is indented
+        self.indent()
+
+    def end_module(self):
+        self.dedent()
+
+        # the code written so far is the body of the step function
+        body = self.text
+        self.text = ''
+
+        # print header
+        self.comment(f'Model generated on {datetime.datetime.now()}')
+        self.writeln()
+        self.writeln('import numpy as np')
+        self.writeln('from msdsl.sim.rng import LCGCore, MT19937Core')
+        self.writeln()
+
+        # lookup tables
+        if len(self.tables) > 0:
+            self.comment('Lookup tables')
+            for line in self.tables:
+                self.writeln(line)
+            self.writeln()
+
+        # function used to initialize the state
+        self.writeln('def init_state(lanes=None, **params):')
+        self.indent()
+        self.comment('Parameter values')
+        for real_param in self.real_params:
+            self.writeln(f"{real_param.param_name} = params.pop('{real_param.param_name}', {real_param.default})")
+        for dig_param in self.digital_params:
+            self.writeln(f"{dig_param.name} = params.pop('{dig_param.name}', {dig_param.default})")
+        self.writeln("assert len(params) == 0, f'Unknown parameter(s): {sorted(params)}.'")
+        self.write(self.line_ending)
+        self.comment('Initial values')
+        self.writeln("state = {'_shape': () if lanes is None else (lanes,), "
+                     "'_lane': np.arange(1 if lanes is None else lanes)}")
+        for real_param in self.real_params:
+            self.writeln(f"state['{real_param.signal_name}'] = {real_param.param_name}")
+        for dig_param in self.digital_params:
+            self.writeln(f"state['{dig_param.name}'] = {dig_param.name}")
+        for line in self.inits:
+            self.writeln(line)
+        self.writeln('return state')
+        self.dedent()
+        self.writeln()
+
+        # function used to simulate one cycle
+        self.writeln('def step(state, inputs):')
+        self.indent()
+        self.comment('Load the state')
+        self.writeln("_shape = state['_shape']")
+        self.writeln("_lane = state['_lane']")
+        for real_param in self.real_params:
+            self.writeln(f"{real_param.signal_name} = state['{real_param.signal_name}']")
+        for dig_param in self.digital_params:
+            self.writeln(f"{dig_param.name} = state['{dig_param.name}']")
+        for name in self.registers:
+            self.writeln(f"{name} = state['{name}']")
+        for io in self.ios:
+            if isinstance(io, (AnalogInput, DigitalInput)):
+                self.writeln(f"{io.name} = inputs['{io.name}']")
+        self.write(self.line_ending)
+        self.dedent()
+        self.write(body)
+        self.indent()
+        if len(self.updates) > 0:
+            self.write(self.line_ending)
+            self.comment('Update random number generators')
+            for line in self.updates:
+                self.writeln(line)
+        self.write(self.line_ending)
+        outputs = [io.name for io in self.ios if isinstance(io, (AnalogOutput, DigitalOutput))] + self.probes
+        self.writeln('return {' + ', '.join(f"'{name}': {name}" for name in outputs) + '}')
+        self.dedent()
+
+    def make_constant(self, expr: Constant):
+        # constants are written directly into the expressions that use them
+        if isinstance(expr.format_, RealFormat):
+            value = repr(float(expr.value))
+        elif isinstance(expr.format_, IntFormat):
+            value = str(int(expr.value))
+        else:
+            raise ValueError(f'Unknown expression format type: ' + expr.format_.__class__.__name__)
+
+        if expr.value < 0:
+            value = f'({value})'
+
+        return Signal(name=value, format_=expr.format_)
+
+    def make_arithmetic_operator(self, expr: ArithmeticOperator):
+        # compile the inputs to signals
+        inputs_ = [self.expr_to_signal(operand) for operand in expr.operands]
+
+        # define the operator used to build up the expression.  it takes two signals as arguments and returns
+        # a signal bound to the result
+        def operator(a, b):
+            c = Signal(name=next(self.namer), format_=expr.function(a.format_, b.format_))
+            self.assignment(c, ARITH_OP[type(expr)](a.name, b.name))
+            return c
+
+        # apply the operator in a tree-wise fashion, as in the generated SystemVerilog
+        output = tree_op(operands=inputs_, operator=operator)
+
+        # truncate integer results to the width of the output
+        if isinstance(expr.format_, IntFormat):
+            return self.make_wrap(output, expr.format_)
+        else:
+            return output
+
+    def make_compress_uint(self, expr: CompressUInt):
+        input_ = self.expr_to_signal(expr.operand)
+
+        # write the input as m*(2**e), where 0.5 <= m < 1, so that e is the number of bits needed to represent
+        # the input.  then the fractional part of the result is determined by the bits following the leading one
+        mantissa = next(self.namer)
+        exponent = next(self.namer)
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        self.writeln(f'{mantissa}, {exponent} = np.frexp({input_.name})')
+        self.assignment(output, f'np.where({exponent} == 0, 0.0, {exponent} + 2*{mantissa} - 1)')
+
+        return output
+
+    def make_random_integer(self, expr: RandomInteger):
+        # validate input
+        assert expr.format_.width == 32, 'Only width 32 is supported at this time.'
+
+        # the generator is stored in the state, under the name of its output
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        core = self.init_name(output)
+
+        # determine the seed
+        if expr.seed is None:
+            seed = str(random.randint(0, (1<<expr.format_.width)-1))
+        elif isinstance(expr.seed, Integral):
+            assert 0 <= expr.seed <= ((1<<expr.format_.width)-1), \
+                'Seed is out of range.'
+            seed = str(expr.seed)
+        else:
+            seed = self.control_str(expr.seed)
+
+        # create the generator
+        if isinstance(expr, MT19937):
+            self.inits.append(f"state['{core}'] = MT19937Core(lanes=len(state['_lane']))")
+        elif isinstance(expr, LCG):
+            # the LCG is loaded with the seed upon reset, so its value has to be known at this point
+            param_names = [real_param.param_name for real_param in self.real_params]
+            param_names += [dig_param.name for dig_param in self.digital_params]
+            if not (isinstance(expr.seed, (type(None), Integral)) or seed in param_names):
+                raise Exception(f'The seed of random number generator {output.name} must be a constant or parameter.')
+            self.inits.append(f"state['{core}'] = LCGCore(lanes=len(state['_lane']))")
+            self.inits.append(f"state['{core}'].reset(seed=np.broadcast_to({seed}, state['_lane'].shape))")
+        else:
+            raise Exception(f'Unsupported expression: {expr}')
+
+        # read the output.  the generator is updated at the end of the cycle.
+        self.assignment(output, f"state['{core}'].output().reshape(_shape)")
+        self.updates.append(f"state['{core}'].update(rst=np.broadcast_to({self.control_str(expr.rst, 0)}, "
+                            f"_lane.shape), cke=np.broadcast_to({self.control_str(expr.cke, 1)}, _lane.shape), "
+                            f"seed=np.broadcast_to({seed}, _lane.shape))")
+
+        return output
+
+    def make_array(self, expr: Array):
+        # make the output signal that will hold the results
+        output = Signal(name=next(self.namer), format_=expr.format_)
+
+        # compile the address to a signal
+        address = self.expr_to_signal(expr.address)
+
+        # values at addresses beyond the end of the array are zero, as in the default branch of the case statement
+        # in the generated SystemVerilog.  there is no need to check for this if the address cannot reach that far.
+        length = len(expr)
+        if (1<<expr.address.format_.width) > length:
+            address_str = f'np.minimum({address.name}, {length})'
+        else:
+            address_str = address.name
+
+        if expr.all_constants:
+            if isinstance(expr.format_, RealFormat):
+                values = [float(element.value) for element in expr.elements] + [0.0]
+            else:
+                values = [int(element.value) for element in expr.elements] + [0]
+            self.assignment(output, f'{self.make_table(values)}[{address_str}]')
+        else:
+            # the value is selected with a chain of conditional assignments
+            elements = [self.expr_to_signal(element) for element in expr.elements]
+            zero = '0.0' if isinstance(expr.format_, RealFormat) else '0'
+            self.assignment(output, zero)
+            for k, element in enumerate(elements):
+                self.assignment(output, f'np.where({address.name} == {k}, {element.name}, {output.name})')
+
+        return output
+
+    def make_bitwise_inv(self, expr: BitwiseInv):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+        self.assignment(output, f'{input_.name} ^ {(1<<expr.format_.width)-1}')
+        return output
+
+    def make_bitwise_operator(self, expr: BitwiseOperator):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        inputs = [self.expr_to_signal(operand) for operand in expr.operands]
+        self.assignment(output, f' {BITWISE_OP[type(expr)]} '.join(input_.name for input_ in inputs))
+        return output
+
+    def make_comparison_operator(self, expr: ComparisonOperator):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        lhs = self.expr_to_signal(expr.lhs)
+        rhs = self.expr_to_signal(expr.rhs)
+        self.assignment(output, f'np.where({lhs.name} {COMP_OP[type(expr)]} {rhs.name}, 1, 0)')
+        return output
+
+    def make_concatenation(self, expr: Concatenate):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        inputs_ = [self.expr_to_signal(operand) for operand in expr.operands]
+
+        value = inputs_[0].name
+        for input_ in inputs_[1:]:
+            value = f'(({value}) << {input_.format_.width}) | {input_.name}'
+        self.assignment(output, value)
+
+        return output
+
+    def make_arithmetic_shift(self, expr: ArithmeticShift):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+        self.assignment(output, f'{input_.name} {SHIFT_OP[type(expr)]} {expr.shift}')
+        return self.make_wrap(output, expr.format_)
+
+    def make_bitwise_access(self, expr: BitwiseAccess):
+        output = Signal(name=next(self.namer), format_=expr.format_)
+        input_ = self.expr_to_signal(expr.operand)
+        self.assignment(output, f'({input_.name} >> {expr.lsb}) & {(1<<expr.format_.width)-1}')
+
+        # the bits are re-interpreted as a signed value if necessary
+        if isinstance(expr.format_, SIntFormat):
+            return self.make_wrap(output, expr.format_)
+        else:
+            return output
+
+    def make_type_conversion(self, expr: TypeConversion):
+        # compile the input expression to a signal
+        input_ = self.expr_to_signal(expr.operand)
+
+        # handle the various cases
+        if isinstance(expr, SIntToReal):
+            output = Signal(name=next(self.namer), format_=expr.format_)
+            self.assignment(output, f'np.multiply({input_.name}, 1.0)')
+        elif isinstance(expr, RealToSInt):
+            # conversion always rounds down
+            output = Signal(name=next(self.namer), format_=expr.format_)
+            self.assignment(output, f'np.floor({input_.name}).astype(np.int64)')
+            output = self.make_wrap(output, expr.format_)
+        elif isinstance(expr, UIntToSInt):
+            # the value itself is unchanged
+            output = Signal(name=input_.name, format_=expr.format_)
+        elif isinstance(expr, SIntToUInt):
+            # trim off the sign bit
+            output = Signal(name=next(self.namer), format_=expr.format_)
+            self.assignment(output, f'{input_.name} & {(1<<(input_.format_.width-1))-1}')
+        else:
+            raise ValueError(f'Unknown type conversion: {expr.__class__.__name__}')
+
+        return output
+
+    def make_table(self, values):
+        # creates a lookup table at the module level, returning its name
+        name = next(self.namer).upper()
+        self.tables.append(f'{name} = np.array({np.asarray(values).tolist()})')
+        return name
+
+    def make_register(self, name, init_str):
+        # registers are loaded from the state at the beginning of each cycle
+        self.registers.append(name)
+        self.inits.append(f"state['{name}'] = {init_str}")
+
+    def make_wrap(self, input_: Signal, format_: IntFormat):
+        output = Signal(name=next(self.namer), format_=format_)
+        self.assignment(output, self.wrap(input_, format_))
+        return output
+
+    @staticmethod
+    def wrap(input_: Signal, format_: IntFormat):
+        # expression that truncates an integer to the width of the given format
+        mask = (1<<format_.width)-1
+        if isinstance(format_, SIntFormat):
+            offset = 1<<(format_.width-1)
+            return f'(({input_.name} + {offset}) & {mask}) - {offset}'
+        elif isinstance(format_, UIntFormat):
+            return f'{input_.name} & {mask}'
+        else:
+            raise Exception(f'Unknown integer format type: {format_.__class__.__name__}')
+
+    def init_str(self, init):
+        # determine string expression for an initial value, which is evaluated in init_state
+        if isinstance(init, Number):
+            return str(init)
+        elif isinstance(init, RealParameter):
+            return init.param_name
+        elif isinstance(init, DigitalParameter):
+            return init.name
+        elif isinstance(init, str):
+            return init
+        else:
+            raise Exception(f'Could not determine string representation for initial value {init}')
+
+    @staticmethod
+    def init_name(signal: Signal):
+        # name used to store additional state associated with a signal
+        return f'zzz_{signal.name}'
+
+    @staticmethod
+    def control_str(signal, default=None):
+        # handles optional clock enable, reset, and write enable signals, which may be given by name
+        if signal is None:
+            return str(default)
+        elif isinstance(signal, str):
+            return signal
+        else:
+            return signal.name
+
+    def assignment(self, signal: Signal, value):
+        self.writeln(f'{signal.name} = {value}')
+
+    def comment(self, content=''):
+        self.writeln(f'# {content}')
+
+    @staticmethod
+    def check_name(name):
+        if (not name.isidentifier()) or keyword.iskeyword(name) or (name in RESERVED_NAMES):
+            raise Exception(f'The signal name {name} cannot be used in generated Python code.')
+
+def load_module(filename):
+    """
+    Loads a Python module generated by PythonGenerator.
+
+    :param filename:    Path to the generated module.
+    :return:            Module object with functions init_state and step.
+    """
+    filename = Path(filename).resolve()
+    spec = importlib.util.spec_from_file_location(filename.stem, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def main():
+    from msdsl.model import MixedSignalModel
+    from msdsl.eqn.deriv import Deriv
+
+    # generate code for an RC filter
+    m = MixedSignalModel('rc', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/1e-6])
+
+    gen = PythonGenerator()
+    m.compile(gen)
+    print(gen.text)
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,12 @@ from msdsl.expr.svreal import RangeExpr, RangeOf, RangeMax, RangeSum, RangeProdu
     ExponentOf, RangeOperator, ParamRange
 from msdsl.generator.tree_op import tree_op
 
+class UnknownRangeError(Exception):
+    """
+    Raised by eval_range_expr when a range expression refers to a signal or parameter whose value is not known.
+    """
+    pass
+
 def max_op(a, b):
     if a is not None:
         if b is not None:
@@ -61,6 +67,71 @@ def compile_exponent_expr(expr: Union[ExponentExpr, Number]):
     else:
         raise Exception('Exponent expression not handled: ' + expr.__class__.__name__)
 
+def eval_range_expr(expr: Union[RangeExpr, Number], ranges, params=None):
+    """
+    Numerically evaluates a range expression, following the same order of operations as the SystemVerilog code
+    produced by compile_range_expr.
+
+    :param expr:    Range expression to evaluate.
+    :param ranges:  Mapping from signal names to their ranges, used to evaluate RangeOf.
+    :param params:  Optional mapping from real parameter names to their values, used to evaluate ParamRange.
+    :return:        Range as a floating-point number.
+    """
+    # set defaults
+    if params is None:
+        params = {}
+
+    if expr is None:
+        return None
+    elif isinstance(expr, Number):
+        return expr
+    elif isinstance(expr, RangeOf):
+        if expr.name not in ranges:
+            raise UnknownRangeError(f'Range of signal {expr.name} is not known.')
+        return ranges[expr.name]
+    elif isinstance(expr, ParamRange):
+        if expr.name not in params:
+            raise UnknownRangeError(f'Value of parameter {expr.name} is not known.')
+        # matches the behavior of CONST_RANGE_REAL
+        return 1.01*abs(params[expr.name])
+    elif not isinstance(expr, RangeOperator):
+        raise Exception('Range expression not handled: ' + expr.__class__.__name__)
+
+    # otherwise it must be a RangeOperator
+    operands = [eval_range_expr(operand, ranges=ranges, params=params) for operand in expr.operands]
+
+    if isinstance(expr, RangeSum):
+        return sum(operands[1:], operands[0])
+    elif isinstance(expr, RangeProduct):
+        retval = operands[0]
+        for operand in operands[1:]:
+            retval = retval*operand
+        return retval
+    elif isinstance(expr, RangeMax):
+        return tree_op(operands=operands, operator=max)
+    else:
+        raise Exception('Range expression not handled: ' + expr.__class__.__name__)
+
+def eval_width_expr(expr: Union[WidthExpr, Number], widths):
+    if expr is None:
+        return None
+    elif isinstance(expr, Number):
+        return expr
+    elif isinstance(expr, WidthOf):
+        return widths[expr.name]
+    else:
+        raise Exception('Width expression not handled: ' + expr.__class__.__name__)
+
+def eval_exponent_expr(expr: Union[ExponentExpr, Number], exponents):
+    if expr is None:
+        return None
+    elif isinstance(expr, Number):
+        return expr
+    elif isinstance(expr, ExponentOf):
+        return exponents[expr.name]
+    else:
+        raise Exception('Exponent expression not handled: ' + expr.__class__.__name__)
+
 def main():
     from msdsl.expr.svreal import range_max
     a = RangeOf('a')
@@ -70,6 +141,7 @@ def main():
 
     print(compile_range_expr((a+b+1)*4*2+5+7))
     print(compile_range_expr(range_max([a, b, c, d])))
+    print(eval_range_expr((a+b+1)*4*2+5+7, ranges={'a': 1, 'b': 2}))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,13 +1,28 @@
 def tree_op(operands, operator):
-    if len(operands) == 1:
-        return operands[0]
-    elif len(operands) > 1:
-        a = tree_op(operands[:len(operands) // 2], operator=operator)
-        b = tree_op(operands[len(operands) // 2:], operator=operator)
-        return operator(a, b)
-    else:
+    # the operands are split in half repeatedly, and the operator is applied to the results of the two halves.  an
+    # explicit stack is used instead of recursion; the operator is applied in the same order as it would be by a
+    # recursive implementation (left half before right half).
+    if len(operands) == 0:
         raise Exception('Tree operation cannot be applied to an empty list.')
 
+    stack = [(0, len(operands), False)]
+    results = []
+    while len(stack) > 0:
+        start, stop, expanded = stack.pop()
+        if stop - start == 1:
+            results.append(operands[start])
+        elif expanded:
+            b = results.pop()
+            a = results.pop()
+            results.append(operator(a, b))
+        else:
+            mid = start + (stop - start) // 2
+            stack.append((start, stop, True))
+            stack.append((mid, stop, False))
+            stack.append((start, mid, False))
+
+    return results[0]
+
 def main():
     # tree_op tests
     op = lambda a, b: a+b
@@ -17,8 +17,10 @@ from msdsl.expr.format import UIntFormat, SIntFormat, RealFormat, IntFormat
 from msdsl.expr.signals import Signal, AnalogSignal, DigitalSignal, AnalogInput, AnalogOutput, DigitalOutput, \
     DigitalInput, DigitalParameter, RealParameter
 from msdsl.generator.tree_op import tree_op
-from msdsl.generator.svreal import compile_range_expr, compile_width_expr, compile_exponent_expr
-from msdsl.expr.analyze import signal_names, signal_name
+from msdsl.generator.svreal import compile_range_expr, compile_width_expr, compile_exponent_expr, eval_range_expr, \
+    UnknownRangeError
+from msdsl.expr.analyze import signal_names, signal_name, ExprTable
+from msdsl.expr.traverse import transform_expr
 from msdsl.generator.case_statement import case_statment
 
 BITWISE_OP = {
@@ -65,8 +67,35 @@ INT_ARITH_OP = {
 }
 
 class VerilogGenerator(CodeGenerator):
-    def __init__(self, *args, **kwargs):
+    """
+    Generates a SystemVerilog module that implements the model using svreal macros.
+
+    :param cse:     If True (default), identical subexpressions are only compiled once, so that they are implemented
+                    by a single svreal macro instance that is shared by all of the places where they are used.
+    :param ranges:  Optional dictionary mapping the names of analog inputs and outputs to their ranges.  If given,
+                    range expressions are evaluated when the code is generated and written out as numbers, rather
+                    than as nested macro expressions that have to be elaborated by the synthesis tool.  The module
+                    still has range parameters for its analog ports, but they should match the values given here.
+    :param params:  Optional dictionary mapping real parameter names to their values, used to evaluate the ranges of
+                    real parameters when ranges are given.  Ranges that depend on other parameters are written out as
+                    expressions, since parameter values can be changed when the module is instantiated.
+    """
+
+    def __init__(self, *args, cse=True, ranges=None, params=None, **kwargs):
         super().__init__(*args, **kwargs)
+
+        # save settings
+        self.cse = cse
+        self.ranges = ranges
+        self.params = params
+
+        # signals that hold the values of subexpressions that have already been compiled.  if common subexpression
+        # elimination is disabled, a signal is only reused for the same expression object.
+        self.compiled_exprs = ExprTable(structural=cse)
+
+        # set while the operands of an expression are being compiled
+        self.compiling = False
+
         self.init_file()
 
     def make_section(self, label):
@@ -76,9 +105,52 @@ class VerilogGenerator(CodeGenerator):
         # before starting, make sure that the expression is wrapped in case it is a number
         expr = wrap_constant(expr)
 
+        # signals are used directly
         if isinstance(expr, Signal):
             return expr
-        elif isinstance(expr, Constant):
+
+        # expressions that contain random number generators are never reused
+        if expr.key() is None:
+            return self.make_expr(expr)
+
+        # reuse the signal for an identical subexpression if possible
+        if expr in self.compiled_exprs:
+            return self.compiled_exprs[expr]
+
+        if not self.compiling:
+            # compile the operands from the bottom up using an explicit stack, so that deeply nested expressions do
+            # not exceed the recursion limit.  the expression itself is compiled last, at which point all of the
+            # operands that it needs have been compiled already.
+            self.compiling = True
+            try:
+                transform_expr(expr, self.compiled_operands, lambda node, _: self.expr_to_signal(node))
+            finally:
+                self.compiling = False
+        else:
+            self.compiled_exprs[expr] = self.make_expr(expr)
+
+        return self.compiled_exprs[expr]
+
+    def compiled_operands(self, expr: ModelExpr):
+        # returns the operands of an expression that make_expr will compile to signals (using expr_to_signal).
+        # constants are left out since they are compiled without recursion, as are operands containing random number
+        # generators, which are not cached, and operands that have been compiled already.  for arrays of constants,
+        # only the address is needed.
+        retval = []
+        if isinstance(expr, ModelOperator):
+            for operand in expr.operands:
+                operand = wrap_constant(operand)
+                if isinstance(operand, Array) and operand.all_constants:
+                    operand = operand.address
+                if isinstance(operand, (Signal, Constant)):
+                    continue
+                if operand.key() is None or operand in self.compiled_exprs:
+                    continue
+                retval.append(operand)
+        return retval
+
+    def make_expr(self, expr: ModelExpr):
+        if isinstance(expr, Constant):
             return self.make_constant(expr)
         elif isinstance(expr, ArithmeticOperator):
             return self.make_arithmetic_operator(expr)
@@ -105,10 +177,33 @@ class VerilogGenerator(CodeGenerator):
         else:
             raise Exception(f'Unknown expression type: {expr.__class__.__name__}')
 
+    def range_value(self, expr):
+        # numeric value of a range expression, or None if it cannot be evaluated (see the ranges option)
+        if self.ranges is None:
+            return None
+        try:
+            return eval_range_expr(expr, ranges=self.signal_ranges, params=self.params)
+        except UnknownRangeError:
+            return None
+
+    def range_expr(self, expr):
+        # range expressions are written as numbers if they can be evaluated, otherwise they are compiled to
+        # SystemVerilog expressions
+        value = self.range_value(expr)
+        if value is not None:
+            return str(value)
+        else:
+            return compile_range_expr(expr)
+
     def make_signal(self, signal: Signal):
         if isinstance(signal.format_, RealFormat):
+            # keep track of numeric ranges so that other ranges defined in terms of them can be evaluated
+            value = self.range_value(signal.format_.range_)
+            if value is not None:
+                self.signal_ranges[signal.name] = value
+
             # compile the range, width, and exponent expressions
-            range = compile_range_expr(signal.format_.range_)
+            range = self.range_expr(signal.format_.range_)
             width = compile_width_expr(signal.format_.width)
             exponent = compile_exponent_expr(signal.format_.exponent)
 
@@ -248,6 +343,9 @@ class VerilogGenerator(CodeGenerator):
         if digital_params is None:
             digital_params = []
 
+        # ranges of signals that are known numerically, starting with the ranges that were given
+        self.signal_ranges = dict(self.ranges) if self.ranges is not None else {}
+
         # clear default nettype to make debugging easier
         self.default_nettype('none')
         self.writeln()
@@ -304,7 +402,7 @@ class VerilogGenerator(CodeGenerator):
                 const = str(float(expr.value))
             else:
                 const = str(expr.value)
-            range = compile_range_expr(expr.format_.range_)
+            range = self.range_expr(expr.format_.range_)
             width = compile_width_expr(expr.format_.width)
             exponent = compile_exponent_expr(expr.format_.exponent)
 
@@ -413,7 +511,7 @@ class VerilogGenerator(CodeGenerator):
 
         # create a short real variable to be assigned the selected value from the array
         array_name = next(self.namer)
-        self.macro_call('MAKE_SHORT_REAL', array_name, compile_range_expr(constant_array.format_.range_))
+        self.macro_call('MAKE_SHORT_REAL', array_name, self.range_expr(constant_array.format_.range_))
 
         # perform the multiplication
         self.macro_call('MUL_REAL', array_name, signal.name, output.name)
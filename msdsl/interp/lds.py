@@ -1,19 +1,54 @@
 import numpy as np
 from math import factorial
-from scipy.linalg import expm
+from scipy.linalg import expm, schur
 
 from msdsl.interp.interp import eval_piecewise_poly, calc_piecewise_poly
+from msdsl.cache import cached_call
+from msdsl.eqn.lds import calc_eig_decomp, calc_phi
+
+# matrix exponentials and integrals that are shared between calls (e.g., the integrals over a full interpolation
+# interval, which only depend on A, th, and k) are kept here, keyed by the contents of the matrices.  the table is
+# cleared when it reaches EXPM_MEMO_SIZE entries so that it does not grow without bound.
+EXPM_MEMO = {}
+EXPM_MEMO_SIZE = 4096
+
+
+def memoize_expm(key, func):
+    retval = EXPM_MEMO.get(key)
+    if retval is None:
+        if len(EXPM_MEMO) >= EXPM_MEMO_SIZE:
+            EXPM_MEMO.clear()
+        retval = func()
+        # the result is shared, so it should not be modified
+        retval.flags.writeable = False
+        EXPM_MEMO[key] = retval
+    return retval
+
+
+def matrix_key(M):
+    M = np.ascontiguousarray(M, dtype=float)
+    return (M.shape, M.tobytes())
+
+
+# returns e^M, using a previously computed result if possible
+def calc_expm_memo(M):
+    return memoize_expm(('expm', matrix_key(M)), lambda: expm(M))
+
 
 # returns the indefinite integral(e^(xM)*x^k)
 # intended to be used in calculating definited integrals
 # see: https://en.wikipedia.org/wiki/List_of_integrals_of_exponential_functions#Integrals_of_polynomials
 def calc_expm_indef_integral(x, M, k):
+    # M is only inverted once; the term for i uses M^(-(k-i+1))
+    M_inv = np.linalg.inv(M)
+    mat = M_inv
     retval = np.zeros(M.shape, dtype=float)
-    for i in range(0, k+1):
-        mat = np.linalg.matrix_power(M, -k+i-1)
+    for i in reversed(range(0, k+1)):
         coeff = ((-1)**(k-i))*(factorial(k)/factorial(i))
         retval += coeff*mat*(x**i)
-    retval = retval.dot(expm(x*M))
+        mat = mat.dot(M_inv)
+    if x != 0:
+        retval = retval.dot(expm(x*M))
     return retval
 
 
@@ -23,11 +58,17 @@ def calc_expm_integral(M, k, x0, x1):
             calc_expm_indef_integral(x=x0, M=M, k=k))
 
 
+# same as calc_expm_integral, using a previously computed result if possible
+def calc_expm_integral_memo(M, k, x0, x1):
+    return memoize_expm(('integral', matrix_key(M), k, float(x0), float(x1)),
+                        lambda: calc_expm_integral(M, k, x0, x1))
+
+
 # returns definite integral:
 # c*e^((p*th-tau)*A)*b*((tau-j*th)/th)^k
 # from j*th to (j+1)*th
 def calc_lds_f(A, B, C, th, p, j, k):
-    return th * C.dot(expm((p-j)*th*A)).dot(calc_expm_integral(-th*A, k, 0, 1).dot(B))
+    return th * C.dot(expm((p-j)*th*A)).dot(calc_expm_integral_memo(-th*A, k, 0, 1).dot(B))
 
 
 # returns definite integral:
@@ -39,7 +80,16 @@ def calc_lds_g(A, B, th, j, k, t):
         return np.zeros_like(B)
     else:
         ub = min(1, (t/th)-j)
-        return th*expm((t-(j*th))*A).dot(calc_expm_integral(-th*A, k, 0, ub).dot(B))
+        return th*expm((t-(j*th))*A).dot(calc_lds_g_integral(A, th, k, ub).dot(B))
+
+
+# integral part of calc_lds_g.  the integrals over full intervals (ub=1) are the same for all j and t, so they are
+# memoized.
+def calc_lds_g_integral(A, th, k, ub):
+    if ub == 1:
+        return calc_expm_integral_memo(-th*A, k, 0, 1)
+    else:
+        return calc_expm_integral(-th*A, k, 0, ub)
 
 
 # calculates the A_tilde matrix
@@ -56,13 +106,18 @@ def calc_lds_b_tilde(A, B, W, t):
     # calculate timestep between interpolation points
     th = 1/(npts-1)
 
-    # calculate f_tilde
-    f_tilde = []
-    for j in range(npts):
-        f_tilde.append([])
-        for k in range(order+1):
-            f_tilde_jk = calc_lds_g(A=A, B=B, th=th, j=j, k=k, t=t)
-            f_tilde[-1].append(f_tilde_jk)
+    # calculate f_tilde (see calc_lds_g).  e^((t-j*th)*A) is computed directly for the last interval that has started,
+    # and the exponentials for earlier intervals are found by repeatedly multiplying by e^(th*A).
+    f_tilde = [[np.zeros_like(B) for k in range(order+1)] for j in range(npts)]
+    started = [j for j in range(npts) if not (t < (j*th))]
+    if len(started) > 0:
+        E_th = calc_expm_memo(th*A)
+        X = expm((t-(started[-1]*th))*A)
+        for j in reversed(started):
+            ub = min(1, (t/th)-j)
+            for k in range(order+1):
+                f_tilde[j][k] = th*X.dot(calc_lds_g_integral(A, th, k, ub).dot(B))
+            X = X.dot(E_th)
 
     # calculate b_tilde
     b_tilde = []
@@ -79,11 +134,13 @@ def calc_lds_b_tilde(A, B, W, t):
 
 # calculates C_tilde matrix
 def calc_lds_c_tilde(A, C, npts):
-    # build up matrix
+    # build up matrix, using the fact that e^(p*th*A) = (e^(th*A))^p
     c_tilde = [None] * npts
-    dtvec = np.linspace(0, 1, npts)
-    for p in range(npts):
-        c_tilde[p] = C.dot(expm(dtvec[p] * A))
+    th = 1/(npts-1)
+    E_th = calc_expm_memo(th*A)
+    c_tilde[0] = C.copy()
+    for p in range(1, npts):
+        c_tilde[p] = c_tilde[p-1].dot(E_th)
 
     # return matrix
     return c_tilde
@@ -98,6 +155,15 @@ def calc_lds_d_tilde(A, B, C, D, W):
     # calculate timestep between interpolation points
     th = 1/(npts-1)
 
+    # calc_lds_f only depends on p-j and k, so its values are tabulated first.  this only requires the integrals for
+    # each k and the powers of e^(th*A).
+    integrals = [calc_expm_integral_memo(-th*A, k, 0, 1).dot(B) for k in range(order+1)]
+    c_tilde = calc_lds_c_tilde(A, C, npts)
+    f_table = np.zeros((npts, order+1), dtype=float)
+    for m in range(1, npts):
+        for k in range(order+1):
+            f_table[m, k] = (th * c_tilde[m].dot(integrals[k])).item()
+
     # build up matrix
     d_tilde = np.zeros((npts, npts), dtype=float)
     for p in range(npts):
@@ -105,16 +171,72 @@ def calc_lds_d_tilde(A, B, C, D, W):
             d_tilde[p, i] += D * W[p, 0, i]
             for j in range(p):
                 for k in range(order + 1):
-                    d_tilde[p, i] += W[j, k, i] * calc_lds_f(A, B, C, th, p, j, k)
+                    d_tilde[p, i] += W[j, k, i] * f_table[p-j, k]
 
     # return matrix
     return d_tilde
 
 
+# returns an array that is (len(tvec), num_state, num_state) containing e^(t*A) for each t in tvec.  A is diagonalized
+# once, so that only scalar exponentials have to be evaluated for each t.
+def sample_lds_a_tilde(A, tvec):
+    tvec = np.asarray(tvec, dtype=float)
+    eig = calc_eig_decomp(A)
+    if eig is None:
+        # fallback: matrix exponential of the triangular Schur form for each t
+        T, Q = schur(A, output='complex')
+        retval = [Q.dot(expm(t*T)).dot(Q.conj().T) for t in tvec]
+        return np.real(np.array(retval).reshape((len(tvec),) + A.shape))
+    lam, V, V_inv = eig
+    exp_lam = np.exp(np.multiply.outer(tvec, lam))
+    return np.real(np.einsum('ij,tj,jk->tik', V, exp_lam, V_inv))
+
+
+# returns an array that is (len(tvec), npts, num_state) containing calc_lds_b_tilde for each t in tvec (B should have
+# a single column).  in the eigenbasis of A, calc_lds_g reduces to
+# th*e^(lam*w)*ub^(k+1)*k!*phi_(k+1)(lam*th*ub), where ub = min(1, t/th-j) and w = t-(j+ub)*th, so all of the
+# integrals are evaluated at once.
+def sample_lds_b_tilde(A, B, W, tvec):
+    tvec = np.asarray(tvec, dtype=float)
+
+    # extract number of points and order from the shape of W
+    npts = W.shape[0]
+    order = W.shape[1] - 1
+
+    # calculate timestep between interpolation points
+    th = 1/(npts-1)
+
+    eig = calc_eig_decomp(A)
+    if eig is None:
+        # fallback: evaluate the integrals separately for each t
+        retval = np.zeros((len(tvec), npts, A.shape[0]), dtype=float)
+        for i, t in enumerate(tvec):
+            for j, elem in enumerate(calc_lds_b_tilde(A=A, B=B, W=W, t=t)):
+                retval[i, j, :] = elem.flatten()
+        return retval
+    lam, V, V_inv = eig
+
+    # upper limit of integration and distance from the end of the interval to t, which are (len(tvec), npts)
+    jvec = np.arange(npts)
+    ub = np.clip(np.subtract.outer(tvec/th, jvec), 0, 1)
+    w = np.maximum(tvec[:, np.newaxis] - (jvec + ub)*th, 0)
+
+    # scalar integrals, which are (len(tvec), npts, order+1, num_state)
+    phi = calc_phi(np.multiply.outer(ub*th, lam), order+1)[..., 1:]
+    kvec = np.arange(order+1)
+    scale = np.array([factorial(k) for k in kvec]) * (ub[..., np.newaxis]**(kvec+1))
+    g = th * np.exp(np.multiply.outer(w, lam))[:, :, np.newaxis, :] * scale[..., np.newaxis] * \
+        np.moveaxis(phi, -1, 2)
+
+    # combine using the interpolation weights, then transform back from the eigenbasis
+    h = np.einsum('jki,tjks->tis', W, g)
+    return np.real(np.einsum('rs,tis,s->tir', V, h, V_inv.dot(B)[:, 0]))
+
+
 # consumes and produces splines for LDS behavior
 # implicitly assumes time has been normalized so dtmax=1
 class SplineLDS:
-    def __init__(self, A, B, C, D, W, AB_spline=False):
+    def __init__(self, A, B, C, D, W, AB_spline=False, cache=None):
         # save settings
         self.A = A
         self.B = B
@@ -122,10 +244,11 @@ class SplineLDS:
         self.D = D
         self.W = W
         self.AB_spline = AB_spline
+        self.cache = cache
 
         # precompute matrices that can be precomputed
-        self.C_tilde = calc_lds_c_tilde(A=self.A, C=self.C, npts=self.npts)
-        self.D_tilde = calc_lds_d_tilde(A=self.A, B=self.B, C=self.C, D=self.D, W=self.W)
+        self.C_tilde = cached_call(self.cache, calc_lds_c_tilde, A=self.A, C=self.C, npts=self.npts)
+        self.D_tilde = cached_call(self.cache, calc_lds_d_tilde, A=self.A, B=self.B, C=self.C, D=self.D, W=self.W)
 
         # precompute A, B splines if desired
         if self.AB_spline:
@@ -156,9 +279,24 @@ class SplineLDS:
         else:
             return calc_lds_b_tilde(A=self.A, B=self.B, W=self.W, t=t)
 
+    def sample_A_tilde(self, tvec):
+        # returns an array that is (len(tvec), num_state, num_state)
+        if self.AB_spline:
+            return np.array([self.A_tilde(t) for t in tvec])
+        else:
+            return cached_call(self.cache, sample_lds_a_tilde, A=self.A, tvec=np.asarray(tvec, dtype=float))
+
+    def sample_B_tilde(self, tvec):
+        # returns an array that is (len(tvec), npts, num_state)
+        if self.AB_spline:
+            return np.array([[elem.flatten() for elem in self.B_tilde(t)] for t in tvec])
+        else:
+            return cached_call(self.cache, sample_lds_b_tilde, A=self.A, B=self.B, W=self.W,
+                               tvec=np.asarray(tvec, dtype=float))
+
     def precompute_A_tilde(self):
         tvec = np.linspace(0, 1, self.npts)
-        A_tilde_list = [calc_lds_a_tilde(A=self.A, t=t) for t in tvec]
+        A_tilde_list = cached_call(self.cache, sample_lds_a_tilde, A=self.A, tvec=tvec)
         self.UA = []
         for i in range(self.A.shape[0]):
             self.UA.append([])
@@ -1,3 +1,4 @@
+import numpy as np
 from msdsl.expr.expr import concatenate, ModelExpr
 
 class LFSR:
@@ -22,6 +23,102 @@ class LFSR:
 
         return self.inv_bit(retval)
 
+    def step_map(self):
+        # the LFSR update is an affine function over GF(2), represented by the images of each bit of the state
+        # (the columns of its matrix) and an offset.  the offset is one because the feedback bit is inverted.
+        cols = [((1<<(j+1)) & self.mask) | (1 if j in self.polynomial else 0) for j in range(self.n)]
+        return cols, 1
+
+    def jump_map(self, k):
+        """
+        Returns the affine function over GF(2) that advances the LFSR by k steps, as a tuple (cols, offset).  The
+        state after k steps is the XOR of offset with cols[j] for each bit j that is set in the current state.
+
+        :param k:   Number of steps.  Negative values step backwards.
+        """
+        # reduce the number of steps using the period of the LFSR
+        k %= self.period
+
+        retval = ([1<<j for j in range(self.n)], 0)
+        power = self.step_map()
+        while k > 0:
+            if k & 1:
+                retval = self.compose(power, retval)
+            power = self.compose(power, power)
+            k >>= 1
+
+        return retval
+
+    def jump(self, state, k):
+        """
+        Returns the state of the LFSR after k steps, without iterating over them.  This is useful for checking that
+        the sequences produced from different initial values do not overlap.
+
+        :param state:   Current state (an integer).
+        :param k:       Number of steps.  Negative values step backwards.
+        """
+        return self.apply_map(self.jump_map(k), state)
+
+    def sequence(self, init, n):
+        """
+        Returns the first n states of the LFSR (i.e., the values of the signal returned by
+        MixedSignalModel.lfsr_signal with the clock enable held high), starting from init.  The sequence is built up
+        by repeatedly doubling its length, since the second half of a block is an affine function of the first half.
+        Each such function is applied 16 bits at a time using lookup tables.
+
+        :param init:    Initial state.  May be an array, in which case several LFSRs are evaluated at once.
+        :param n:       Number of states.
+        :return:        Array of shape (n,) + np.shape(init).
+        """
+        assert self.n <= 64, 'Only widths up to 64 are supported.'
+
+        init = np.asarray(init)
+        out = np.empty((n,) + init.shape, dtype=np.uint64)
+        if n == 0:
+            return out
+
+        out[0] = init.astype(np.uint64)
+        filled = 1
+        while filled < n:
+            count = min(filled, n-filled)
+            cols, offset = self.jump_map(filled)
+            block = out[filled:filled+count]
+            block[...] = np.uint64(offset)
+            for lsb in range(0, self.n, 16):
+                # lookup table for the contribution of these bits of the state
+                table = np.zeros(1, dtype=np.uint64)
+                for col in cols[lsb:lsb+16]:
+                    table = np.concatenate((table, table ^ np.uint64(col)))
+                byte = (out[:count] >> np.uint64(lsb)) & np.uint64(len(table)-1)
+                np.bitwise_xor(block, table[byte], out=block)
+            filled += count
+
+        return out.view(np.int64) if self.n < 64 else out
+
+    @property
+    def mask(self):
+        return (1<<self.n)-1
+
+    @property
+    def period(self):
+        return (1<<self.n)-1
+
+    @classmethod
+    def apply_map(cls, map_, state):
+        cols, offset = map_
+        retval = offset
+        for col in cols:
+            if state & 1:
+                retval ^= col
+            state >>= 1
+        return retval
+
+    @classmethod
+    def compose(cls, f, g):
+        # returns the map that applies g and then f
+        cols = [cls.apply_map(f, col) ^ f[1] for col in g[0]]
+        return cols, cls.apply_map(f, g[1])
+
     @classmethod
     def concatenate(cls, *args):
         if all(isinstance(elem[0], int) for elem in args):
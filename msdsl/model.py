@@ -2,7 +2,7 @@ from collections import OrderedDict, Iterable
 from itertools import chain
 from numbers import Integral, Number
 from typing import List, Set, Union
-from copy import deepcopy
+from copy import copy
 from pathlib import Path
 
 from math import ceil, log2
@@ -12,9 +12,9 @@ import random
 from svreal import RealType
 from msdsl.assignment import (ThisCycleAssignment, NextCycleAssignment, BindingAssignment,
                               SyncRomAssignment, Assignment, SyncRamAssignment)
-from msdsl.expr.analyze import signal_names
+from msdsl.expr.analyze import signal_names, walk_expr, expr_dependencies, format_names
 from msdsl.eqn.cases import address_to_settings
-from msdsl.eqn.eqn_sys import EqnSys
+from msdsl.eqn.eqn_sys import EqnSys, system_key, lds_from_systems
 from msdsl.expr.expr import (ModelExpr, array, concatenate, sum_op, wrap_constant, min_op, clamp_op,
                              to_sint, to_uint, compress_uint, mt19937, lcg_op)
 from msdsl.expr.signals import (AnalogInput, AnalogOutput, DigitalInput, DigitalOutput, Signal, AnalogSignal,
@@ -25,10 +25,13 @@ from msdsl.util import Namer
 from msdsl.eqn.lds import LdsCollection
 from msdsl.expr.format import RealFormat, IntFormat, is_signed
 from msdsl.expr.extras import if_
+from msdsl.expr.fold import fold_expr
+from msdsl.expr.interval import Bounds, tighten_expr, tightened_range, same_range
 from msdsl.circuit import Circuit
 from msdsl.expr.table import Table, RealTable, SIntTable, UIntTable
 from msdsl.function import GeneralFunction, Function, PlaceholderFunction, MultiFunction
 from msdsl.lfsr import LFSR
+from msdsl.cache import ArrayCache, cached_call
 
 from scipy.signal import cont2discrete
 
@@ -38,13 +41,24 @@ class Bus:
         self.n = n
 
 class MixedSignalModel:
-    def __init__(self, module_name, *ios, dt=None, build_dir='build', real_type=RealType.FixedPoint):
+    def __init__(self, module_name, *ios, dt=None, build_dir='build', real_type=RealType.FixedPoint,
+                 cache=False):
         # save settings
         self.module_name = module_name
         self.dt = dt
         self.build_dir = Path(build_dir)
         self.real_type = real_type
 
+        # results of numerical computations, such as LDS discretization, can be cached in the build directory so that
+        # they are not recomputed each time that the model is generated.  "cache" may be True (to use the default
+        # location), an ArrayCache, or False (no caching).
+        if cache is True:
+            self.cache = ArrayCache(self.build_dir / 'cache')
+        elif isinstance(cache, ArrayCache):
+            self.cache = cache
+        else:
+            self.cache = None
+
         # initialize
         self.signals = OrderedDict()
         self.assignments = OrderedDict()
@@ -82,7 +96,7 @@ class MixedSignalModel:
             # create the bus one signal at a time
             bus = []
             for k in range(x.n):
-                signal = deepcopy(x.signal)
+                signal = copy(x.signal)
                 signal.name = f'{signal.name}_{k}'
                 bus.append(self.add_signal(signal))
 
@@ -231,7 +245,7 @@ class MixedSignalModel:
 
         if isinstance(signal, str):
             expr = wrap_constant(expr)
-            format_ = deepcopy(expr.format_)
+            format_ = copy(expr.format_)
             if isinstance(format_, RealFormat):
                 if range_ is not None:
                     format_.range_ = range_
@@ -688,6 +702,115 @@ class MixedSignalModel:
     def get_assignments(self, names: List[str]):
         return [self.get_assignment(name) for name in names]
 
+    def sort_assignments(self):
+        """
+        Returns a list of all assignments in which every ThisCycleAssignment and BindingAssignment comes after the
+        combinational assignments that it depends on.  Registered assignments (NextCycleAssignment,
+        SyncRomAssignment, and SyncRamAssignment) are placed at the end, in their original order, since their
+        outputs only change on a clock edge.  This is the evaluation order needed to execute a model in software.
+        """
+
+        # split assignments into combinational and registered ones
+        comb = OrderedDict()
+        regs = []
+        for name, assignment in self.assignments.items():
+            if isinstance(assignment, (ThisCycleAssignment, BindingAssignment)):
+                comb[name] = assignment
+            else:
+                regs.append(assignment)
+
+        # determine the combinational signals that each combinational assignment reads
+        deps = {}
+        for name, assignment in comb.items():
+            names = signal_names(walk_expr(assignment.expr, lambda e: isinstance(e, Signal)))
+            deps[name] = [dep for dep in OrderedDict.fromkeys(names) if dep in comb]
+
+        # depth-first topological sort that otherwise preserves the original order
+        retval = []
+        visited = set()
+        for root in comb:
+            if root in visited:
+                continue
+            on_path = {root}
+            stack = [(root, iter(deps[root]))]
+            while len(stack) > 0:
+                name, remaining = stack[-1]
+                for dep in remaining:
+                    if dep in on_path:
+                        raise Exception(f'Combinational loop detected involving signal {dep}.')
+                    elif dep not in visited:
+                        on_path.add(dep)
+                        stack.append((dep, iter(deps[dep])))
+                        break
+                else:
+                    stack.pop()
+                    on_path.remove(name)
+                    visited.add(name)
+                    retval.append(comb[name])
+
+        # registered assignments go last
+        retval.extend(regs)
+
+        return retval
+
+    def tighten_ranges(self):
+        """
+        Tightens the ranges of real-valued signals created by set_this_cycle (i.e., bound to an expression), as well
+        as those of the subexpressions in all assignments.  Interval arithmetic is used to take into account bounds
+        such as those from clamp_op, while affine arithmetic is used to combine terms that come from the same signal
+        (e.g., a*x - b*x).  Only ranges whose width and exponent are determined automatically are changed, and ranges
+        are never made larger.
+
+        Note that this modifies the model in place, so it should be called before compiling or simulating the model.
+        The expressions of assignments are replaced by new ones (expressions themselves are never modified), while
+        the formats of the signals whose ranges are changed are updated in place, so that every reference to those
+        signals sees the new ranges.
+
+        :return:    Dictionary mapping the names of the signals whose ranges were changed to their new ranges.
+        """
+        # compile circuits, since they create assignments
+        self.compile_circuits()
+
+        retval = {}
+        signals = {}
+        memo = {}
+        for assignment in self.sort_assignments():
+            # analyze the expression, replacing it with a version in which subexpressions may have new formats
+            original_expr = wrap_constant(assignment.expr)
+            original = original_expr.format_.range_ if isinstance(original_expr.format_, RealFormat) else None
+            expr, bounds = tighten_expr(original_expr, signals=signals, memo=memo)
+            if expr is not original_expr:
+                assignment.expr = expr
+
+            if not isinstance(assignment, BindingAssignment):
+                continue
+
+            # keep track of the bounds of the signal, which may be limited further by its own range
+            signal = assignment.signal
+            format_ = signal.format_
+            if isinstance(format_, RealFormat) and isinstance(format_.range_, Number):
+                bounds = Bounds(lo=max(bounds.lo, -format_.range_), hi=min(bounds.hi, +format_.range_),
+                                const=bounds.const, terms=bounds.terms)
+            signals[signal.name] = bounds
+
+            # update the range of the signal if its width and exponent are determined automatically
+            if not (isinstance(format_, RealFormat) and format_.width is None and format_.exponent is None):
+                continue
+            if same_range(format_.range_, original):
+                # the signal has the same range as its expression, so it can use the new range of the expression
+                range_ = expr.format_.range_
+                if same_range(range_, original):
+                    continue
+            else:
+                # the range was given explicitly, so it is only replaced by a smaller numeric range
+                range_ = tightened_range(signal, bounds)
+                if range_ is None or not isinstance(range_, Number):
+                    continue
+            signal.format_ = RealFormat(range_=range_)
+            retval[signal.name] = range_
+
+        return retval
+
     # parameter functions
 
     def add_real_param(self, name: str, default: Number=0):
@@ -782,7 +905,7 @@ class MixedSignalModel:
         # return result
         return inputs, states, outputs, sel_bits
 
-    def add_eqn_sys(self, eqns: List[ModelExpr], extra_outputs=None, clk=None, rst=None):
+    def add_eqn_sys(self, eqns: List[ModelExpr], extra_outputs=None, clk=None, rst=None, workers=None):
         """
         Accepts a list of equations that can contain derivatives of analog state variables.  The approach used is
         to convert the system of differential equations into a standard-form linear dynamical system (reference:
@@ -794,6 +917,9 @@ class MixedSignalModel:
         :param extra_outputs:   List of internal variables in the system of equations that should be bound to analog signals.
         :param clk:             Name of clock signal to use (None will default to `CLK_MSDSL)
         :param rst:             Name of the reset signal to use (None will default to `RST_MSDSL)
+        :param workers:         Number of processes used to solve and discretize the LDS's for the eqn_cases.  By
+                                default, a process pool is only used if there are many distinct cases (see
+                                msdsl.eqn.eqn_sys.lds_from_systems).
         """
 
         # set defaults
@@ -815,23 +941,33 @@ class MixedSignalModel:
             else:
                 outputs.append(extra_output)
 
-        # initialize lists of matrices
-        collection = LdsCollection()
-
-        # iterate over all of the bit combinations
+        # write out the system of equations for each bit combination.  combinations that result in the same system
+        # are only solved once.
+        systems = {}
+        case_keys = []
         for k in range(2 ** len(sel_bits)):
             # substitute values for this particular setting
             sel_bit_settings = address_to_settings(k, sel_bits)
             eqn_sys_k = eqn_sys.subst_case(sel_bit_settings)
 
-            # convert system of equations to a linear dynamical system
-            lds = eqn_sys_k.to_lds(inputs=inputs, states=states, outputs=outputs)
-
-            # discretize linear dynamical system
-            lds = lds.discretize(dt=self.dt)
-
-            # add to collection of LDS systems
-            collection.append(lds)
+            # convert to matrix form
+            system = eqn_sys_k.to_matrices(inputs=inputs, states=states, outputs=outputs)
+            key = system_key(*system[:3])
+            if key not in systems:
+                systems[key] = system
+            case_keys.append(key)
+
+        # convert each distinct system of equations to a linear dynamical system and discretize it
+        assert self.dt is not None, 'The timestep dt must be specified in order to discretize a system of equations.'
+        results = lds_from_systems(list(systems.values()), inputs=signal_names(inputs), states=signal_names(states),
+                                   outputs=signal_names(outputs), dt=self.dt, workers=workers,
+                                   cache=self.cache)
+        results = dict(zip(systems.keys(), results))
+
+        # add to collection of LDS systems
+        collection = LdsCollection()
+        for key in case_keys:
+            collection.append(results[key])
 
         # construct address for selection
         if len(sel_bits) > 0:
@@ -854,14 +990,14 @@ class MixedSignalModel:
         # state updates.  state initialization is captured in the signal itself, so it doesn't have to be explicitly
         # captured here
         for row in range(len(states)):
-            expr = sum_op([array(collection.A[row, col], sel) * states[col] for col in range(len(states))])
-            expr += sum_op([array(collection.B[row, col], sel) * inputs[col] for col in range(len(inputs))])
+            expr = sum_op(self.lds_terms(collection.A, row, sel, states) +
+                          self.lds_terms(collection.B, row, sel, inputs))
             self.set_next_cycle(states[row], expr, clk=clk, rst=rst)
 
         # output updates
         for row in range(len(outputs)):
-            expr = sum_op([array(collection.C[row, col], sel) * states[col] for col in range(len(states))])
-            expr += sum_op([array(collection.D[row, col], sel) * inputs[col] for col in range(len(inputs))])
+            expr = sum_op(self.lds_terms(collection.C, row, sel, states) +
+                          self.lds_terms(collection.D, row, sel, inputs))
 
             # if the output signal already exists, then assign it directly.  otherwise, bind the signal name to the
             # expression value
@@ -870,6 +1006,30 @@ class MixedSignalModel:
             else:
                 self.bind_name(outputs[row].name, expr)
 
+    @staticmethod
+    def lds_terms(mat, row, sel, signals):
+        """
+        Returns the terms mat[row, col, k] * signals[col] for one row of an LdsCollection matrix, where k is the case
+        selected by "sel".  Signals whose coefficient is zero in every case are skipped, and coefficients that are the
+        same in every case are used as constants, so that arrays (and the multipliers that they require) are only
+        created for coefficients that actually depend on the case.
+
+        :param mat:     LdsCollection matrix, whose last dimension is the case.
+        :param row:     Row of the matrix.
+        :param sel:     Address that selects the case.
+        :param signals: Signals to be multiplied by the coefficients.
+        """
+        terms = []
+        for col, signal in enumerate(signals):
+            values = [float(value) for value in mat[row, col, :]]
+            if all(value == 0 for value in values):
+                continue
+            elif all(value == values[0] for value in values):
+                terms.append(values[0] * signal)
+            else:
+                terms.append(array(values, sel) * signal)
+        return terms
+
     def set_tf(self, input_: Signal, output: Signal, tf, clk=None, rst=None):
         """
         Method to assign an output signal as a function of the input signal by applying a given transfer function.
@@ -883,7 +1043,7 @@ class MixedSignalModel:
         """
 
         # discretize transfer function
-        res = cont2discrete(tf, self.dt)
+        res = cached_call(self.cache, cont2discrete, tf, self.dt, method='zoh')
 
         # get numerator and denominator coefficients
         b = [+float(val) for val in res[0].flatten()]
@@ -1010,12 +1170,97 @@ class MixedSignalModel:
         self.circuits.append(c)
         return c
 
-    def compile(self, gen: CodeGenerator):
-        # compile circuits
-        for circuit in self.circuits:
+    def compile_circuits(self):
+        """
+        Converts circuits created with make_circuit into systems of equations.  Each circuit is only compiled once,
+        so it is safe to call this method more than once (e.g., by a CodeGenerator and by a Simulator).
+        """
+        while len(self.circuits) > 0:
+            circuit = self.circuits.pop(0)
             eqns = circuit.compile_to_eqn_list()
             self.add_eqn_sys(eqns, circuit.extra_outputs, clk=circuit.clk, rst=circuit.rst)
 
+    def get_dependencies(self, name: str):
+        """
+        Returns the names of the signals that the value of a signal depends on directly: those read by its
+        assignment (including control signals such as the clock enable), and those referred to by its format.
+        """
+        retval = []
+
+        # the format of the signal may refer to the ranges of other signals
+        if name in self.signals:
+            retval.extend(format_names(self.signals[name].format_))
+
+        if self.has_assignment(name):
+            assignment = self.get_assignment(name)
+            retval.extend(expr_dependencies(assignment.expr))
+            for attr in ['clk', 'rst', 'ce', 'we', 'din']:
+                control = getattr(assignment, attr, None)
+                if isinstance(control, ModelExpr):
+                    retval.extend(expr_dependencies(control))
+                elif isinstance(control, str):
+                    # controls may also be given by name
+                    retval.append(control)
+
+        return retval
+
+    def find_live_signals(self):
+        """
+        Returns the set of names of signals that the outputs, probes, or state of the model depend on (directly or
+        indirectly).  Signals that are not in this set can be removed from the model without changing its behavior.
+        """
+        # start from the outputs, probes, and state registers (including signals declared as states)
+        stack = [signal.name for signal in self.signals.values()
+                 if isinstance(signal, (AnalogOutput, DigitalOutput, AnalogState, DigitalState))]
+        stack += [signal.name for signal in self.probes]
+        stack += [name for name, assignment in self.assignments.items()
+                  if isinstance(assignment, NextCycleAssignment)]
+
+        # add everything that they depend on
+        retval = set()
+        while len(stack) > 0:
+            name = stack.pop()
+            if name not in retval:
+                retval.add(name)
+                stack.extend(self.get_dependencies(name))
+
+        return retval
+
+    def find_live_tables(self, live_signals=None):
+        """
+        Returns the lookup tables that are read by ROMs driving live signals (see find_live_signals), in the order
+        in which they were created.
+        """
+        # set defaults
+        if live_signals is None:
+            live_signals = self.find_live_signals()
+
+        used = set(id(assignment.table) for name, assignment in self.assignments.items()
+                   if isinstance(assignment, SyncRomAssignment) and name in live_signals)
+
+        return [table for table in self.lookup_tables if id(table) in used]
+
+    def compile(self, gen: CodeGenerator, prune=True, fold=True, ranges=None):
+        """
+        Compiles the model using the provided CodeGenerator.  If prune is True, assignments that do not affect the
+        outputs, probes, or state of the model are left out.  If fold is True, constants are folded and redundant
+        operations are removed from the expressions being compiled (see msdsl.expr.fold).  If ranges is given, it
+        should map the names of analog inputs and outputs to their ranges, which the generator can use to write out
+        range expressions as numbers (this overrides the ranges option of the generator).
+        """
+        # set the ranges of analog I/Os if given
+        if ranges is not None:
+            gen.ranges = ranges
+
+        # compile circuits
+        self.compile_circuits()
+
+        # determine the signals to be included
+        if prune:
+            live_signals = self.find_live_signals()
+        else:
+            live_signals = set(self.signals) | set(self.assignments)
+
         # determine the I/Os and internal variables
         ios = []
         internals = []
@@ -1025,6 +1270,8 @@ class MixedSignalModel:
                 continue
             elif not self.has_assignment(signal.name):
                 raise Exception('The signal ' + signal.name + ' has not been assigned.')
+            elif signal.name not in live_signals:
+                continue
             elif not isinstance(self.get_assignment(signal.name), BindingAssignment):
                 internals.append(signal)
 
@@ -1038,13 +1285,22 @@ class MixedSignalModel:
         for signal in internals:
             gen.make_signal(signal)
 
-        # update values of variables
-        for assignment in self.assignments.values():
+        # update values of variables.  generators that produce sequential code need the assignments to be sorted.
+        if gen.sequential:
+            assignments = self.sort_assignments()
+        else:
+            assignments = self.assignments.values()
+        assignments = [assignment for assignment in assignments if assignment.signal.name in live_signals]
+        fold_memo = {}
+        for assignment in assignments:
             # label this section of the code for debugging purposes
             gen.make_section(f'Assign signal: {assignment.signal.name}')
 
             # compile the expression to a signal
-            result = gen.expr_to_signal(assignment.expr)
+            if fold:
+                result = gen.expr_to_signal(fold_expr(assignment.expr, memo=fold_memo))
+            else:
+                result = gen.expr_to_signal(assignment.expr)
 
             # implement the update expression
             if isinstance(assignment, ThisCycleAssignment):
@@ -1075,27 +1331,39 @@ class MixedSignalModel:
         # end module
         gen.end_module()
 
-    def compile_to_file(self, gen: CodeGenerator, filename=None, name=None):
+    def compile_to_file(self, gen: CodeGenerator, filename=None, name=None, stream=False, prune=True, fold=True,
+                        ranges=None):
         """
         Compiles the model using the provided CodeGenerator, and writes the resulting model to the given filename.
+        If stream is True, the code is written to the file as it is generated, rather than being kept in memory
+        (this has no effect for generators that do not produce code in order, such as PythonGenerator).  If prune
+        is True, unused assignments are left out (see compile), as are the lookup tables that they read.  If fold is
+        True, constants are folded before generating code.  If ranges is given, range expressions are evaluated
+        using the ranges of the analog inputs and outputs (see compile).
         """
         # determine filename if needed
         if filename is None:
             if name is None:
                 name = self.module_name
-            filename = self.build_dir / f'{name}.sv'
+            filename = self.build_dir / f'{name}.{gen.extension}'
         # make sure filename is a path
         filename = Path(filename).resolve()
-
-        # compile the code
-        self.compile(gen=gen)
-
-        # write file
         filename.parent.mkdir(exist_ok=True, parents=True)
-        gen.write_to_file(filename=filename)
+
+        # compile the code and write it to the file
+        if stream and gen.streamable:
+            gen.open_stream(filename)
+            try:
+                self.compile(gen=gen, prune=prune, fold=fold, ranges=ranges)
+            finally:
+                gen.close_stream()
+        else:
+            self.compile(gen=gen, prune=prune, fold=fold, ranges=ranges)
+            gen.write_to_file(filename=filename)
 
         # write tables to file
-        for table in self.lookup_tables:
+        tables = self.find_live_tables() if prune else self.lookup_tables
+        for table in tables:
             table.path.resolve().parent.mkdir(exist_ok=True, parents=True)
             table.to_file()
 
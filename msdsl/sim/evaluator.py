@@ -0,0 +1,282 @@
+import operator
+import numpy as np
+
+from msdsl.expr.expr import (ModelExpr, wrap_constant, Constant, ArithmeticOperator, ComparisonOperator,
+                             BitwiseOperator, Concatenate, Array, TypeConversion, SIntToReal, UIntToSInt,
+                             BitwiseInv, ArithmeticShift, BitwiseAccess, RealToSInt, SIntToUInt, BitwiseAnd,
+                             BitwiseOr, BitwiseXor, ArithmeticRightShift, ArithmeticLeftShift, LessThan,
+                             LessThanOrEquals, GreaterThan, GreaterThanOrEquals, EqualTo, NotEqualTo, Sum,
+                             Product, Min, Max, CompressUInt, RandomInteger)
+from msdsl.expr.format import RealFormat, IntFormat, SIntFormat, UIntFormat
+from msdsl.expr.signals import Signal
+from msdsl.generator.tree_op import tree_op
+
+BITWISE_OP = {
+    BitwiseAnd: operator.and_,
+    BitwiseOr: operator.or_,
+    BitwiseXor: operator.xor
+}
+
+COMP_OP = {
+    LessThan: np.less,
+    LessThanOrEquals: np.less_equal,
+    GreaterThan: np.greater,
+    GreaterThanOrEquals: np.greater_equal,
+    EqualTo: np.equal,
+    NotEqualTo: np.not_equal
+}
+
+# sums and products use the Python operators, which are much faster than NumPy functions for scalars
+ARITH_OP = {
+    Sum: operator.add,
+    Product: operator.mul,
+    Min: np.minimum,
+    Max: np.maximum
+}
+
+def wrap_int(value, format_: IntFormat):
+    """
+    Truncates an integer value (or array of values) to the width of the given format, as happens when a value is
+    assigned to a Verilog signal declared with that format.
+    """
+    mask = (1<<format_.width)-1
+    if isinstance(format_, SIntFormat):
+        offset = 1<<(format_.width-1)
+        return ((value + offset) & mask) - offset
+    elif isinstance(format_, UIntFormat):
+        return value & mask
+    else:
+        raise Exception(f'Unknown integer format type: {format_.__class__.__name__}')
+
+class Evaluator:
+    """
+    Compiles ModelExpr trees into Python closures that compute the value of the expression from a dictionary mapping
+    signal names to their values in the current cycle.  The dispatch mirrors VerilogGenerator.expr_to_signal, and
+    operations are applied in the same order as in the generated SystemVerilog (e.g., sums are reduced in a tree-wise
+    fashion), so the results match a simulation of the model compiled with FLOAT_REAL.  Values are NumPy arrays
+    (or scalars) whose shape is broadcast across all operands.
+
+    :param make_source: Optional function used to compile expressions with internal state (i.e., random number
+                        generators).  It is called with the expression and should return a function that looks up
+                        the value of the expression in the current cycle.
+    """
+
+    def __init__(self, make_source=None):
+        self.make_source = make_source
+
+    def compile_expr(self, expr: ModelExpr):
+        # before starting, make sure that the expression is wrapped in case it is a number
+        expr = wrap_constant(expr)
+
+        if isinstance(expr, Signal):
+            return self.make_signal(expr)
+        elif isinstance(expr, Constant):
+            return self.make_constant(expr)
+        elif isinstance(expr, ArithmeticOperator):
+            return self.make_arithmetic_operator(expr)
+        elif isinstance(expr, CompressUInt):
+            return self.make_compress_uint(expr)
+        elif isinstance(expr, RandomInteger):
+            return self.make_random_integer(expr)
+        elif isinstance(expr, BitwiseInv):
+            return self.make_bitwise_inv(expr)
+        elif isinstance(expr, BitwiseOperator):
+            return self.make_bitwise_operator(expr)
+        elif isinstance(expr, ComparisonOperator):
+            return self.make_comparison_operator(expr)
+        elif isinstance(expr, Concatenate):
+            return self.make_concatenation(expr)
+        elif isinstance(expr, Array):
+            return self.make_array(expr)
+        elif isinstance(expr, ArithmeticShift):
+            return self.make_arithmetic_shift(expr)
+        elif isinstance(expr, BitwiseAccess):
+            return self.make_bitwise_access(expr)
+        elif isinstance(expr, TypeConversion):
+            return self.make_type_conversion(expr)
+        else:
+            raise Exception(f'Unknown expression type: {expr.__class__.__name__}')
+
+    def make_signal(self, expr: Signal):
+        name = expr.name
+        return lambda env: env[name]
+
+    def make_constant(self, expr: Constant):
+        if isinstance(expr.format_, RealFormat):
+            value = float(expr.value)
+        elif isinstance(expr.format_, IntFormat):
+            value = int(expr.value)
+        else:
+            raise ValueError(f'Unknown expression format type: ' + expr.format_.__class__.__name__)
+
+        return lambda env: value
+
+    def make_arithmetic_operator(self, expr: ArithmeticOperator):
+        # compile the inputs
+        inputs_ = [self.compile_expr(operand) for operand in expr.operands]
+
+        # define the operator used to build up the expression
+        func = ARITH_OP[type(expr)]
+        def operator(a, b):
+            return lambda env: func(a(env), b(env))
+
+        # apply the operator in a tree-wise fashion, as is done in the generated SystemVerilog
+        output = tree_op(operands=inputs_, operator=operator)
+
+        # truncate integer results to the width of the output
+        if isinstance(expr.format_, IntFormat):
+            return self.make_wrap(output, expr.format_)
+        else:
+            return output
+
+    def make_compress_uint(self, expr: CompressUInt):
+        input_ = self.compile_expr(expr.operand)
+
+        def output(env):
+            # write the input as m*(2**e), where 0.5 <= m < 1, so that e is the number of bits needed to represent
+            # the input.  then the fractional part of the result is determined by the bits following the leading one
+            mantissa, exponent = np.frexp(input_(env))
+            return np.where(exponent == 0, 0.0, exponent + 2*mantissa - 1)
+
+        return output
+
+    def make_random_integer(self, expr: RandomInteger):
+        # random number generators have internal state, so the caller has to keep track of their values
+        if self.make_source is None:
+            raise Exception(f'Random number generators are not supported by {self.__class__.__name__}.')
+        return self.make_source(expr)
+
+    def make_bitwise_inv(self, expr: BitwiseInv):
+        input_ = self.compile_expr(expr.operand)
+        mask = (1<<expr.format_.width)-1
+        return lambda env: input_(env) ^ mask
+
+    def make_bitwise_operator(self, expr: BitwiseOperator):
+        inputs_ = [self.compile_expr(operand) for operand in expr.operands]
+        func = BITWISE_OP[type(expr)]
+
+        def output(env):
+            retval = inputs_[0](env)
+            for input_ in inputs_[1:]:
+                retval = func(retval, input_(env))
+            return retval
+
+        return output
+
+    def make_comparison_operator(self, expr: ComparisonOperator):
+        lhs = self.compile_expr(expr.lhs)
+        rhs = self.compile_expr(expr.rhs)
+        func = COMP_OP[type(expr)]
+        return lambda env: np.where(func(lhs(env), rhs(env)), 1, 0)
+
+    def make_concatenation(self, expr: Concatenate):
+        inputs_ = [self.compile_expr(operand) for operand in expr.operands]
+        widths = [operand.format_.width for operand in expr.operands]
+
+        def output(env):
+            retval = 0
+            for input_, width in zip(inputs_, widths):
+                retval = (retval << width) | input_(env)
+            return retval
+
+        return output
+
+    def make_array(self, expr: Array):
+        address = self.compile_expr(expr.address)
+        length = len(expr)
+
+        # values at addresses beyond the end of the array are zero, as in the default branch of the case statement
+        # in the generated SystemVerilog.  there is no need to check for this if the address cannot reach that far.
+        check_addr = ((1<<expr.address.format_.width) > length)
+
+        if expr.all_constants:
+            if isinstance(expr.format_, RealFormat):
+                values = np.array([float(element.value) for element in expr.elements] + [0.0])
+            else:
+                values = np.array([int(element.value) for element in expr.elements] + [0], dtype=np.int64)
+
+            if check_addr:
+                return lambda env: values[np.minimum(address(env), length)]
+            else:
+                return lambda env: values[address(env)]
+        else:
+            elements = [self.compile_expr(element) for element in expr.elements]
+            zero = 0.0 if isinstance(expr.format_, RealFormat) else 0
+
+            def output(env):
+                addr = address(env)
+                if check_addr:
+                    addr = np.minimum(addr, length)
+                values = np.broadcast_arrays(addr, *[element(env) for element in elements], zero)
+                return np.take_along_axis(np.stack(values[1:]), values[0][np.newaxis], axis=0)[0]
+
+            return output
+
+    def make_arithmetic_shift(self, expr: ArithmeticShift):
+        input_ = self.compile_expr(expr.operand)
+        shift = expr.shift
+
+        if isinstance(expr, ArithmeticLeftShift):
+            output = lambda env: input_(env) << shift
+        elif isinstance(expr, ArithmeticRightShift):
+            output = lambda env: input_(env) >> shift
+        else:
+            raise Exception(f'Unknown shift type: {expr.__class__.__name__}')
+
+        return self.make_wrap(output, expr.format_)
+
+    def make_bitwise_access(self, expr: BitwiseAccess):
+        input_ = self.compile_expr(expr.operand)
+        lsb = expr.lsb
+        mask = (1<<expr.format_.width)-1
+
+        output = lambda env: (input_(env) >> lsb) & mask
+
+        # the bits are re-interpreted as a signed value if necessary
+        if isinstance(expr.format_, SIntFormat):
+            return self.make_wrap(output, expr.format_)
+        else:
+            return output
+
+    def make_type_conversion(self, expr: TypeConversion):
+        input_ = self.compile_expr(expr.operand)
+
+        if isinstance(expr, SIntToReal):
+            return lambda env: np.multiply(input_(env), 1.0)
+        elif isinstance(expr, RealToSInt):
+            # conversion always rounds down
+            return self.make_wrap(lambda env: np.floor(input_(env)).astype(np.int64), expr.format_)
+        elif isinstance(expr, UIntToSInt):
+            return input_
+        elif isinstance(expr, SIntToUInt):
+            # trim off the sign bit
+            mask = (1<<(expr.operand.format_.width-1))-1
+            return lambda env: input_(env) & mask
+        else:
+            raise ValueError(f'Unknown type conversion: {expr.__class__.__name__}')
+
+    # functions that determine how real numbers are represented
+
+    def compile_assignment(self, expr: ModelExpr, signal: Signal):
+        # compiles an expression that is assigned to a signal, taking into account the format of the signal
+        output = self.compile_expr(expr)
+        if isinstance(signal.format_, IntFormat):
+            return self.make_wrap(output, signal.format_)
+        else:
+            return output
+
+    def encode_real(self, value, signal: Signal):
+        # converts a real number to the representation used for the given signal
+        return value
+
+    def decode_real(self, value, signal: Signal):
+        # converts the representation of a real-valued signal back to a real number
+        return value
+
+    def from_fixed(self, value, width, exponent, signal: Signal):
+        # converts a signed fixed-point value (e.g., read from a memory) to the representation used for the signal
+        return np.ldexp(value, exponent)
+
+    @staticmethod
+    def make_wrap(input_, format_: IntFormat):
+        return lambda env: wrap_int(input_(env), format_)
@@ -0,0 +1,444 @@
+from math import frexp
+from numbers import Integral
+import numpy as np
+
+from svreal import DEF_LONG_WIDTH_REAL, DEF_SHORT_WIDTH_REAL
+from msdsl.expr.expr import (ModelExpr, Constant, ArithmeticOperator, ComparisonOperator, Array, TypeConversion,
+                             SIntToReal, RealToSInt, Sum, Product, Min, Max, CompressUInt)
+from msdsl.expr.format import RealFormat, IntFormat
+from msdsl.expr.signals import Signal, AnalogInput, AnalogOutput, RealParameter
+from msdsl.generator.svreal import eval_range_expr, eval_width_expr, eval_exponent_expr
+from msdsl.generator.tree_op import tree_op
+from msdsl.sim.evaluator import Evaluator, COMP_OP
+
+def clog2_math(x):
+    """
+    Returns the smallest integer k such that 2**k >= x, or 0 if x is not positive.  Matches clog2_math in svreal.sv,
+    which is used to compute exponents.
+    """
+    if x <= 0:
+        return 0
+    mantissa, exponent = frexp(x)
+    return exponent-1 if mantissa == 0.5 else exponent
+
+def calc_exp(range_, width):
+    # matches CALC_EXP in svreal.sv
+    return clog2_math(range_/((2.0**(width-1))-1.0))
+
+def fixed_format(range_, width=DEF_LONG_WIDTH_REAL):
+    # format of a real number created with MAKE_GENERIC_REAL
+    return RealFormat(range_=range_, width=width, exponent=calc_exp(range_, width))
+
+def width_exp_format(width, exponent):
+    # format of a real number created with REAL_FROM_WIDTH_EXP
+    return RealFormat(range_=2.0**(width+exponent-1), width=width, exponent=exponent)
+
+def wrap_signed(value, width):
+    # truncate to a signed integer with the given width
+    offset = 1<<(width-1)
+    mask = (1<<width)-1
+    return ((value + offset) & mask) - offset
+
+def round_real(value):
+    # SystemVerilog rounds real numbers to the nearest integer when they are converted to integers, with ties
+    # rounded away from zero
+    abs_value = np.abs(value)
+    retval = np.floor(abs_value)
+    retval += (abs_value - retval) >= 0.5
+    return np.copysign(retval, value).astype(np.int64)
+
+def from_real(value, format_: RealFormat):
+    # matches the behavior of FROM_REAL, when the result is assigned to a signal with the given format
+    return wrap_signed(round_real(np.multiply(value, 2.0**(-format_.exponent))), format_.width)
+
+def assign_real(value, in_format: RealFormat, out_format: RealFormat):
+    # matches the behavior of ASSIGN_REAL.  note that right shifts round towards negative infinity.
+    lshift = in_format.exponent - out_format.exponent
+    if lshift >= 64:
+        value = np.zeros_like(value)
+    elif lshift >= 0:
+        value = value << lshift
+    else:
+        value = value >> min(-lshift, 63)
+    return wrap_signed(value, out_format.width)
+
+def make_assign_real(in_format: RealFormat, out_format: RealFormat):
+    # returns a function that is equivalent to assign_real with the given formats.  the shift and mask are worked out
+    # ahead of time, since this is the most common operation when evaluating expressions.
+    lshift = in_format.exponent - out_format.exponent
+    offset = 1<<(out_format.width-1)
+    mask = (1<<out_format.width)-1
+    if lshift >= 64:
+        return lambda value: np.zeros_like(value)
+    elif lshift > 0:
+        return lambda value: (((value << lshift) + offset) & mask) - offset
+    elif lshift == 0:
+        return lambda value: ((value + offset) & mask) - offset
+    else:
+        rshift = min(-lshift, 63)
+        return lambda value: (((value >> rshift) + offset) & mask) - offset
+
+class FixedValue:
+    """
+    Compiled real-valued expression, along with the fixed-point format of its value (i.e., the format of the signal
+    that holds the value in the generated SystemVerilog).  Calling the object evaluates the expression.
+    """
+
+    def __init__(self, func, format_: RealFormat):
+        self.func = func
+        self.format_ = format_
+
+    def __call__(self, env):
+        return self.func(env)
+
+class FormatLookup(dict):
+    # dictionary mapping signal names to one attribute of their formats, computed on demand
+
+    def __init__(self, evaluator, attr):
+        super().__init__()
+        self.evaluator = evaluator
+        self.attr = attr
+
+    def __contains__(self, name):
+        return name in self.evaluator.signals
+
+    def __missing__(self, name):
+        return getattr(self.evaluator.format_of(self.evaluator.signals[name]), self.attr)
+
+class FixedPointEvaluator(Evaluator):
+    """
+    Evaluator that reproduces the arithmetic of svreal with RealType.FixedPoint bit-for-bit.  Real-valued signals are
+    represented by int64 arrays holding their fixed-point significands, and each node in the expression tree is
+    assigned the same format (range, width, exponent) as the corresponding signal in the generated SystemVerilog.
+    Alignment and truncation therefore follow ADD_REAL, MUL_REAL, MUL_CONST_REAL, and so on.
+
+    :param signals:     Dictionary mapping names to signals, used to determine the formats of signals.
+    :param ranges:      Dictionary mapping the names of analog inputs and outputs to their ranges (or to RealFormats
+                        with a numeric range, width, and exponent).  If only a range is given, the width and exponent
+                        are chosen as with MAKE_REAL.
+    :param params:      Dictionary mapping real parameter names to their values.
+    :param make_source: Optional function used to compile random number generators (see Evaluator).
+    """
+
+    def __init__(self, signals, ranges=None, params=None, make_source=None):
+        # set defaults
+        if ranges is None:
+            ranges = {}
+        if params is None:
+            params = {}
+
+        # save settings
+        self.signals = signals
+        self.ranges = ranges
+        self.params = params
+
+        # formats of signals are computed on demand, since they may depend on each other
+        self.formats = {}
+
+        # call the super constructor
+        super().__init__(make_source=make_source)
+
+    # determining the formats of signals
+
+    def format_of(self, signal: Signal):
+        if signal.name not in self.formats:
+            if isinstance(signal, RealParameter):
+                # real parameters are converted with MAKE_CONST_REAL
+                format_ = fixed_format(1.01*abs(self.params[signal.param_name]))
+            elif isinstance(signal, (AnalogInput, AnalogOutput)):
+                # the format of an I/O is determined by the module that instantiates the model
+                if signal.name not in self.ranges:
+                    raise Exception(f'The range of I/O signal {signal.name} must be specified.')
+                format_ = self.ranges[signal.name]
+                if not isinstance(format_, RealFormat):
+                    format_ = fixed_format(format_)
+            else:
+                format_ = self.eval_format(signal.format_)
+            self.formats[signal.name] = format_
+
+        return self.formats[signal.name]
+
+    def eval_format(self, format_: RealFormat):
+        # determine the format of a signal declared in the same way as VerilogGenerator.make_signal
+        range_ = eval_range_expr(format_.range_, ranges=FormatLookup(self, 'range_'), params=self.params)
+        width = eval_width_expr(format_.width, widths=FormatLookup(self, 'width'))
+        exponent = eval_exponent_expr(format_.exponent, exponents=FormatLookup(self, 'exponent'))
+
+        if range_ is None:
+            raise Exception(f'Cannot determine the fixed-point format for {format_}.')
+        elif width is None:
+            return fixed_format(range_)
+        elif exponent is None:
+            return fixed_format(range_, width)
+        else:
+            return RealFormat(range_=range_, width=width, exponent=exponent)
+
+    # conversion between real numbers and their representations
+
+    def compile_assignment(self, expr: ModelExpr, signal: Signal):
+        if isinstance(signal.format_, RealFormat):
+            input_ = self.compile_expr(expr)
+            func = input_.func
+            out_format = self.format_of(signal)
+            assign = make_assign_real(input_.format_, out_format)
+            return FixedValue(lambda env: assign(func(env)), out_format)
+        else:
+            return super().compile_assignment(expr, signal)
+
+    def encode_real(self, value, signal: Signal):
+        return from_real(value, self.format_of(signal))
+
+    def decode_real(self, value, signal: Signal):
+        return np.ldexp(value, self.format_of(signal).exponent)
+
+    def from_fixed(self, value, width, exponent, signal: Signal):
+        return assign_real(value, width_exp_format(width, exponent), self.format_of(signal))
+
+    # compiling expressions
+
+    def make_signal(self, expr: Signal):
+        if isinstance(expr.format_, RealFormat):
+            name = expr.name
+            return FixedValue(lambda env: env[name], self.format_of(expr))
+        else:
+            return super().make_signal(expr)
+
+    def make_constant(self, expr: Constant):
+        if not isinstance(expr.format_, RealFormat):
+            return super().make_constant(expr)
+
+        # determine the format of the constant, as in VerilogGenerator.make_constant
+        value = float(expr.value)
+        if expr.format_.width is None:
+            format_ = fixed_format(1.01*abs(value))
+        elif expr.format_.exponent is None:
+            format_ = fixed_format(1.01*abs(value), expr.format_.width)
+        else:
+            format_ = self.eval_format(expr.format_)
+
+        # the value is computed once, since it is constant
+        fixed = from_real(value, format_)
+        return FixedValue(lambda env: fixed, format_)
+
+    def make_arithmetic_operator(self, expr: ArithmeticOperator):
+        if not isinstance(expr.format_, RealFormat):
+            return super().make_arithmetic_operator(expr)
+
+        # special cases for multiplication, as in VerilogGenerator
+        if isinstance(expr, Product) and (len(expr.operands) == 2):
+            if isinstance(expr.operands[0], Constant) or isinstance(expr.operands[1], Constant):
+                return self.make_constant_mul(expr)
+            elif (isinstance(expr.operands[0], Array) and expr.operands[0].all_constants) or \
+                 (isinstance(expr.operands[1], Array) and expr.operands[1].all_constants):
+                return self.make_constant_array_mul(expr)
+
+        # compile the inputs
+        inputs_ = [self.compile_expr(operand) for operand in expr.operands]
+
+        # define the operator used to build up the expression
+        if isinstance(expr, Sum):
+            operator = self.add_real
+        elif isinstance(expr, Product):
+            operator = self.mul_real
+        elif isinstance(expr, Min):
+            operator = lambda a, b: self.ite_real(a, b, np.less)
+        elif isinstance(expr, Max):
+            operator = lambda a, b: self.ite_real(a, b, np.greater)
+        else:
+            raise Exception(f'Unknown arithmetic operator: {expr.__class__.__name__}')
+
+        # apply the operator in a tree-wise fashion
+        return tree_op(operands=inputs_, operator=operator)
+
+    @staticmethod
+    def add_real(a: FixedValue, b: FixedValue):
+        # ADD_REAL
+        out_format = fixed_format(a.format_.range_ + b.format_.range_)
+        a_func, a_align = a.func, make_assign_real(a.format_, out_format)
+        b_func, b_align = b.func, make_assign_real(b.format_, out_format)
+        wrap = make_assign_real(out_format, out_format)
+
+        return FixedValue(lambda env: wrap(a_align(a_func(env)) + b_align(b_func(env))), out_format)
+
+    @staticmethod
+    def mul_real(a: FixedValue, b: FixedValue, out_format: RealFormat=None):
+        # MUL_REAL (or MUL_INTO_REAL, if the output format is specified)
+        if out_format is None:
+            out_format = fixed_format(a.format_.range_ * b.format_.range_)
+
+        # the full product is computed before being assigned to the output
+        prod_format = RealFormat(range_=a.format_.range_ * b.format_.range_,
+                                 width=a.format_.width + b.format_.width,
+                                 exponent=a.format_.exponent + b.format_.exponent)
+        if prod_format.width > 64:
+            raise Exception(f'Cannot multiply fixed-point numbers with a combined width of {prod_format.width}.')
+
+        a_func, b_func = a.func, b.func
+        assign = make_assign_real(prod_format, out_format)
+        return FixedValue(lambda env: assign(a_func(env)*b_func(env)), out_format)
+
+    @staticmethod
+    def ite_real(a: FixedValue, b: FixedValue, func):
+        # MIN_REAL and MAX_REAL: select "a" if func(a, b) is true, otherwise "b"
+        out_format = fixed_format(max(a.format_.range_, b.format_.range_))
+
+        def output(env):
+            a_value = a(env)
+            b_value = b(env)
+
+            # comparison is exact, since both values are aligned to the smaller exponent
+            cond = func(np.ldexp(a_value, a.format_.exponent), np.ldexp(b_value, b.format_.exponent))
+
+            # both inputs are aligned to the output format
+            return np.where(cond, assign_real(a_value, a.format_, out_format),
+                            assign_real(b_value, b.format_, out_format))
+
+        return FixedValue(output, out_format)
+
+    def make_constant_mul(self, expr: Product):
+        # figure out which operand is the constant and which is the signal
+        if isinstance(expr.operands[0], Constant):
+            constant = expr.operands[0]
+            signal = self.compile_expr(expr.operands[1])
+        else:
+            constant = expr.operands[1]
+            signal = self.compile_expr(expr.operands[0])
+
+        if constant.value == -1:
+            # NEGATE_REAL
+            format_ = signal.format_
+            return FixedValue(lambda env: wrap_signed(-signal(env), format_.width), format_)
+        else:
+            # MUL_CONST_REAL: the constant is represented with a short width
+            const_range = 1.01*abs(float(constant.value))
+            const_format = fixed_format(const_range, DEF_SHORT_WIDTH_REAL)
+            const_value = from_real(float(constant.value), const_format)
+            const = FixedValue(lambda env: const_value, const_format)
+
+            # the output range is computed from the constant itself, rather than from its representation
+            out_format = fixed_format(const_range*signal.format_.range_)
+            return self.mul_real(const, signal, out_format=out_format)
+
+    def make_constant_array_mul(self, expr: Product):
+        # figure out which operand is the constant array and which is the signal
+        if isinstance(expr.operands[0], Array) and expr.operands[0].all_constants:
+            constant_array = expr.operands[0]
+            signal = self.compile_expr(expr.operands[1])
+        else:
+            constant_array = expr.operands[1]
+            signal = self.compile_expr(expr.operands[0])
+
+        # the selected value is held in a short real number
+        range_ = eval_range_expr(constant_array.format_.range_, ranges=FormatLookup(self, 'range_'),
+                                 params=self.params)
+        array_format = fixed_format(range_, DEF_SHORT_WIDTH_REAL)
+
+        # build the array itself, with a value of zero for addresses beyond the end of the array
+        values = np.array([from_real(float(element.value), array_format) for element in constant_array.elements]
+                          + [0], dtype=np.int64)
+        array = FixedValue(self.make_lookup(values, constant_array.address), array_format)
+
+        # multiply the array by the signal
+        return self.mul_real(array, signal)
+
+    def make_lookup(self, values, address: ModelExpr):
+        # the last entry of values is used for addresses beyond the end of the array
+        address_func = self.compile_expr(address)
+        length = len(values)-1
+        if (1<<address.format_.width) > length:
+            return lambda env: values[np.minimum(address_func(env), length)]
+        else:
+            return lambda env: values[address_func(env)]
+
+    def make_compress_uint(self, expr: CompressUInt):
+        input_ = self.compile_expr(expr.operand)
+        in_width = expr.operand.format_.width
+
+        # the compressed value is first represented with an exponent that makes it exact
+        count_width = int(in_width).bit_length()
+        data_format = RealFormat(range_=in_width+1, width=1+count_width+(in_width-1), exponent=-in_width+1)
+        out_format = fixed_format(in_width+1)
+
+        def output(env):
+            value = np.asarray(input_(env), dtype=np.int64)
+
+            # number of bits needed to represent the input
+            count = np.where(value == 0, 0, np.frexp(value)[1])
+
+            # bits following the leading one
+            aligned = (value << (in_width - count)) & ((1<<(in_width-1))-1)
+
+            # combine the two parts and assign to the output
+            data = (count << (in_width-1)) | aligned
+            return assign_real(data, data_format, out_format)
+
+        return FixedValue(output, out_format)
+
+    def make_comparison_operator(self, expr: ComparisonOperator):
+        lhs = self.compile_expr(expr.lhs)
+        rhs = self.compile_expr(expr.rhs)
+
+        if isinstance(lhs, FixedValue) and isinstance(rhs, FixedValue):
+            # the comparison is exact, as in comp_real
+            func = COMP_OP[type(expr)]
+            lhs_exp = lhs.format_.exponent
+            rhs_exp = rhs.format_.exponent
+            return lambda env: np.where(func(np.ldexp(lhs(env), lhs_exp), np.ldexp(rhs(env), rhs_exp)), 1, 0)
+        else:
+            return super().make_comparison_operator(expr)
+
+    def make_array(self, expr: Array):
+        if not isinstance(expr.format_, RealFormat):
+            return super().make_array(expr)
+
+        # all elements are aligned to the format of the output
+        out_format = self.eval_format(expr.format_)
+        elements = [self.compile_expr(element) for element in expr.elements]
+
+        if expr.all_constants:
+            values = np.array([assign_real(element(None), element.format_, out_format) for element in elements]
+                              + [0], dtype=np.int64)
+            return FixedValue(self.make_lookup(values, expr.address), out_format)
+        else:
+            aligned = [FixedValue(lambda env, e=element: assign_real(e(env), e.format_, out_format), out_format)
+                       for element in elements]
+            zero = FixedValue(lambda env: 0, out_format)
+            address = self.compile_expr(expr.address)
+            length = len(elements)
+            check_addr = ((1<<expr.address.format_.width) > length)
+
+            def output(env):
+                addr = address(env)
+                if check_addr:
+                    addr = np.minimum(addr, length)
+                values = np.broadcast_arrays(addr, *[element(env) for element in aligned], zero(env))
+                return np.take_along_axis(np.stack(values[1:]), values[0][np.newaxis], axis=0)[0]
+
+            return FixedValue(output, out_format)
+
+    def make_type_conversion(self, expr: TypeConversion):
+        if isinstance(expr, SIntToReal):
+            # INT_TO_REAL
+            input_ = self.compile_expr(expr.operand)
+            return FixedValue(input_, width_exp_format(expr.operand.format_.width, 0))
+        elif isinstance(expr, RealToSInt):
+            # REAL_TO_INT, which rounds down
+            input_ = self.compile_expr(expr.operand)
+            in_format = input_.format_
+            out_format = width_exp_format(expr.format_.width, 0)
+            return lambda env: assign_real(input_(env), in_format, out_format)
+        else:
+            return super().make_type_conversion(expr)
+
+def main():
+    # compare the fixed-point representation of a sum with the exact value
+    from msdsl.expr.signals import AnalogInput
+    a = AnalogInput('a')
+    b = AnalogInput('b')
+    evaluator = FixedPointEvaluator(signals={'a': a, 'b': b}, ranges={'a': 1.0, 'b': 2.0})
+    expr = evaluator.compile_expr(a + 0.1*b)
+    env = {'a': evaluator.encode_real(0.25, a), 'b': evaluator.encode_real(-1.5, b)}
+    print(f'{np.ldexp(expr(env), expr.format_.exponent)} (exact: {0.25 + 0.1*(-1.5)})')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+import numpy as np
+
+MASK32 = (1<<32)-1
+
+# LCG constants used by lcg_msdsl
+LCG_MULT = 69069
+LCG_INC = 1
+
+# MT19937 constants
+MT_N = 624
+MT_M = 397
+MT_INIT_MULT = 1812433253
+MT_MATRIX_A = 0x9908b0df
+MT_UPPER_MASK = 0x80000000
+MT_LOWER_MASK = 0x7fffffff
+
+def select(condlist, choicelist, default):
+    # equivalent to np.select, but faster for small arrays
+    retval = default
+    for cond, choice in zip(reversed(condlist), reversed(choicelist)):
+        retval = np.where(cond, choice, retval)
+    return retval
+
+class LCGCore:
+    """
+    Cycle-accurate model of the lcg_msdsl module in msdsl.sv, evaluated for several independent lanes at once.
+
+    :param lanes:   Number of independent generators to simulate.
+    """
+
+    def __init__(self, lanes=1):
+        self.lanes = lanes
+        self.out = np.zeros(lanes, dtype=np.int64)
+
+    def reset(self, seed):
+        self.out = np.broadcast_to(seed, (self.lanes,)).astype(np.int64) & MASK32
+
+    def output(self):
+        return self.out
+
+    def update(self, rst, cke, seed):
+        rst = np.broadcast_to(rst, (self.lanes,)) != 0
+        cke = np.broadcast_to(cke, (self.lanes,)) != 0
+        seed = np.broadcast_to(seed, (self.lanes,)).astype(np.int64) & MASK32
+
+        self.out = np.where(rst, seed, np.where(cke, (LCG_MULT*self.out + LCG_INC) & MASK32, self.out))
+
+class MT19937Core:
+    """
+    Cycle-accurate model of the mt19937_wrapper module in msdsl.sv (which in turn wraps axis_mt19937), evaluated for
+    several independent lanes at once.  The state machine of the RTL is reproduced register by register, so the
+    outputs match the hardware exactly, including the startup period during which the state array is seeded (about
+    20,000 cycles) and the output is zero.  Note that if cke is high in the first cycle after reset, the RTL starts
+    seeding with the default seed (5489) before the seed_start pulse arrives, so the seed input is ignored.
+
+    :param lanes:   Number of independent generators to simulate.
+    """
+
+    # FSM states
+    IDLE = 0
+    SEED = 1
+
+    # algorithm constants
+    N = MT_N
+    M = MT_M
+    DEFAULT_SEED = 5489
+    INIT_MULT = MT_INIT_MULT
+
+    def __init__(self, lanes=1):
+        self.lanes = lanes
+
+        # these registers are not affected by reset.  in the RTL, the state array and read data
+        # start out undefined; here they are assumed to be zero.
+        self.mt = np.zeros((lanes, self.N), dtype=np.int64)
+        self.mt_save = self.zeros()
+        self.rd_a_data = self.zeros()
+        self.rd_b_data = self.zeros()
+
+        # the remaining registers are set by reset
+        self.reset()
+
+    def zeros(self):
+        return np.zeros(self.lanes, dtype=np.int64)
+
+    def reset(self, seed=None):
+        # the seed is sampled later on, when seeding starts
+        self.state = self.zeros()
+        self.mti = np.full(self.lanes, self.N+1, dtype=np.int64)
+        self.rd_a_ptr = self.zeros()
+        self.rd_b_ptr = self.zeros()
+        self.product = self.zeros()
+        self.factor1 = self.zeros()
+        self.factor2 = self.zeros()
+        self.mul_cnt = self.zeros()
+        self.tdata = self.zeros()
+        self.tvalid = self.zeros()
+        self.busy = self.zeros()
+
+        # registers in the wrapper
+        self.seed_start = self.zeros()
+        self.has_started = self.zeros()
+
+    def output(self):
+        return np.where((self.tvalid != 0) & (self.busy == 0), self.tdata, 0)
+
+    @staticmethod
+    def temper(y):
+        y = y ^ (y >> 11)
+        y = y ^ ((y << 7) & 0x9d2c5680)
+        y = y ^ ((y << 15) & 0xefc60000)
+        return y ^ (y >> 18)
+
+    def update(self, rst, cke, seed):
+        rst = np.broadcast_to(rst, (self.lanes,)) != 0
+        cke = np.broadcast_to(cke, (self.lanes,)) != 0
+        seed = np.broadcast_to(seed, (self.lanes,)).astype(np.int64) & MASK32
+
+        # most of the startup period is spent in the shift-and-add multiplier used for seeding, so that case is
+        # handled separately when it applies to all lanes.  the read ports and mt_save are unchanged, because
+        # the read pointers are not updated and the state array is not written.
+        if (not rst.any()) and (self.state == self.SEED).all() and (self.mul_cnt != 0).all():
+            self.product = np.where(self.factor2 & 1, (self.product + self.factor1) & MASK32, self.product)
+            self.factor1 = (self.factor1 << 1) & MASK32
+            self.factor2 = self.factor2 >> 1
+            self.mul_cnt = self.mul_cnt - 1
+            self.tvalid = self.tvalid & ~cke
+            self.rd_a_data = self.mt[np.arange(self.lanes), self.rd_a_ptr]
+            self.rd_b_data = self.mt[np.arange(self.lanes), self.rd_b_ptr]
+            self.seed_start = np.zeros(self.lanes, dtype=np.int64) if self.has_started.all() \
+                else np.where(self.has_started != 0, 0, 1)
+            self.has_started = np.ones(self.lanes, dtype=np.int64)
+            return
+
+        # decode the branches of the FSM
+        idle = (self.state == self.IDLE)
+        seeding = (self.state == self.SEED)
+        start = idle & (self.seed_start != 0)
+        start_default = idle & ~start & cke & (self.mti == self.N+1)
+        gen = idle & ~start & cke & (self.mti != self.N+1)
+        mul = seeding & (self.mul_cnt != 0)
+        seed_next = seeding & (self.mul_cnt == 0) & (self.mti < self.N)
+        seed_done = seeding & (self.mul_cnt == 0) & (self.mti >= self.N)
+        init = start | start_default
+        load = init | seed_next
+
+        # value written to the state array while seeding
+        seed_val = select([start, start_default], [seed, self.DEFAULT_SEED], (self.product + self.mti) & MASK32)
+
+        # value written to the state array while generating numbers
+        y = (self.mt_save & 0x80000000) | (self.rd_a_data & 0x7fffffff)
+        twisted = self.rd_b_data ^ (y >> 1) ^ np.where(y & 1, MT_MATRIX_A, 0)
+
+        # compute next values of the registers
+        state_next = np.where(load | mul, self.SEED, self.IDLE)
+        mt_save_next = select([load, gen | seed_done], [seed_val, self.rd_a_data], self.mt_save)
+        mti_next = select([init, gen, seed_next, seed_done],
+                             [1, np.where(self.mti < self.N-1, self.mti+1, 0), self.mti+1, 0], self.mti)
+        rd_a_ptr_next = select([gen, seed_next, seed_done],
+                                  [np.where(self.rd_a_ptr < self.N-1, self.rd_a_ptr+1, 0), 0, 1], self.rd_a_ptr)
+        rd_b_ptr_next = select([gen, seed_done],
+                                  [np.where(self.rd_b_ptr < self.N-1, self.rd_b_ptr+1, 0), self.M], self.rd_b_ptr)
+        product_next = select([load, mul & ((self.factor2 & 1) != 0)],
+                                 [0, (self.product + self.factor1) & MASK32], self.product)
+        factor1_next = select([load, mul], [seed_val ^ (seed_val >> 30), (self.factor1 << 1) & MASK32],
+                                 self.factor1)
+        factor2_next = select([load, mul], [self.INIT_MULT, self.factor2 >> 1], self.factor2)
+        mul_cnt_next = select([load, mul], [31, self.mul_cnt-1], self.mul_cnt)
+        tdata_next = np.where(gen, self.temper(twisted), self.tdata)
+        tvalid_next = np.where(gen, 1, self.tvalid & ~cke)
+
+        # write port of the state array
+        wr_en = (load | gen) & ~rst
+        wr_ptr = np.where(init, 0, self.mti)
+        wr_data = np.where(gen, twisted, seed_val)
+
+        # update registers, reading from the state array before it is written
+        lanes = np.arange(self.lanes)
+        self.rd_a_data = np.where(rst, self.rd_a_data, self.mt[lanes, rd_a_ptr_next])
+        self.rd_b_data = np.where(rst, self.rd_b_data, self.mt[lanes, rd_b_ptr_next])
+        self.mt[lanes[wr_en], wr_ptr[wr_en]] = wr_data[wr_en]
+        self.mt_save = np.where(rst, self.mt_save, mt_save_next)
+
+        self.state = np.where(rst, self.IDLE, state_next)
+        self.mti = np.where(rst, self.N+1, mti_next)
+        self.rd_a_ptr = np.where(rst, 0, rd_a_ptr_next)
+        self.rd_b_ptr = np.where(rst, 0, rd_b_ptr_next)
+        self.product = np.where(rst, 0, product_next)
+        self.factor1 = np.where(rst, 0, factor1_next)
+        self.factor2 = np.where(rst, 0, factor2_next)
+        self.mul_cnt = np.where(rst, 0, mul_cnt_next)
+        self.tdata = np.where(rst, 0, tdata_next)
+        self.tvalid = np.where(rst, 0, tvalid_next)
+        self.busy = np.where(rst, 0, state_next != self.IDLE)
+
+        # seed_start is pulsed once after reset
+        self.seed_start = np.where(rst | (self.has_started != 0), 0, 1)
+        self.has_started = np.where(rst, 0, 1)
+
+def lcg_jump(k):
+    """
+    Returns the multiplier and increment that advance the LCG by k steps, i.e., k updates of the LCG are equivalent
+    to x -> (a*x + c) & MASK32.
+
+    :param k:   Number of steps.
+    :return:    Tuple (a, c).
+    """
+    a, c = 1, 0
+    step_a, step_c = LCG_MULT, LCG_INC
+    while k > 0:
+        if k & 1:
+            a, c = (step_a*a) & MASK32, (step_a*c + step_c) & MASK32
+        step_a, step_c = (step_a*step_a) & MASK32, (step_a*step_c + step_c) & MASK32
+        k >>= 1
+    return a, c
+
+def lcg_sequence(seed, n):
+    """
+    Returns the first n outputs of the lcg_msdsl module in msdsl.sv after it is reset with the given seed, with the
+    clock enable held high.  The outputs are bit-exact, but are computed without iterating over cycles: the sequence
+    is built up by repeatedly doubling its length, since the second half of a block is an affine function of the
+    first half.
+
+    :param seed:    Seed of the generator.  May be an array, in which case several generators are evaluated at once.
+    :param n:       Number of outputs.
+    :return:        Array of shape (n,) + np.shape(seed).
+    """
+    seed = np.asarray(seed)
+    out = np.empty((n,) + seed.shape, dtype=np.uint64)
+    if n == 0:
+        return out.view(np.int64)
+
+    out[0] = seed.astype(np.uint64) & np.uint64(MASK32)
+    filled = 1
+    while filled < n:
+        count = min(filled, n-filled)
+        a, c = lcg_jump(filled)
+        block = out[filled:filled+count]
+        np.multiply(out[:count], np.uint64(a), out=block)
+        np.add(block, np.uint64(c), out=block)
+        np.bitwise_and(block, np.uint64(MASK32), out=block)
+        filled += count
+
+    return out.view(np.int64)
+
+def mt19937_init(seed):
+    """
+    Returns the initial state array of MT19937 (init_genrand in the reference implementation), as used by the
+    mt19937_wrapper module in msdsl.sv.
+
+    :param seed:    Seed of the generator.  May be an array, in which case several generators are initialized.
+    :return:        Array of shape (MT_N,) + np.shape(seed), with dtype uint32.
+    """
+    seed = np.asarray(seed)
+    mt = np.empty((MT_N, seed.size), dtype=np.uint32)
+    mt[0] = (seed.reshape(-1).astype(np.int64) & MASK32).astype(np.uint32)
+    for i in range(1, MT_N):
+        prev = mt[i-1]
+        mt[i] = np.uint32(MT_INIT_MULT)*(prev ^ (prev >> np.uint32(30))) + np.uint32(i)
+    return mt.reshape((MT_N,) + seed.shape)
+
+def mt19937_temper(y):
+    y = y ^ (y >> np.uint32(11))
+    y = y ^ ((y << np.uint32(7)) & np.uint32(0x9d2c5680))
+    y = y ^ ((y << np.uint32(15)) & np.uint32(0xefc60000))
+    return y ^ (y >> np.uint32(18))
+
+def mt19937_sequence(seed, n):
+    """
+    Returns the first n outputs of MT19937 with the given seed.  These are the values produced by the
+    mt19937_wrapper module in msdsl.sv (and MT19937Core), which outputs zero while the state array is being seeded
+    and then produces one value per cycle in which the clock enable is high.
+
+    Rather than twisting one word at a time, the state is treated as a single sequence x[k] that obeys
+    x[k+N] = x[k+M] ^ twist(x[k], x[k+1]), which can be evaluated N-M words at a time.
+
+    :param seed:    Seed of the generator.  May be an array, in which case several generators are evaluated at once.
+    :param n:       Number of outputs.
+    :return:        Array of shape (n,) + np.shape(seed).
+    """
+    seed = np.asarray(seed)
+    buf = np.empty((MT_N + n, seed.size), dtype=np.uint32)
+    buf[:MT_N] = mt19937_init(seed.reshape(-1))
+
+    # constants
+    upper = np.uint32(MT_UPPER_MASK)
+    lower = np.uint32(MT_LOWER_MASK)
+    matrix_a = np.uint32(MT_MATRIX_A)
+    one = np.uint32(1)
+
+    # generate the sequence in blocks that only depend on words that have already been computed
+    for start in range(0, n, MT_N-MT_M):
+        stop = min(start+MT_N-MT_M, n)
+        y = (buf[start:stop] & upper) | (buf[start+1:stop+1] & lower)
+        mag = (y & one) * matrix_a
+        buf[start+MT_N:stop+MT_N] = buf[start+MT_M:stop+MT_M] ^ (y >> one) ^ mag
+
+    return mt19937_temper(buf[MT_N:]).astype(np.int64).reshape((n,) + seed.shape)
+
+def main():
+    # print the first few outputs of an LCG
+    lcg = LCGCore()
+    lcg.reset(seed=1)
+    for _ in range(5):
+        print(lcg.output())
+        lcg.update(rst=0, cke=1, seed=1)
+
+    # the same outputs are produced all at once by lcg_sequence
+    print(lcg_sequence(seed=1, n=5))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,556 @@
+import random
+from numbers import Number, Integral
+import numpy as np
+
+from svreal import RealType
+from msdsl.assignment import (ThisCycleAssignment, NextCycleAssignment, BindingAssignment,
+                              SyncRomAssignment, SyncRamAssignment)
+from msdsl.expr.analyze import walk_expr
+from msdsl.expr.expr import ModelExpr, RandomInteger, MT19937, LCG
+from msdsl.expr.format import RealFormat, IntFormat, SIntFormat
+from msdsl.expr.signals import (AnalogInput, AnalogOutput, DigitalInput, DigitalOutput, Signal,
+                                RealParameter, DigitalParameter)
+from msdsl.expr.table import RealTable, table_values
+from msdsl.sim.evaluator import Evaluator, wrap_int
+from msdsl.sim.fixed import FixedPointEvaluator
+from msdsl.sim.rng import LCGCore, MT19937Core
+from msdsl.util import Namer
+
+def split_chunks(inputs, size):
+    """
+    Splits a dictionary of input arrays into chunks with the given number of cycles (the last chunk may be shorter).
+    Scalar values are passed unchanged to every chunk.
+
+    :param inputs:  Dictionary mapping input names to arrays of values, one per cycle.
+    :param size:    Number of cycles in each chunk.
+    :return:        Generator that yields dictionaries of input arrays.
+    """
+    lengths = [len(value) for value in inputs.values() if np.ndim(value) > 0]
+    assert len(lengths) > 0, 'At least one input must be an array.'
+    for start in range(0, min(lengths), size):
+        yield {name: (value[start:start+size] if np.ndim(value) > 0 else value) for name, value in inputs.items()}
+
+class Simulator:
+    """
+    Cycle-accurate software simulation of a MixedSignalModel.  Assignments are evaluated in dependency order once per
+    clock cycle: first the combinational assignments (set_this_cycle / bind_name), and then the registered ones
+    (set_next_cycle, set_from_sync_rom, set_from_sync_ram), which are all updated at the same clock edge.  All clock
+    signals are treated as the model's emulator clock.
+
+    In run(), combinational signals that only depend on inputs and parameters are computed for all cycles at once,
+    so that only the part of the model that depends on its state is evaluated one cycle at a time.
+
+    Several independent copies of the model ("lanes") can be simulated at once by specifying the number of lanes.
+    In that case, every signal value is an array whose last axis corresponds to the lane, and parameter values,
+    initial values, and random number generator seeds may be given separately for each lane.
+
+    Real numbers are represented as floating-point values by default, matching a simulation of the generated
+    SystemVerilog with FLOAT_REAL.  With real_type=RealType.FixedPoint, the arithmetic of svreal's fixed-point mode is
+    reproduced exactly instead: every real-valued signal is stored as an integer with the same width and exponent as
+    in hardware, so quantization and overflow effects show up in the simulation.  The ranges of analog inputs and
+    outputs have to be given in that case, since they are determined by the module that instantiates the model.
+
+    Example:
+        sim = Simulator(model)
+        results = sim.run({'v_in': np.ones(1000)}, outputs=['v_out'])
+
+        sim = Simulator(model, lanes=100, params={'gain': np.linspace(1, 2, 100)})
+        results = sim.run({'v_in': np.ones(1000)}, outputs=['v_out'])  # results['v_out'].shape == (1000, 100)
+
+        sim = Simulator(model, real_type=RealType.FixedPoint, ranges={'v_in': 1.0, 'v_out': 1.0})
+
+    :param model:   MixedSignalModel to be simulated.  Any circuits in the model are compiled to equations first.
+    :param params:  Optional dictionary mapping parameter names to values.  Parameters that are not listed here take
+                    on their default values.
+    :param lanes:   Optional number of independent copies of the model to simulate.  If not specified, a single copy
+                    is simulated and signal values are scalars.
+    :param inits:   Optional dictionary mapping the names of registered signals to initial values, overriding the
+                    "init" values of the signals.
+    :param seeds:   Optional dictionary mapping the names of random number generators to seed values, overriding the
+                    seeds passed to mt19937() and lcg_op().  A generator assigned directly to a signal is named after
+                    that signal.  Generators without a seed are seeded randomly (separately for each lane).
+    :param real_type:   Representation of real numbers: RealType.FloatReal (default) or RealType.FixedPoint.
+    :param ranges:      Dictionary mapping the names of analog inputs and outputs to their ranges.  Only used with
+                        RealType.FixedPoint.  A RealFormat with a numeric range, width, and exponent may be given
+                        instead of a range to specify the format exactly.
+    """
+
+    def __init__(self, model, params=None, lanes=None, inits=None, seeds=None, real_type=RealType.FloatReal,
+                 ranges=None):
+        # set defaults
+        if params is None:
+            params = {}
+        if inits is None:
+            inits = {}
+        if seeds is None:
+            seeds = {}
+        if ranges is None:
+            ranges = {}
+
+        # make sure that circuits have been converted to systems of equations
+        model.compile_circuits()
+
+        # save settings
+        self.model = model
+        self.lanes = lanes
+        self.shape = () if lanes is None else (lanes,)
+        self.inits = inits
+        self.seeds = seeds
+        self.real_type = real_type
+        self.ranges = ranges
+
+        # determine parameter values
+        self.params = {}
+        for param in model.real_params:
+            self.params[param.param_name] = self.per_lane(params.get(param.param_name, param.default))
+        for param in model.digital_params:
+            self.params[param.name] = self.per_lane(params.get(param.name, param.default), dtype=np.int64)
+        unknown = set(params.keys()) - set(self.params.keys())
+        assert len(unknown) == 0, f'Unknown parameter(s): {sorted(unknown)}.'
+
+        # parameters are accessed in expressions through the signals that represent them
+        self.param_values = {}
+        for param in model.real_params:
+            self.param_values[param.signal_name] = self.params[param.param_name]
+        for param in model.digital_params:
+            self.param_values[param.name] = self.params[param.name]
+
+        # create the evaluator used to compile expressions, and then convert the values of real parameters to the
+        # representation that it uses
+        self.evaluator = self.make_evaluator()
+        for param in model.real_params:
+            self.param_values[param.signal_name] = self.evaluator.encode_real(self.param_values[param.signal_name],
+                                                                              param)
+
+        # determine the inputs, and make sure that everything else is assigned
+        self.inputs = []
+        for signal in model.signals.values():
+            if isinstance(signal, (AnalogInput, DigitalInput)):
+                self.inputs.append(signal)
+            elif not model.has_assignment(signal.name):
+                raise Exception('The signal ' + signal.name + ' has not been assigned.')
+
+        # random number generators are tracked by name.  those that are not assigned directly to a signal are
+        # given temporary names.
+        self.rngs = {}
+        self.namer = Namer(prefix='rng_')
+        for name in model.signals.keys():
+            self.namer.add_name(name)
+
+        # compile the assignments in the order in which they have to be evaluated.  combinational signals that only
+        # depend on inputs and parameters are "feed-forward" signals, which run() computes for all cycles at once.
+        self.comb = []
+        self.regs = []
+        self.feed_forward = set(input_.name for input_ in self.inputs) | set(self.param_values)
+        for assignment in model.sort_assignments():
+            if isinstance(assignment, (ThisCycleAssignment, BindingAssignment)):
+                self.comb.append(self.make_assign(assignment))
+                if self.is_feed_forward(assignment.expr):
+                    self.feed_forward.add(assignment.signal.name)
+            elif isinstance(assignment, NextCycleAssignment):
+                self.regs.append(self.make_mem(assignment))
+            elif isinstance(assignment, SyncRomAssignment):
+                self.regs.append(self.make_sync_rom(assignment))
+            elif isinstance(assignment, SyncRamAssignment):
+                self.regs.append(self.make_sync_ram(assignment))
+            else:
+                raise Exception('Invalid assignment type.')
+
+        # make sure that all initial values and seeds were used
+        unknown = set(inits.keys()) - set(a.signal.name for a in model.assignments.values()
+                                          if isinstance(a, NextCycleAssignment))
+        assert len(unknown) == 0, f'Unknown register(s) in inits: {sorted(unknown)}.'
+        unknown = set(seeds.keys()) - set(self.rngs)
+        assert len(unknown) == 0, f'Unknown random number generator(s) in seeds: {sorted(unknown)}.'
+
+        # initialize the state
+        self.state = None
+        self.mems = None
+        self.reset()
+
+    def make_evaluator(self):
+        if self.real_type == RealType.FloatReal:
+            return Evaluator(make_source=self.make_rng)
+        elif self.real_type == RealType.FixedPoint:
+            # the formats of real parameters are determined by their values, so they cannot vary between lanes
+            params = {}
+            for param in self.model.real_params:
+                value = np.unique(self.params[param.param_name])
+                if len(value) != 1:
+                    raise Exception(f'The value of real parameter {param.param_name} must be the same for all lanes '
+                                    f'when using fixed-point arithmetic.')
+                params[param.param_name] = float(value[0])
+            return FixedPointEvaluator(signals=self.model.signals, ranges=self.ranges, params=params,
+                                       make_source=self.make_rng)
+        else:
+            raise Exception(f'Unsupported real type: {self.real_type}')
+
+    def is_feed_forward(self, expr: ModelExpr):
+        # random number generators have internal state, so they are not feed-forward
+        for leaf in walk_expr(expr, lambda e: isinstance(e, (Signal, RandomInteger))):
+            if isinstance(leaf, RandomInteger) or leaf.name not in self.feed_forward:
+                return False
+        return True
+
+    def per_lane(self, value, dtype=None):
+        # makes sure that a value is either the same for all lanes, or specified separately for each lane
+        if self.lanes is None:
+            assert np.ndim(value) == 0, 'Values cannot be specified for each lane when lanes=None.'
+            return value
+        else:
+            value = np.asarray(value, dtype=dtype)
+            assert value.shape in {(), self.shape}, \
+                f'Expected a scalar or an array of length {self.lanes}, got shape {value.shape}.'
+            return np.broadcast_to(value, self.shape)
+
+    def lane_vector(self, value):
+        # flattens a value into a 1D array with one entry per lane (a single entry if lanes=None)
+        return np.broadcast_to(value, self.shape).reshape(-1)
+
+    # functions used to compile assignments
+
+    def compile_expr(self, expr: ModelExpr):
+        return self.evaluator.compile_expr(expr)
+
+    def compile_control(self, signal, default):
+        # handles optional clock enable, reset, and write enable signals, which may be given by name
+        if signal is None:
+            return lambda env: default
+        elif isinstance(signal, str):
+            return lambda env: env[signal]
+        else:
+            return self.compile_expr(signal)
+
+    def init_value(self, init, signal: Signal):
+        # determine the initial value of a register
+        if signal.name in self.inits:
+            value = self.per_lane(self.inits[signal.name])
+        elif isinstance(init, RealParameter):
+            value = self.params[init.param_name]
+        elif isinstance(init, DigitalParameter):
+            value = self.params[init.name]
+        elif isinstance(init, str):
+            value = self.params[init]
+        elif isinstance(init, Number):
+            value = init
+        else:
+            raise Exception(f'Could not determine the value of initial value {init}')
+
+        return self.cast(value, signal)
+
+    def cast(self, value, signal: Signal):
+        # cast a value to the format of the signal it is being assigned to
+        if isinstance(signal.format_, IntFormat):
+            return wrap_int(value, signal.format_)
+        else:
+            return self.evaluator.encode_real(value, signal)
+
+    def make_assign(self, assignment):
+        name = assignment.signal.name
+
+        # random number generators assigned directly to a signal are named after it
+        if isinstance(assignment.expr, RandomInteger):
+            expr = self.make_rng(assignment.expr, name=name)
+            format_ = assignment.signal.format_
+            return name, lambda env: wrap_int(expr(env), format_)
+        else:
+            return name, self.evaluator.compile_assignment(assignment.expr, assignment.signal)
+
+    def make_mem(self, assignment: NextCycleAssignment):
+        name = assignment.signal.name
+        next_ = self.evaluator.compile_assignment(assignment.expr, assignment.signal)
+        rst = self.compile_control(assignment.rst, 0)
+        ce = self.compile_control(assignment.ce, 1)
+        signal = assignment.signal
+        init = self.init_value(signal.init, signal)
+
+        if (assignment.ce is None) and (assignment.rst is None):
+            # the register is simply updated at every clock edge
+            def update(env, state):
+                state[name] = next_(env)
+        else:
+            def update(env, state):
+                value = np.where(ce(env), next_(env), env[name])
+                state[name] = np.where(rst(env), init, value)
+
+        def reset(state):
+            state[name] = init
+
+        return update, reset
+
+    def make_sync_rom(self, assignment: SyncRomAssignment):
+        name = assignment.signal.name
+        addr = self.compile_expr(assignment.expr)
+        ce = self.compile_control(assignment.ce, 1)
+        vals = table_values(assignment.table)
+        mask = (1<<assignment.table.addr_bits)-1
+
+        # real-valued data is converted to the format of the signal
+        if isinstance(assignment.table, RealTable):
+            vals = self.evaluator.from_fixed(vals, width=assignment.table.width, exponent=assignment.table.exp,
+                                             signal=assignment.signal)
+
+        def update(env, state):
+            state[name] = np.where(ce(env), vals[addr(env) & mask], env[name])
+
+        def reset(state):
+            state[name] = vals[0]*0
+
+        return update, reset
+
+    def make_sync_ram(self, assignment: SyncRamAssignment):
+        name = assignment.signal.name
+        addr = self.compile_expr(assignment.expr)
+        ce = self.compile_control(assignment.ce, 1)
+        we = self.compile_control(assignment.we, 0)
+        din = self.compile_control(assignment.din, 0)
+        depth = 1<<assignment.expr.format_.width
+
+        # the RAM stores signed integers that represent fixed-point values with the given format
+        data_format = SIntFormat(width=assignment.format_.width)
+        width = assignment.format_.width
+        exponent = assignment.format_.exponent
+        signal = assignment.signal
+
+        # each lane has its own copy of the memory
+        lanes = np.arange(1 if self.lanes is None else self.lanes)
+
+        def update(env, state):
+            mem = self.mems[name]
+            addr_value = self.lane_vector(addr(env))
+            ce_value = self.lane_vector(ce(env)) != 0
+
+            # read happens before write
+            data = self.evaluator.from_fixed(mem[lanes, addr_value].reshape(self.shape), width=width,
+                                             exponent=exponent, signal=signal)
+            state[name] = np.where(ce(env), data, env[name])
+
+            # write to the lanes where the write enable is active
+            write = ce_value & (self.lane_vector(we(env)) != 0)
+            if write.any():
+                data_in = self.lane_vector(wrap_int(din(env), data_format))
+                mem[lanes[write], addr_value[write]] = data_in[write]
+
+        def reset(state):
+            self.mems[name] = np.zeros((len(lanes), depth), dtype=np.int64)
+            state[name] = self.evaluator.from_fixed(0, width=width, exponent=exponent, signal=signal)
+
+        return update, reset
+
+    def make_rng(self, expr: RandomInteger, name=None):
+        # set defaults
+        if name is None:
+            name = next(self.namer)
+
+        # compile control signals
+        rst = self.compile_control(expr.rst, 0)
+        cke = self.compile_control(expr.cke, 1)
+
+        # determine the seed
+        if name in self.seeds:
+            seed_value = self.per_lane(self.seeds[name], dtype=np.int64)
+            seed = lambda env: seed_value
+        elif expr.seed is None:
+            # as in the generated SystemVerilog, a random seed is chosen.  each lane gets its own seed.
+            if self.lanes is None:
+                seed_value = random.randint(0, (1<<expr.format_.width)-1)
+            else:
+                seed_value = np.array([random.randint(0, (1<<expr.format_.width)-1)
+                                       for _ in range(self.lanes)], dtype=np.int64)
+            seed = lambda env: seed_value
+        elif isinstance(expr.seed, Integral):
+            seed = lambda env: expr.seed
+        else:
+            seed = self.compile_control(expr.seed, None)
+
+        # determine the generator type
+        if isinstance(expr, MT19937):
+            core_type = MT19937Core
+        elif isinstance(expr, LCG):
+            core_type = LCGCore
+        else:
+            raise Exception(f'Unsupported expression: {expr}')
+
+        def update(env, state):
+            core = self.rngs[name]
+            core.update(rst=self.lane_vector(rst(env)), cke=self.lane_vector(cke(env)),
+                        seed=self.lane_vector(seed(env)))
+            state[name] = core.output().reshape(self.shape)
+
+        def reset(state):
+            core = core_type(lanes=1 if self.lanes is None else self.lanes)
+
+            # the LCG is loaded with the seed upon reset, so its value has to be known at this point
+            if core_type is LCGCore:
+                try:
+                    seed_value = seed(self.param_values)
+                except KeyError:
+                    raise Exception(f'The seed of random number generator {name} must be a constant or parameter.')
+                core.reset(seed=self.lane_vector(seed_value))
+
+            self.rngs[name] = core
+            state[name] = core.output().reshape(self.shape)
+
+        self.regs.append((update, reset))
+        self.rngs[name] = None
+
+        return lambda env: env[name]
+
+    # simulation functions
+
+    def reset(self):
+        """
+        Sets all registers to their initial values, and clears the contents of RAMs.
+        """
+        self.state = {}
+        self.mems = {}
+        for _, reset in self.regs:
+            reset(self.state)
+
+    def step(self, inputs=None):
+        """
+        Simulates a single clock cycle.
+
+        :param inputs:  Dictionary mapping input names to their values during this cycle.  If several lanes are being
+                        simulated, values may be scalars (same for all lanes) or arrays with one entry per lane.
+        :return:        Dictionary mapping signal names to their values during this cycle (i.e., before the clock
+                        edge at the end of the cycle).  With fixed-point arithmetic, real-valued signals are given
+                        by their integer representations.
+        """
+        # set defaults
+        if inputs is None:
+            inputs = {}
+
+        # set up the values of signals available at the start of the cycle
+        env = self.encode_inputs(inputs)
+
+        # evaluate combinational logic and update registers
+        return self.cycle(env, self.comb)
+
+    def encode_inputs(self, inputs):
+        # returns a dictionary with the values of parameters and inputs, in the representation used by the evaluator
+        env = dict(self.param_values)
+        for input_ in self.inputs:
+            if input_.name not in inputs:
+                raise Exception(f'Missing value for input {input_.name}.')
+            if isinstance(input_.format_, RealFormat):
+                env[input_.name] = self.evaluator.encode_real(inputs[input_.name], input_)
+            else:
+                env[input_.name] = inputs[input_.name]
+        return env
+
+    def cycle(self, env, comb):
+        # evaluates the given combinational assignments, and then updates the registers.  env should contain the values
+        # of all other signals in this cycle, and the values of the signals that are computed are added to it.
+        env.update(self.state)
+        for name, expr in comb:
+            env[name] = expr(env)
+
+        state = {}
+        for update, _ in self.regs:
+            update(env, state)
+        self.state = state
+
+        return env
+
+    def run(self, inputs=None, outputs=None, n=None):
+        """
+        Simulates several clock cycles.
+
+        :param inputs:  Dictionary mapping input names to arrays of values, one per cycle.  Scalar values are held
+                        constant for the whole simulation.  If several lanes are being simulated, an array with
+                        shape (n, lanes) provides separate values for each lane, while an array with shape (n,)
+                        provides the same values to all lanes.
+        :param outputs: List of signal names to record.  Defaults to the outputs of the model.
+        :param n:       Number of cycles to simulate.  Defaults to the length of the input arrays.
+        :return:        Dictionary mapping each recorded signal name to an array of its values, one per cycle.  If
+                        several lanes are being simulated, the arrays have shape (n, lanes).
+        """
+        # set defaults
+        if inputs is None:
+            inputs = {}
+        if outputs is None:
+            outputs = [signal.name for signal in self.model.signals.values()
+                       if isinstance(signal, (AnalogOutput, DigitalOutput))]
+        if n is None:
+            lengths = [len(value) for value in inputs.values() if np.ndim(value) > 0]
+            assert len(lengths) > 0, 'The number of cycles must be specified when all inputs are constant.'
+            n = min(lengths)
+
+        # inputs are encoded for all cycles at once.  when several lanes are simulated, arrays with one value per
+        # cycle get an extra axis, so that they broadcast against per-lane values.
+        inputs = {name: (value if np.ndim(value) == 0 else self.time_axis(np.asarray(value)[:n]))
+                  for name, value in inputs.items()}
+        env = self.encode_inputs(inputs)
+
+        # feed-forward signals are computed for all cycles at once as well, leaving only the combinational
+        # assignments that depend on the state of the model to be evaluated one cycle at a time
+        comb = []
+        for name, expr in self.comb:
+            if name in self.feed_forward:
+                env[name] = expr(env)
+            else:
+                comb.append((name, expr))
+
+        # values that are known ahead of time are recorded directly
+        results = {}
+        for name in outputs:
+            if name in env:
+                results[name] = np.array(np.broadcast_to(env[name], (n,)+self.shape))
+
+        # run the simulation.  values that change from one cycle to the next are looked up by cycle, and they are
+        # converted to Python numbers in the single-lane case, since arithmetic on them is much faster.
+        if len(self.regs) > 0:
+            varying = [(name, value.tolist() if self.lanes is None else value)
+                       for name, value in env.items() if np.ndim(value) > len(self.shape)]
+            constant = {name: value for name, value in env.items() if np.ndim(value) <= len(self.shape)}
+            recorded = {name: [] for name in outputs if name not in results}
+            for k in range(n):
+                cycle_env = dict(constant)
+                for name, values in varying:
+                    cycle_env[name] = values[k]
+                self.cycle(cycle_env, comb)
+                for name, values in recorded.items():
+                    values.append(cycle_env[name])
+            for name, values in recorded.items():
+                if self.lanes is None:
+                    results[name] = np.array(values)
+                else:
+                    results[name] = np.array([np.broadcast_to(value, self.shape) for value in values])
+
+        # return results in the order requested, converting real-valued signals back to real numbers
+        retval = {}
+        for name in outputs:
+            signal = self.model.signals.get(name)
+            if signal is not None and isinstance(signal.format_, RealFormat):
+                retval[name] = self.evaluator.decode_real(results[name], signal)
+            else:
+                retval[name] = results[name]
+        return retval
+
+    def time_axis(self, value):
+        # arrays with one value per cycle are shared by all lanes
+        if (self.lanes is not None) and (value.ndim == 1):
+            return value[:, np.newaxis]
+        else:
+            return value
+
+    def stream(self, chunks, outputs=None):
+        """
+        Simulates the model one chunk of inputs at a time, so that very long simulations can be run without storing
+        the full input and output waveforms.  The state of the model (registers, memories, and random number
+        generators) carries over from one chunk to the next, so the results are the same as if the chunks were
+        concatenated and passed to run().
+
+        Example:
+            for results in sim.stream(split_chunks({'x': x_vals}, 1000000)):
+                errors += np.count_nonzero(results['y'] != 0)
+
+        :param chunks:  Iterable of dictionaries mapping input names to arrays of values, in the same form as the
+                        inputs to run().  Chunks may have different lengths.
+        :param outputs: List of signal names to record.  Defaults to the outputs of the model.
+        :return:        Generator that yields a dictionary of recorded signals for each chunk, in the same form as
+                        the results of run().
+        """
+        for chunk in chunks:
+            yield self.run(chunk, outputs=outputs)
@@ -0,0 +1,124 @@
+import json
+import time
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from msdsl.generator.verilog import VerilogGenerator
+
+def build_variant(builder, name, params, build_dir, gen=None):
+    """
+    Builds and compiles a single model variant in its own build directory.  This is the function that runs in the
+    worker processes of sweep_models, so all of its arguments have to be picklable.
+
+    :param builder:     Callable that returns a MixedSignalModel when called with the keyword arguments module_name,
+                        build_dir, and those in params (e.g., a subclass of MixedSignalModel such as CTLEModel).
+    :param name:        Name of the variant, which is also the default module name.
+    :param params:      Dictionary of keyword arguments passed to the builder.
+    :param build_dir:   Directory where the generated files are written.
+    :param gen:         Callable that returns the CodeGenerator used to compile the model.  Defaults to
+                        VerilogGenerator.
+    :return:            Dictionary describing the variant, with the files that were generated and timing
+                        information.  If the build fails, the traceback is stored under "error".
+    """
+    # set defaults
+    if gen is None:
+        gen = VerilogGenerator
+
+    build_dir = Path(build_dir).resolve()
+    kwargs = dict(module_name=name, build_dir=build_dir)
+    kwargs.update(params)
+
+    retval = {'name': name, 'params': params, 'build_dir': str(build_dir), 'files': [], 'build_time': None,
+              'compile_time': None, 'error': None}
+
+    try:
+        # construct the model
+        start = time.perf_counter()
+        model = builder(**kwargs)
+        retval['build_time'] = time.perf_counter() - start
+
+        # generate code
+        start = time.perf_counter()
+        filename = model.compile_to_file(gen())
+        retval['compile_time'] = time.perf_counter() - start
+
+        # list generated files, starting with the model itself
+        files = [filename] + [table.path.resolve() for table in model.find_live_tables()]
+        retval['files'] = [str(file) for file in files]
+    except Exception:
+        retval['error'] = traceback.format_exc()
+
+    return retval
+
+def sweep_models(builder, variants, build_dir='build', gen=None, names=None, max_workers=None,
+                 manifest='manifest.json'):
+    """
+    Builds and compiles many variants of a model in parallel, using a pool of processes.  Each variant is written to
+    its own subdirectory of build_dir, and a manifest describing the generated files and the time spent on each
+    variant is written to build_dir as well.
+
+    Example:
+        manifest = sweep_models(CTLEModel, [dict(fz=fz, fp1=fp1, dtmax=31.25e-12) for fz, fp1 in corners],
+                                build_dir='build/ctle')
+
+    :param builder:     Callable that returns a MixedSignalModel when called with the keyword arguments module_name,
+                        build_dir, and those of a variant.  It has to be picklable, so it should be a class or a
+                        function defined at the top level of a module.
+    :param variants:    List of dictionaries, each containing the keyword arguments for one variant.
+    :param build_dir:   Top-level build directory.
+    :param gen:         Callable that returns the CodeGenerator used to compile each model (for example,
+                        VerilogGenerator or functools.partial(CGenerator, real_type=RealType.FixedPoint)).
+                        Defaults to VerilogGenerator.
+    :param names:       Optional list of variant names, which are used for the subdirectories and as default module
+                        names.  Defaults to variant_0, variant_1, etc.
+    :param max_workers: Maximum number of worker processes.  Defaults to the number of CPUs.
+    :param manifest:    Name of the manifest file written to build_dir.  If None, the manifest is not written.
+    :return:            Dictionary containing a list of variants (in the order given) and the total time taken.
+    """
+    # set defaults
+    if names is None:
+        names = [f'variant_{k}' for k in range(len(variants))]
+
+    # validate input
+    assert len(names) == len(variants), 'The number of names must match the number of variants.'
+    assert len(set(names)) == len(names), 'Variant names must be unique.'
+
+    build_dir = Path(build_dir).resolve()
+
+    # build all of the variants
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(build_variant, builder, name, params, build_dir / name, gen)
+                   for name, params in zip(names, variants)]
+        results = [future.result() for future in futures]
+    total_time = time.perf_counter() - start
+
+    retval = {'variants': results, 'total_time': total_time}
+
+    # write the manifest
+    if manifest is not None:
+        build_dir.mkdir(exist_ok=True, parents=True)
+        with open(build_dir / manifest, 'w') as f:
+            json.dump(retval, f, indent=2, default=str)
+
+    return retval
+
+def rc_model(module_name, build_dir, tau, dt=0.1e-6):
+    # example builder used in main()
+    from msdsl.model import MixedSignalModel
+    from msdsl.eqn.deriv import Deriv
+
+    m = MixedSignalModel(module_name, dt=dt, build_dir=build_dir)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+    return m
+
+def main():
+    manifest = sweep_models(rc_model, [dict(tau=tau) for tau in [1e-6, 2e-6, 5e-6]], build_dir='build/sweep')
+    for variant in manifest['variants']:
+        print(variant['name'], variant['files'], variant['compile_time'])
+
+if __name__ == '__main__':
+    main()
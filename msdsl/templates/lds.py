@@ -1,5 +1,4 @@
 import numpy as np
-from tqdm import tqdm
 from scipy.linalg import expm
 from scipy.interpolate import interp1d
 from scipy.signal import tf2ss
@@ -67,7 +66,7 @@ class LDSModel(MixedSignalModel):
 
         # calculate the interpolation matrix
         W = calc_interp_w(npts=num_spline, order=spline_order)
-        self.lds = SplineLDS(A=A, B=B, C=C, D=D, W=W, AB_spline=AB_spline)
+        self.lds = SplineLDS(A=A, B=B, C=C, D=D, W=W, AB_spline=AB_spline, cache=self.cache)
 
         # build A_tilde functions
         print("Building A_tilde functions...")
@@ -130,10 +129,8 @@ class LDSModel(MixedSignalModel):
     def build_a_tilde_funcs(self, numel):
         # sample A_tilde
         tvec = np.linspace(0, 1, numel)
-        vvec = np.zeros((len(tvec), self.lds.nstates, self.lds.nstates), dtype=float)
-        for i in tqdm(range(len(tvec))):
-            # lds.A_tilde returns a matrix that is (num_state, num_state)
-            vvec[i, :, :] = self.lds.A_tilde(tvec[i])
+        # result is (len(tvec), num_state, num_state)
+        vvec = self.lds.sample_A_tilde(tvec)
 
         # build functions
         funs, sigs = [], []
@@ -148,12 +145,8 @@ class LDSModel(MixedSignalModel):
     def build_b_tilde_funcs(self, numel):
         # sample B_tilde
         tvec = np.linspace(0, 1, numel)
-        vvec = np.zeros((len(tvec), self.lds.npts, self.lds.nstates), dtype=float)
-        for i in tqdm(range(len(tvec))):
-            # lds.B_tilde returns a list of num_spline elements, each of which is (num_state, 1)
-            v = self.lds.B_tilde(tvec[i])
-            for j in range(self.lds.npts):
-                vvec[i, j, :] = v[j].flatten()
+        # result is (len(tvec), num_spline, num_state)
+        vvec = self.lds.sample_B_tilde(tvec)
 
         # build functions
         funs, sigs = [], []
@@ -0,0 +1,103 @@
+// Model generated on 2026-10-17 08:55:04.348294
+
+#include <stdint.h>
+#include <string.h>
+#include <math.h>
+
+static inline int64_t wrap_sint(int64_t v, int w) {
+    return ((int64_t) (((uint64_t) v) << (64-w))) >> (64-w);
+}
+
+static inline int64_t wrap_uint(int64_t v, int w) {
+    return (w >= 64) ? v : ((int64_t) (((uint64_t) v) & ((UINT64_C(1) << w) - 1)));
+}
+
+static inline int64_t shl(int64_t v, int n) {
+    return (int64_t) (((uint64_t) v) << n);
+}
+
+typedef double real_t;
+
+typedef struct {
+    int64_t zzz_tmp3;
+    int64_t count;
+    int64_t lfsr_state_0;
+    int64_t acc;
+    int64_t zzz_acc;
+    int64_t zzz_unused;
+} state_t;
+
+size_t state_size(void) {
+    return sizeof(state_t);
+}
+
+const char* model_info(void) {
+    return "{\"name\": \"model\", \"real_type\": \"FLOAT_REAL\", \"real_inputs\": [], \"digital_inputs\": [{\"name\": \"a\"}, {\"name\": \"ce\"}, {\"name\": \"rst\"}], \"real_outputs\": [], \"digital_outputs\": [{\"name\": \"z\"}, {\"name\": \"rand\"}, {\"name\": \"acc\"}], \"real_params\": [], \"digital_params\": []}";
+}
+
+void init_state(state_t* s, const real_t* real_params, const int64_t* digital_params) {
+    memset(s, 0, sizeof(state_t));
+    s->zzz_tmp3 = 42 & 0xffffffff;
+    s->count = wrap_uint(INT64_C(0), 5);
+    s->lfsr_state_0 = wrap_uint(INT64_C(1), 5);
+    s->acc = wrap_sint(INT64_C(3), 5);
+    s->zzz_acc = wrap_sint(INT64_C(3), 5);
+}
+
+static inline void step_impl(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    // Load the state
+    const int64_t count = s->count;
+    const int64_t lfsr_state_0 = s->lfsr_state_0;
+    const int64_t acc = s->acc;
+    // Read inputs
+    const int64_t a = digital_in[0];
+    const int64_t ce = digital_in[1];
+    const int64_t rst = digital_in[2];
+
+    // Declaring internal variables.
+    // Assign signal: z
+    const int64_t tmp1 = wrap_uint((shl(lfsr_state_0, 5)), 10);
+    const int64_t tmp2 = a ^ count;
+    const int64_t tmp0 = tmp1 | tmp2;
+    const int64_t z = wrap_uint(tmp0, 10);
+    // Assign signal: rand
+    const int64_t tmp3 = s->zzz_tmp3;
+    const int64_t rand = wrap_uint(tmp3, 32);
+    // Assign signal: count
+    const int64_t tmp5 = INT64_C(1);
+    const int64_t tmp6 = (int64_t) (((uint64_t) count) + ((uint64_t) tmp5));
+    const int64_t tmp7 = wrap_uint(tmp6, 6);
+    const int64_t tmp4 = (tmp7 >> 0) & INT64_C(31);
+    s->count = wrap_uint(tmp4, 5);
+    // Assign signal: lfsr_state_0
+    const int64_t tmp9 = (lfsr_state_0 >> 0) & INT64_C(15);
+    const int64_t tmp12 = (lfsr_state_0 >> 4) & INT64_C(1);
+    const int64_t tmp13 = (lfsr_state_0 >> 2) & INT64_C(1);
+    const int64_t tmp11 = tmp12 ^ tmp13;
+    const int64_t tmp10 = tmp11 ^ INT64_C(1);
+    const int64_t tmp8 = shl(tmp9, 1) | tmp10;
+    s->lfsr_state_0 = wrap_uint(tmp8, 5);
+    // Assign signal: acc
+    const int64_t tmp14 = a;
+    const int64_t tmp15 = (int64_t) (((uint64_t) acc) + ((uint64_t) tmp14));
+    const int64_t tmp16 = wrap_sint(tmp15, 7);
+    s->acc = (rst) ? s->zzz_acc : ((ce) ? (wrap_sint(tmp16, 5)) : acc);
+
+    // Update random number generators
+    s->zzz_tmp3 = (0) ? (42 & 0xffffffff) : ((1) ? ((int64_t) ((UINT64_C(69069)*s->zzz_tmp3 + 1) & 0xffffffff)) : s->zzz_tmp3);
+
+    // Write outputs
+    digital_out[0] = z;
+    digital_out[1] = rand;
+    digital_out[2] = acc;
+}
+
+void step(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    step_impl(s, real_in, digital_in, real_out, digital_out);
+}
+
+void run(state_t* s, int64_t n, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    for (int64_t k=0; k<n; k++) {
+        step_impl(s, real_in + k*0, digital_in + k*3, real_out + k*0, digital_out + k*3);
+    }
+}
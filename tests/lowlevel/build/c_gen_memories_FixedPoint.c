@@ -0,0 +1,101 @@
+// Model generated on 2026-10-17 08:55:04.558148
+
+#include <stdint.h>
+#include <string.h>
+#include <math.h>
+
+static inline int64_t wrap_sint(int64_t v, int w) {
+    return ((int64_t) (((uint64_t) v) << (64-w))) >> (64-w);
+}
+
+static inline int64_t wrap_uint(int64_t v, int w) {
+    return (w >= 64) ? v : ((int64_t) (((uint64_t) v) & ((UINT64_C(1) << w) - 1)));
+}
+
+static inline int64_t shl(int64_t v, int n) {
+    return (int64_t) (((uint64_t) v) << n);
+}
+
+typedef int64_t real_t;
+
+// Lookup tables
+static const real_t TMP5[] = {INT64_C(16384), INT64_C(-49152), INT64_C(98304), INT64_C(0)};
+static const real_t TMP7[] = {INT64_C(-8388608), INT64_C(-5991808), INT64_C(-3595136), INT64_C(-1198336), INT64_C(1198336), INT64_C(3595136), INT64_C(5991808), INT64_C(8388608)};
+
+typedef struct {
+    real_t gain_param;
+    real_t rom;
+    int64_t zzz_ram[8];
+    real_t ram;
+    int64_t zzz_unused;
+} state_t;
+
+size_t state_size(void) {
+    return sizeof(state_t);
+}
+
+const char* model_info(void) {
+    return "{\"name\": \"model\", \"real_type\": \"FIXED_POINT\", \"real_inputs\": [{\"name\": \"x\", \"width\": 25, \"exponent\": -23}], \"digital_inputs\": [{\"name\": \"addr\"}, {\"name\": \"sel\"}, {\"name\": \"we\"}, {\"name\": \"din\"}], \"real_outputs\": [{\"name\": \"rom\", \"width\": 25, \"exponent\": -23}, {\"name\": \"ram\", \"width\": 25, \"exponent\": -21}, {\"name\": \"y\", \"width\": 25, \"exponent\": -22}, {\"name\": \"z\", \"width\": 25, \"exponent\": -23}], \"digital_outputs\": [], \"real_params\": [{\"name\": \"gain\", \"width\": 25, \"exponent\": -23, \"default\": 2.0, \"value\": -1.5}], \"digital_params\": []}";
+}
+
+void init_state(state_t* s, const real_t* real_params, const int64_t* digital_params) {
+    memset(s, 0, sizeof(state_t));
+    const real_t gain = -12582912;
+    s->gain_param = gain;
+    s->rom = 0;
+    s->ram = 0;
+}
+
+static inline void step_impl(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    // Load the state
+    const real_t gain_param = s->gain_param;
+    const real_t rom = s->rom;
+    const real_t ram = s->ram;
+    // Read inputs
+    const real_t x = real_in[0];
+    const int64_t addr = digital_in[0];
+    const int64_t sel = digital_in[1];
+    const int64_t we = digital_in[2];
+    const int64_t din = digital_in[3];
+
+    // Assign signal: y
+    const real_t tmp1 = 8388608;
+    const real_t tmp2 = -8388608;
+    real_t tmp0;
+    switch (sel) {
+        case 0: tmp0 = wrap_sint((tmp1 >> 1), 25); break;
+        case 1: tmp0 = wrap_sint(tmp2, 25); break;
+        case 2: tmp0 = wrap_sint(x, 25); break;
+        default: tmp0 = 0; break;
+    }
+    const real_t tmp3 = wrap_sint(((gain_param * tmp0) >> 23), 25);
+    const real_t y = wrap_sint((tmp3 >> 1), 25);
+    // Assign signal: z
+    const real_t tmp4 = TMP5[(sel < 3) ? sel : 3];
+    const real_t tmp6 = wrap_sint(((tmp4 * x) >> 16), 25);
+    const real_t z = wrap_sint(tmp6, 25);
+    // Assign signal: rom
+    s->rom = TMP7[addr & 7];
+    // Assign signal: ram
+    const int64_t tmp8 = s->zzz_ram[addr];
+    s->ram = wrap_sint(shl(tmp8, 16), 25);
+    if ((1) && (we)) {
+        s->zzz_ram[addr] = wrap_sint(din, 8);
+    }
+
+    // Write outputs
+    real_out[0] = rom;
+    real_out[1] = ram;
+    real_out[2] = y;
+    real_out[3] = z;
+}
+
+void step(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    step_impl(s, real_in, digital_in, real_out, digital_out);
+}
+
+void run(state_t* s, int64_t n, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    for (int64_t k=0; k<n; k++) {
+        step_impl(s, real_in + k*1, digital_in + k*4, real_out + k*4, digital_out + k*0);
+    }
+}
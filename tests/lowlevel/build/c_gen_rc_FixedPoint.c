@@ -0,0 +1,65 @@
+// Model generated on 2026-10-17 08:55:04.269612
+
+#include <stdint.h>
+#include <string.h>
+#include <math.h>
+
+static inline int64_t wrap_sint(int64_t v, int w) {
+    return ((int64_t) (((uint64_t) v) << (64-w))) >> (64-w);
+}
+
+static inline int64_t wrap_uint(int64_t v, int w) {
+    return (w >= 64) ? v : ((int64_t) (((uint64_t) v) & ((UINT64_C(1) << w) - 1)));
+}
+
+static inline int64_t shl(int64_t v, int n) {
+    return (int64_t) (((uint64_t) v) << n);
+}
+
+typedef int64_t real_t;
+
+typedef struct {
+    real_t y;
+    int64_t zzz_unused;
+} state_t;
+
+size_t state_size(void) {
+    return sizeof(state_t);
+}
+
+const char* model_info(void) {
+    return "{\"name\": \"model\", \"real_type\": \"FIXED_POINT\", \"real_inputs\": [{\"name\": \"x\", \"width\": 25, \"exponent\": -23}], \"digital_inputs\": [], \"real_outputs\": [{\"name\": \"y\", \"width\": 25, \"exponent\": -23}], \"digital_outputs\": [], \"real_params\": [], \"digital_params\": []}";
+}
+
+void init_state(state_t* s, const real_t* real_params, const int64_t* digital_params) {
+    memset(s, 0, sizeof(state_t));
+    s->y = 0;
+}
+
+static inline void step_impl(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    // Load the state
+    const real_t y = s->y;
+    // Read inputs
+    const real_t x = real_in[0];
+
+    // Assign signal: y
+    const real_t tmp1 = 118599;
+    const real_t tmp0 = wrap_sint(((tmp1 * y) >> 16), 25);
+    const real_t tmp3 = 99785;
+    const real_t tmp2 = wrap_sint(((tmp3 * x) >> 16), 25);
+    const real_t tmp4 = wrap_sint(wrap_sint((tmp0 >> 1), 25) + wrap_sint((tmp2 >> 4), 25), 25);
+    s->y = wrap_sint(tmp4, 25);
+
+    // Write outputs
+    real_out[0] = y;
+}
+
+void step(state_t* s, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    step_impl(s, real_in, digital_in, real_out, digital_out);
+}
+
+void run(state_t* s, int64_t n, const real_t* real_in, const int64_t* digital_in, real_t* real_out, int64_t* digital_out) {
+    for (int64_t k=0; k<n; k++) {
+        step_impl(s, real_in + k*1, digital_in + k*0, real_out + k*1, digital_out + k*0);
+    }
+}
@@ -0,0 +1,24 @@
+// Model generated on 2026-10-17 08:55:04.731929
+
+`timescale 1ns/1ps
+
+`include "svreal.sv"
+`include "msdsl.sv"
+
+`default_nettype none
+
+module model #(
+    `DECL_REAL(x),
+    `DECL_REAL(y)
+) (
+    `INPUT_REAL(x),
+    `OUTPUT_REAL(y)
+);
+    // Assign signal: y
+    `MUL_CONST_REAL(0.9048374180359595, y, tmp0);
+    `MUL_CONST_REAL(0.09516258196404048, x, tmp1);
+    `ADD_REAL(tmp0, tmp1, tmp2);
+    `DFF_INTO_REAL(tmp2, y, `RST_MSDSL, `CLK_MSDSL, 1'b1, 0);
+endmodule
+
+`default_nettype wire
@@ -0,0 +1,20 @@
+// Model generated on 2026-10-17 08:55:15.779751
+
+`timescale 1ns/1ps
+
+`include "svreal.sv"
+`include "msdsl.sv"
+
+`default_nettype none
+
+module model #(
+    `DECL_REAL(y)
+) (
+    input wire logic [2:0] addr,
+    `OUTPUT_REAL(y)
+);
+    // Assign signal: y
+    `SYNC_ROM_INTO_REAL(addr, y, `CLK_MSDSL, 1'b1, 3, 18, "/root/package/tests/lowlevel/build/prune_tables/real_table_0_exp_-16.mem", -16);
+endmodule
+
+`default_nettype wire
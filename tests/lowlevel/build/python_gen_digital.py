@@ -0,0 +1,62 @@
+# Model generated on 2026-10-17 08:55:15.796200
+
+import numpy as np
+from msdsl.sim.rng import LCGCore, MT19937Core
+
+def init_state(lanes=None, **params):
+    # Parameter values
+    assert len(params) == 0, f'Unknown parameter(s): {sorted(params)}.'
+
+    # Initial values
+    state = {'_shape': () if lanes is None else (lanes,), '_lane': np.arange(1 if lanes is None else lanes)}
+    state['zzz_tmp4'] = LCGCore(lanes=len(state['_lane']))
+    state['zzz_tmp4'].reset(seed=np.broadcast_to(42, state['_lane'].shape))
+    state['count'] = 0
+    state['lfsr_state_0'] = 1
+    state['acc'] = 3
+    state['zzz_acc'] = 3
+    return state
+
+def step(state, inputs):
+    # Load the state
+    _shape = state['_shape']
+    _lane = state['_lane']
+    count = state['count']
+    lfsr_state_0 = state['lfsr_state_0']
+    acc = state['acc']
+    a = inputs['a']
+    ce = inputs['ce']
+    rst = inputs['rst']
+
+    # Declaring internal variables.
+    # Assign signal: z
+    tmp1 = lfsr_state_0 << 5
+    tmp2 = tmp1 & 1023
+    tmp3 = a ^ count
+    tmp0 = tmp2 | tmp3
+    z = tmp0 & 1023
+    # Assign signal: rand
+    tmp4 = state['zzz_tmp4'].output().reshape(_shape)
+    rand = tmp4 & 4294967295
+    # Assign signal: count
+    tmp6 = count + 1
+    tmp7 = tmp6 & 63
+    tmp5 = (tmp7 >> 0) & 31
+    state['count'] = tmp5 & 31
+    # Assign signal: lfsr_state_0
+    tmp9 = (lfsr_state_0 >> 0) & 15
+    tmp12 = (lfsr_state_0 >> 4) & 1
+    tmp13 = (lfsr_state_0 >> 2) & 1
+    tmp11 = tmp12 ^ tmp13
+    tmp10 = tmp11 ^ 1
+    tmp8 = ((tmp9) << 1) | tmp10
+    state['lfsr_state_0'] = tmp8 & 31
+    # Assign signal: acc
+    tmp14 = acc + a
+    tmp15 = ((tmp14 + 64) & 127) - 64
+    state['acc'] = np.where(rst, state['zzz_acc'], np.where(ce, ((tmp15 + 16) & 31) - 16, acc))
+
+    # Update random number generators
+    state['zzz_tmp4'].update(rst=np.broadcast_to(0, _lane.shape), cke=np.broadcast_to(1, _lane.shape), seed=np.broadcast_to(42, _lane.shape))
+
+    return {'z': z, 'rand': rand, 'acc': acc}
@@ -0,0 +1,51 @@
+# Model generated on 2026-10-17 08:55:15.812683
+
+import numpy as np
+from msdsl.sim.rng import LCGCore, MT19937Core
+
+# Lookup tables
+TMP2 = np.array([-1.0, -0.7142791748046875, -0.4285736083984375, -0.142852783203125, 0.142852783203125, 0.4285736083984375, 0.7142791748046875, 1.0])
+
+def init_state(lanes=None, **params):
+    # Parameter values
+    gain = params.pop('gain', 2.0)
+    assert len(params) == 0, f'Unknown parameter(s): {sorted(params)}.'
+
+    # Initial values
+    state = {'_shape': () if lanes is None else (lanes,), '_lane': np.arange(1 if lanes is None else lanes)}
+    state['gain_param'] = gain
+    state['rom'] = 0.0
+    state['zzz_ram'] = np.zeros((len(state['_lane']), 8), dtype=np.int64)
+    state['ram'] = 0.0
+    return state
+
+def step(state, inputs):
+    # Load the state
+    _shape = state['_shape']
+    _lane = state['_lane']
+    gain_param = state['gain_param']
+    rom = state['rom']
+    ram = state['ram']
+    addr = inputs['addr']
+    sel = inputs['sel']
+    we = inputs['we']
+    din = inputs['din']
+    x = inputs['x']
+
+    # Assign signal: y
+    tmp0 = 0.0
+    tmp0 = np.where(sel == 0, 0.5, tmp0)
+    tmp0 = np.where(sel == 1, (-1.0), tmp0)
+    tmp0 = np.where(sel == 2, x, tmp0)
+    tmp1 = gain_param * tmp0
+    y = tmp1
+    # Assign signal: rom
+    state['rom'] = TMP2[addr & 7]
+    # Assign signal: ram
+    tmp3 = np.broadcast_to(addr, _lane.shape)
+    tmp4 = np.ldexp(state['zzz_ram'][_lane, tmp3], -5).reshape(_shape)
+    state['ram'] = tmp4
+    tmp5 = np.broadcast_to((1 != 0) & (we != 0), _lane.shape)
+    state['zzz_ram'][_lane[tmp5], tmp3[tmp5]] = np.broadcast_to(((din + 128) & 255) - 128, _lane.shape)[tmp5]
+
+    return {'rom': rom, 'ram': ram, 'y': y}
@@ -0,0 +1,28 @@
+# Model generated on 2026-10-17 08:55:15.791437
+
+import numpy as np
+from msdsl.sim.rng import LCGCore, MT19937Core
+
+def init_state(lanes=None, **params):
+    # Parameter values
+    assert len(params) == 0, f'Unknown parameter(s): {sorted(params)}.'
+
+    # Initial values
+    state = {'_shape': () if lanes is None else (lanes,), '_lane': np.arange(1 if lanes is None else lanes)}
+    state['y'] = 0
+    return state
+
+def step(state, inputs):
+    # Load the state
+    _shape = state['_shape']
+    _lane = state['_lane']
+    y = state['y']
+    x = inputs['x']
+
+    # Assign signal: y
+    tmp0 = y * 0.9607894391523233
+    tmp1 = x * 0.03921056084767671
+    tmp2 = tmp0 + tmp1
+    state['y'] = tmp2
+
+    return {'y': y}
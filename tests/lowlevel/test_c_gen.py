@@ -0,0 +1,100 @@
+import pytest
+from pathlib import Path
+import numpy as np
+from svreal import RealType
+from msdsl import MixedSignalModel, Deriv, Simulator, CGenerator, to_sint, lcg_op, split_chunks
+from msdsl.expr.expr import array
+from msdsl.expr.format import RealFormat
+from msdsl.generator.c import CModel
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build'
+
+def compile_model(m, name, **kwargs):
+    filename = m.compile_to_file(CGenerator(**kwargs), filename=BUILD_DIR / f'{name}.c')
+    return filename
+
+@pytest.mark.parametrize('real_type', [RealType.FloatReal, RealType.FixedPoint])
+def test_c_gen_rc(real_type, tau=1e-6, dt=0.1e-6, n=100):
+    # build model
+    m = MixedSignalModel('model', dt=dt)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+
+    # compare the generated code to the simulator
+    ranges = {'x': 1.0, 'y': 1.0}
+    filename = compile_model(m, f'c_gen_rc_{real_type.name}', real_type=real_type, ranges=ranges)
+    x_vals = np.random.uniform(-1, 1, n)
+    results = CModel(filename).run({'x': x_vals})
+    expct = Simulator(m, real_type=real_type, ranges=ranges).run({'x': x_vals})
+    assert np.array_equal(results['y'], expct['y'])
+
+def test_c_gen_digital(width=5, n=100):
+    # build model
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=width)
+    ce = m.add_digital_input('ce')
+    rst = m.add_digital_input('rst')
+    m.add_counter('count', width=width, loop=True)
+    state = m.lfsr_signal(width, init=1)
+    acc = m.add_digital_state('acc', width=width, signed=True, init=3)
+    m.set_next_cycle(acc, acc + to_sint(a, width=width+1), ce=ce, rst=rst)
+    m.add_digital_output('z', width=2*width)
+    m.set_this_cycle(m.z, (state << width) | (a ^ m.count))
+    m.add_digital_output('rand', width=32)
+    m.set_this_cycle(m.rand, lcg_op(seed=42))
+    m.add_probe(acc)
+
+    # compare the generated code to the simulator
+    inputs = {'a': np.random.randint(0, 1<<width, n), 'ce': np.random.randint(0, 2, n),
+              'rst': (np.random.uniform(size=n) < 0.1).astype(int)}
+    filename = compile_model(m, 'c_gen_digital')
+    results = CModel(filename).run(inputs)
+    expct = Simulator(m).run(inputs, outputs=['z', 'rand', 'acc'])
+    for name in ['z', 'rand', 'acc']:
+        assert list(results[name]) == list(expct[name])
+
+    # the state carries over when the inputs are split into chunks
+    chunks = list(CModel(filename).stream(split_chunks(inputs, 17)))
+    for name in ['z', 'rand', 'acc']:
+        assert list(np.concatenate([chunk[name] for chunk in chunks])) == list(expct[name])
+
+    # the number of cycles can be smaller than the length of the inputs, which may also differ from each other
+    results = CModel(filename).run(inputs, n=n//2)
+    for name in ['z', 'rand', 'acc']:
+        assert list(results[name]) == list(expct[name][:n//2])
+    results = CModel(filename).run(dict(inputs, a=inputs['a'][:n-10]))
+    for name in ['z', 'rand', 'acc']:
+        assert list(results[name]) == list(expct[name][:n-10])
+
+@pytest.mark.parametrize('real_type', [RealType.FloatReal, RealType.FixedPoint])
+def test_c_gen_memories(real_type, n=100):
+    # build model
+    m = MixedSignalModel('model')
+    addr = m.add_digital_input('addr', width=3)
+    sel = m.add_digital_input('sel', width=2)
+    we = m.add_digital_input('we')
+    din = m.add_digital_input('din', width=8, signed=True)
+    x = m.add_analog_input('x')
+    gain = m.add_real_param('gain', default=2.0)
+    m.add_analog_output('rom')
+    m.add_analog_output('ram')
+    m.add_analog_output('y')
+    m.add_analog_output('z')
+    table = m.make_real_table(np.linspace(-1.0, 1.0, 8), dir=BUILD_DIR)
+    m.set_from_sync_rom(m.rom, table, addr)
+    m.set_from_sync_ram(m.ram, RealFormat(range_=4, width=8, exponent=-5), addr, we=we, din=din)
+    m.set_this_cycle(m.y, gain*array([0.5, -1.0, x], sel))
+    m.set_this_cycle(m.z, array([0.25, -0.75, 1.5], sel)*x)
+
+    # compare the generated code to the simulator, with a parameter value that differs from the default
+    ranges = {'x': 1.0, 'rom': 1.0, 'ram': 4.0, 'y': 2.0, 'z': 1.5}
+    filename = compile_model(m, f'c_gen_memories_{real_type.name}', real_type=real_type, ranges=ranges,
+                             params={'gain': -1.5} if real_type == RealType.FixedPoint else None)
+    inputs = {'addr': np.random.randint(0, 8, n), 'sel': np.random.randint(0, 4, n),
+              'we': np.random.randint(0, 2, n), 'din': np.random.randint(-128, 128, n),
+              'x': np.random.uniform(-1, 1, n)}
+    results = CModel(filename, params={'gain': -1.5}).run(inputs)
+    expct = Simulator(m, params={'gain': -1.5}, real_type=real_type, ranges=ranges).run(inputs)
+    for name in ['rom', 'ram', 'y', 'z']:
+        assert np.array_equal(results[name], expct[name])
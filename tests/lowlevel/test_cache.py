@@ -0,0 +1,67 @@
+import os
+import numpy as np
+from scipy.linalg import expm
+from msdsl import MixedSignalModel, VerilogGenerator
+from msdsl.cache import ArrayCache
+from msdsl.eqn.lds import LDS
+
+def test_cache_hit(tmp_path):
+    calls = []
+    def func(A, dt, method='zoh'):
+        calls.append(None)
+        return expm(dt*A), [np.ones(2), None], 1.5
+
+    cache = ArrayCache(tmp_path)
+    A = np.array([[-1.0, 2.0], [0.0, -3.0]])
+    first = cache.call(func, A, 0.1)
+    second = cache.call(func, A, 0.1)
+    assert len(calls) == 1
+    assert np.array_equal(first[0], second[0])
+    assert np.array_equal(second[1][0], np.ones(2)) and second[1][1] is None
+    assert second[2] == 1.5
+
+    # changing the matrix, timestep, or method is a miss
+    cache.call(func, A + 1, 0.1)
+    cache.call(func, A, 0.2)
+    cache.call(func, A, 0.1, method='bilinear')
+    assert len(calls) == 4
+    assert len(list(tmp_path.glob('*.npz'))) == 4
+
+def test_cache_eviction(tmp_path):
+    cache = ArrayCache(tmp_path)
+    for k in range(4):
+        # mark each new entry as used at time k
+        old = set(tmp_path.glob('*.npz'))
+        cache.call(np.eye, k+10)
+        new, = set(tmp_path.glob('*.npz')) - old
+        os.utime(new, (k, k))
+    sizes = sorted(path.stat().st_size for path in tmp_path.glob('*.npz'))
+
+    # only the two most recently used entries fit
+    cache.max_size = sizes[-1] + sizes[-2]
+    cache.evict()
+    remaining = list(tmp_path.glob('*.npz'))
+    assert len(remaining) == 2
+    assert min(os.path.getmtime(path) for path in remaining) == 2
+
+def test_discretize_cached(tmp_path):
+    cache = ArrayCache(tmp_path)
+    lds = LDS(A=np.array([[-2.0]]), B=np.array([[1.0]]), C=np.array([[1.0]]), D=np.array([[0.0]]))
+    expct = lds.discretize(0.1)
+    for _ in range(2):
+        meas = lds.discretize(0.1, cache=cache)
+        for name in 'ABCD':
+            assert np.allclose(getattr(meas, name), getattr(expct, name))
+    assert len(list(tmp_path.glob('*.npz'))) == 1
+
+def test_model_cache(tmp_path):
+    def build():
+        m = MixedSignalModel('model', dt=0.1e-6, build_dir=tmp_path, cache=True)
+        x = m.add_analog_input('x')
+        y = m.add_analog_output('y')
+        m.set_tf(x, y, ([1], [1e-6, 1]))
+        return m.compile(VerilogGenerator())
+
+    first = build()
+    assert len(list((tmp_path / 'cache').glob('*.npz'))) == 1
+    assert build() == first
@@ -0,0 +1,35 @@
+import pytest
+from pathlib import Path
+from msdsl import MixedSignalModel, VerilogGenerator, PythonGenerator, Deriv
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build'
+
+def make_model():
+    m = MixedSignalModel('model', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/1e-6])
+    return m
+
+def strip_timestamp(text):
+    # the first line of the generated code records when it was generated
+    return text.split('\n', 1)[1]
+
+@pytest.mark.parametrize('gen_cls', [VerilogGenerator, PythonGenerator])
+def test_codegen_stream(gen_cls):
+    # code is identical whether it is written to the file at the end or as it is generated
+    m = make_model()
+    buffered = m.compile_to_file(gen_cls(), filename=BUILD_DIR / f'codegen_buffered.{gen_cls.extension}')
+    streamed = m.compile_to_file(gen_cls(), filename=BUILD_DIR / f'codegen_streamed.{gen_cls.extension}',
+                                 stream=True)
+    assert strip_timestamp(buffered.read_text()) == strip_timestamp(streamed.read_text())
+
+def test_codegen_text():
+    gen = VerilogGenerator()
+    gen.text = ''
+    gen.writeln('a')
+    gen.indent()
+    gen.writeln('b')
+    assert gen.text == 'a\n    b\n'
+    gen.write('c')
+    assert gen.text == 'a\n    b\nc'
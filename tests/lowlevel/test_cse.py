@@ -0,0 +1,52 @@
+from msdsl import MixedSignalModel, VerilogGenerator, lcg_op
+
+def compile_text(m, **kwargs):
+    gen = VerilogGenerator(**kwargs)
+    m.compile(gen)
+    return gen.text
+
+def test_cse_real():
+    # build model in which the same product appears in two outputs.  the product is written out separately in
+    # each expression.
+    m = MixedSignalModel('model')
+    a = m.add_analog_input('a')
+    b = m.add_analog_input('b')
+    c = m.add_analog_input('c')
+    m.add_analog_output('y1')
+    m.add_analog_output('y2')
+    m.set_this_cycle(m.y1, 0.5*(a*b) + c)
+    m.set_this_cycle(m.y2, 0.5*(a*b) - c)
+
+    # the product and constant are only created once, while the additions are not shared
+    with_cse = compile_text(m, cse=True)
+    without_cse = compile_text(m, cse=False)
+    for macro in ['`MUL_REAL(', '`MAKE_CONST_REAL(']:
+        assert 2*with_cse.count(macro) == without_cse.count(macro) > 0
+    assert with_cse.count('`ADD_REAL(') == without_cse.count('`ADD_REAL(') == 2
+
+def test_cse_digital():
+    # build model in which the same comparison is used twice
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=8)
+    b = m.add_digital_input('b', width=8)
+    m.add_digital_output('y1', width=8)
+    m.add_digital_output('y2', width=9)
+    m.set_this_cycle(m.y1, (a+b) & 0x0f)
+    m.set_this_cycle(m.y2, ((a+b) & 0x0f) + 1)
+
+    # the sum and bitwise AND are only computed once, but the two different constants are kept
+    text = compile_text(m)
+    assert text.count('(a+b)') == 1
+    assert text.count('&') == 1
+
+def test_cse_rng():
+    # random number generators have internal state, so separate generators are never merged, even if they are
+    # described by identical expressions
+    m = MixedSignalModel('model')
+    m.add_digital_output('y1', width=32)
+    m.add_digital_output('y2', width=32)
+    m.set_this_cycle(m.y1, lcg_op(seed=1) ^ 1)
+    m.set_this_cycle(m.y2, lcg_op(seed=1) ^ 1)
+
+    text = compile_text(m)
+    assert text.count('`LCG_MSDSL(') == 2
@@ -0,0 +1,102 @@
+import numpy as np
+from msdsl import MixedSignalModel, VerilogGenerator, AnalogSignal, DigitalSignal, Deriv, eqn_case, sum_op
+from msdsl.eqn.eqn_sys import EqnSys, system_key
+from msdsl.expr.expr import Array, ModelOperator
+from msdsl.expr.traverse import iter_expr
+from msdsl.expr.signals import Signal
+from msdsl.expr.analyze import walk_expr, signal_names
+
+def test_rc_ladder(n=300, r=1e3, c=1e-12):
+    # RC ladder in which the currents through the resistors are internal signals
+    vin = AnalogSignal('vin')
+    vout = AnalogSignal('vout')
+    v = [AnalogSignal(f'v_{k}') for k in range(n)]
+    i = [AnalogSignal(f'i_{k}') for k in range(n)]
+    eqns = []
+    for k in range(n):
+        eqns.append(i[k] == ((v[k-1] if k > 0 else vin) - v[k])/r)
+        eqns.append(Deriv(v[k]) == ((i[k] - i[k+1]) if k < n-1 else i[k])/c)
+    eqns.append(vout == v[-1])
+    lds = EqnSys(eqns).to_lds(inputs=[vin], states=v, outputs=[vout])
+
+    # compare against the expected tridiagonal system
+    tau = r*c
+    A = (np.diag(-2*np.ones(n)) + np.diag(np.ones(n-1), 1) + np.diag(np.ones(n-1), -1))/tau
+    A[-1, -1] = -1/tau
+    B = np.zeros((n, 1))
+    B[0, 0] = 1/tau
+    assert np.allclose(lds.A*tau, A*tau)
+    assert np.allclose(lds.B*tau, B*tau)
+    assert np.allclose(lds.C, np.eye(n)[[-1], :])
+    assert np.allclose(lds.D, np.zeros((1, 1)))
+
+def build_switched(workers=None, n=6):
+    # RC circuit in which each switch adds a conductance.  only the number of switches that are on matters, so only
+    # n+1 of the 2**n cases are distinct.
+    m = MixedSignalModel('model', dt=1e-9)
+    x = m.add_analog_input('x')
+    y = m.add_analog_state('y', range_=1.5)
+    sel = [m.add_digital_input(f'sel_{k}') for k in range(n)]
+    m.add_eqn_sys([Deriv(y) == sum_op([eqn_case([0, 1e8], [s]) for s in sel])*(x - y) - 1e7*y], workers=workers)
+    return m
+
+def test_dedup_cases():
+    # different cases have different keys, while copies of the same system have the same key
+    eqn_sys = EqnSys([Deriv(AnalogSignal('y')) == eqn_case([1.0, 2.0], [DigitalSignal('s')])*AnalogSignal('x')])
+    keys = set()
+    for k in range(2):
+        U, V, unknowns, _ = eqn_sys.subst_case({'s': k}).to_matrices(inputs=[AnalogSignal('x')],
+                                                                     states=[AnalogSignal('y')])
+        keys.add(system_key(U, V, unknowns))
+    assert len(keys) == 2
+    assert system_key(U, V, unknowns) == system_key(U.copy(), V.copy(), unknowns)
+
+    # the results are the same whether the systems are solved in this process or in a process pool
+    text = []
+    for workers in [1, 2]:
+        gen = VerilogGenerator()
+        build_switched(workers=workers).compile(gen)
+        text.append(gen.text.split('\n', 3)[-1])
+    assert text[0] == text[1]
+
+def test_sparse_lds_terms():
+    # only the coefficient of y_0 onto itself depends on the switch.  y_1 does not depend on y_0 or on the switch, and
+    # y_0 does not depend on y_1.
+    m = MixedSignalModel('model', dt=1e-9)
+    x = m.add_analog_input('x')
+    y = [m.add_analog_state(f'y_{k}', range_=1.5) for k in range(2)]
+    s = m.add_digital_input('s')
+    m.add_eqn_sys([Deriv(y[0]) == eqn_case([1e7, 2e7], [s])*(x - y[0]),
+                   Deriv(y[1]) == 1e7*(x - y[1])])
+
+    children = lambda node: node.operands if isinstance(node, ModelOperator) else []
+    arrays = lambda name: [node for node in iter_expr(m.assignments[name].expr, children)
+                           if isinstance(node, Array)]
+    signals = lambda name: set(signal_names(walk_expr(m.assignments[name].expr,
+                                                      lambda node: isinstance(node, Signal))))
+    assert len(arrays('y_0')) == 2
+    assert len(arrays('y_1')) == 0
+    assert signals('y_0') == {'x', 'y_0', 's'}
+    assert signals('y_1') == {'x', 'y_1'}
+
+def test_zero_rhs():
+    # equations of the form "x == 0" have a constant zero on one side
+    x = AnalogSignal('x')
+    y = AnalogSignal('y')
+    z = AnalogSignal('z')
+    eqn_sys = EqnSys([Deriv(y) == 0, z == 0, Deriv(x) == y - x])
+    U, V, unknowns, knowns = eqn_sys.to_matrices(inputs=[], states=[x, y])
+    assert U.shape[0] == 3
+
+def test_circuit_ground(res=1e3, cap=1e-9):
+    # the ground of a circuit is represented by an equation with a constant zero on one side
+    m = MixedSignalModel('model', dt=0.1e-6)
+    m.add_analog_input('v_in')
+    m.add_analog_output('v_out')
+    c = m.make_circuit()
+    gnd = c.make_ground()
+    c.capacitor('net_v_out', gnd, cap, voltage_range=1.5)
+    c.resistor('net_v_in', 'net_v_out', res)
+    c.voltage('net_v_in', gnd, m.v_in)
+    c.add_eqns(AnalogSignal('net_v_out') == m.v_out)
+    m.compile(VerilogGenerator())
@@ -0,0 +1,60 @@
+import sys
+from msdsl import AnalogSignal, DigitalSignal
+from msdsl.expr.expr import to_uint, mt19937
+from msdsl.expr.analyze import ExprTable
+
+def test_expr_key():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+
+    # separately constructed expressions with the same structure have the same key, which is cached
+    x = 2*a + b
+    y = 2*a + b
+    assert x.key() is x.key()
+    assert x.key() == y.key()
+    assert x.structurally_equals(y) and x.structural_hash() == y.structural_hash()
+    assert not x.structurally_equals(2*a + 3*b)
+
+    # expressions containing random number generators only match themselves
+    r = mt19937() + 1
+    assert r.key() is None
+    assert r.structurally_equals(r)
+    assert not r.structurally_equals(mt19937() + 1)
+
+def test_expr_key_retype():
+    # changing the format of an expression results in a different key
+    a = DigitalSignal('a', width=8)
+    b = DigitalSignal('b', width=8)
+    x = a + b
+    assert x.key() != to_uint(x, width=12).key()
+
+def test_expr_key_deep():
+    # keys of deep expressions that were built separately can be compared without recursion
+    depth = 3*sys.getrecursionlimit()
+    a = DigitalSignal('a', width=8)
+    def chain():
+        expr = a
+        for _ in range(depth):
+            expr = ~expr
+        return expr
+    assert chain().structurally_equals(chain())
+
+def test_expr_table():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+
+    # structurally identical expressions share entries
+    table = ExprTable()
+    table[a*b] = 1
+    assert (a*b) in table
+    assert table[a*b] == 1
+    assert table.get(a*b + 1) is None
+    assert table.setdefault(a + b, 2) == 2
+    assert len(table) == 2
+
+    # unless the table is indexed by identity
+    expr = a*b
+    table = ExprTable(structural=False)
+    table[expr] = 1
+    assert expr in table
+    assert (a*b) not in table
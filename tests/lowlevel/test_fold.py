@@ -0,0 +1,84 @@
+from msdsl import MixedSignalModel, VerilogGenerator, AnalogSignal, DigitalSignal
+from msdsl.expr.expr import Sum, Product, Array, Constant, array, to_real, to_sint, to_uint
+from msdsl.expr.format import UIntFormat
+from msdsl.expr.extras import if_
+from msdsl.expr.fold import fold_expr
+
+def test_fold_identities():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+    s = DigitalSignal('s', width=2)
+
+    # multiplication by an array of ones
+    result = fold_expr(array([1.0, 1.0, 1.0, 1.0], s)*a)
+    assert result is a
+
+    # the address can go past the end of the array, where the value is zero, so the array is kept
+    result = fold_expr(array([1.0, 1.0, 1.0], s)*a)
+    assert isinstance(result, Product)
+    assert any(isinstance(operand, Array) for operand in result.operands)
+
+    # addition of an array of zeros
+    result = fold_expr(a + array([0.0, 0.0], s[0]))
+    assert result is a
+
+    # arrays with identical elements
+    result = fold_expr(array([a*b, a*b], s[0]))
+    assert isinstance(result, Product)
+
+    # multiplication by an array of zeros
+    assert isinstance(fold_expr(array([a, b], s[0])*array([0.0, 0.0], s[1])), Constant)
+
+def test_fold_if():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+    assert fold_expr(if_(1, a, b)) is a
+    assert fold_expr(if_(0, a, b)) is b
+
+    # the result of the selection is folded further
+    result = fold_expr(if_(1, 2.0, 3.0)*a + if_(0, 0.5, 0.0)*b)
+    assert isinstance(result, Product)
+    assert result.operands[0] is a
+    assert result.operands[1].value == 2.0
+
+def test_fold_conversions():
+    s = DigitalSignal('s', width=8, signed=True)
+    u = DigitalSignal('u', width=8)
+
+    # round trips through other types are removed
+    assert fold_expr(to_sint(to_real(s), width=8)) is s
+    assert fold_expr(to_uint(to_sint(u), width=8)) is u
+
+    # so to_real(to_sint(to_real(s))) reduces to to_real(s)
+    result = fold_expr(to_real(to_sint(to_real(s), width=8)))
+    assert result.operand is s
+
+    # but not if the width changes
+    assert fold_expr(to_sint(to_real(s), width=10)) is not s
+
+def test_fold_int_width():
+    # integer expressions keep their width, since that matters for concatenation
+    s = DigitalSignal('s', width=2)
+    a = DigitalSignal('a', width=8)
+    b = DigitalSignal('b', width=8)
+    result = fold_expr(array([3, 3], s[0]))
+    assert isinstance(result, Constant)
+    assert isinstance(result.format_, UIntFormat) and result.format_.width == 2
+    result = fold_expr(if_(1, a, b))
+    assert result is a
+
+def test_fold_compile():
+    # build a model in which the mux and multiplier can be removed
+    m = MixedSignalModel('model')
+    x = m.add_analog_input('x')
+    sel = m.add_digital_input('sel')
+    m.add_analog_output('y')
+    m.set_this_cycle(m.y, array([1.0, 1.0], sel)*x + if_(0, x, 0.0))
+
+    # the constants are only folded if requested
+    gen = VerilogGenerator()
+    m.compile(gen)
+    assert '`MUL_' not in gen.text
+    gen = VerilogGenerator()
+    m.compile(gen, fold=False)
+    assert '`MUL_' in gen.text
@@ -0,0 +1,94 @@
+import numpy as np
+from svreal import RealType
+from msdsl import MixedSignalModel, Simulator, AnalogSignal
+from msdsl.expr.expr import clamp_op, array
+from msdsl.expr.signals import DigitalSignal
+from msdsl.expr.interval import tighten_expr
+from msdsl.generator.svreal import eval_range_expr
+
+def test_interval_cancel():
+    # the terms in "a" cancel out, so only the range of "b" matters (plus a small margin for rounding errors)
+    a = AnalogSignal('a', range_=2.0)
+    b = AnalogSignal('b', range_=4.0)
+    expr = 0.75*a + 0.25*(a + b) - a
+    assert np.isclose(expr.format_.range_, 5.0)
+    result, bounds = tighten_expr(expr)
+    assert 1.0 < result.format_.range_ < 1.001
+    # the original expression is not modified
+    assert np.isclose(expr.format_.range_, 5.0)
+    assert np.isclose(bounds.lo, -1.0, atol=1e-3) and np.isclose(bounds.hi, +1.0, atol=1e-3)
+
+def test_interval_clamp():
+    # clamping a signal whose range is unknown results in a numeric range
+    a = AnalogSignal('a')
+    expr = clamp_op(a, -1.5, 0.5)
+    assert not isinstance(expr.format_.range_, float)
+    expr, bounds = tighten_expr(expr)
+    assert 1.5 <= expr.format_.range_ < 1.5001
+    assert np.isclose(bounds.lo, -1.5) and np.isclose(bounds.hi, 0.5)
+
+def test_interval_array():
+    # the range of an array is based on its elements, with a small margin.  the sum is asymmetric, so its range is
+    # smaller than that of the array plus that of the constant.
+    s = DigitalSignal('s', width=1)
+    a = AnalogSignal('a', range_=1.0)
+    expr, _ = tighten_expr(array([0.5*a, 0.25*a + 0.125], s) + 0.25)
+    assert np.isclose(expr.operands[0].format_.range_, 0.5*1.01, rtol=1e-3)
+    assert np.isclose(expr.format_.range_, 0.75, rtol=1e-3)
+
+def test_tighten_ranges(n=100):
+    # build model with bound signals whose ranges can be tightened
+    m = MixedSignalModel('model', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    m.add_analog_output('y')
+    a = m.add_analog_state('a', range_=2.0)
+    m.set_next_cycle(a, 0.5*a + 0.75*clamp_op(x, -1.0, 1.0))
+    b = m.set_this_cycle('b', 0.75*a + 0.25*(a - x) - a)
+    c = m.set_this_cycle('c', clamp_op(b, -0.5, 0.5) + a, range_=4.0)
+    m.set_this_cycle(m.y, c + b)
+
+    # simulate the model with floating-point numbers as a reference
+    x_vals = np.random.uniform(-1, 1, n)
+    expct = Simulator(m, real_type=RealType.FloatReal).run({'x': x_vals})
+
+    # tighten ranges: "b" depends on the input range, while "c" gets a smaller numeric range.  the expressions of the
+    # assignments are replaced rather than modified.
+    b_expr = m.get_assignment('b').expr
+    b_range = b_expr.format_.range_
+    ranges = m.tighten_ranges()
+    assert b_expr.format_.range_ is b_range
+    assert m.get_assignment('b').expr is not b_expr
+    assert set(ranges) == {'b', 'c'}
+    assert 'RangeOf(x)' in str(m.b.format_.range_)
+    assert 0.25 < eval_range_expr(m.b.format_.range_, ranges={'x': 1.0}) < 0.251
+    assert np.isclose(m.c.format_.range_, 2.5)
+
+    # the model still gives the same results in fixed-point
+    results = Simulator(m, real_type=RealType.FixedPoint, ranges={'x': 1.0, 'y': 4.0}).run({'x': x_vals})
+    assert np.allclose(results['y'], expct['y'], atol=1e-3)
+
+
+def test_tighten_ranges_rounding(n=1000):
+    # the terms in "b" cancel out exactly, but not in fixed-point, since the constants and products are rounded.  the
+    # tightened range must cover the rounding errors, otherwise "b" overflows.
+    def build():
+        m = MixedSignalModel('model', dt=0.1e-6)
+        x = m.add_analog_input('x')
+        y = m.add_analog_output('y')
+        b = m.set_this_cycle('b', 0.3*x + 0.7*x - x)
+        m.set_this_cycle(y, b + x)
+        return m
+
+    x_vals = np.random.uniform(-10, 10, n)
+    ranges = {'x': 10.0, 'y': 20.0}
+    expct = Simulator(build(), real_type=RealType.FixedPoint, ranges=ranges).run({'x': x_vals}, outputs=['y', 'b'])
+
+    # the range of "b" is small, but not zero
+    m = build()
+    range_ = eval_range_expr(m.tighten_ranges()['b'], ranges={'x': 10.0})
+    assert 0 < range_ < 1e-2
+    assert np.max(np.abs(expct['b'])) <= range_
+
+    # the tightened model has the same accuracy as the original one
+    results = Simulator(m, real_type=RealType.FixedPoint, ranges=ranges).run({'x': x_vals}, outputs=['y', 'b'])
+    assert np.max(np.abs(results['y'] - x_vals)) <= max(2*np.max(np.abs(expct['y'] - x_vals)), 1e-4)
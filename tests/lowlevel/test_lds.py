@@ -3,7 +3,10 @@ import numpy as np
 from numpy import heaviside
 from scipy.integrate import quad
 from scipy.linalg import expm
-from msdsl.interp.lds import calc_expm_integral, calc_lds_f, calc_lds_g
+from msdsl.interp.lds import (calc_expm_integral, calc_lds_f, calc_lds_g, calc_lds_a_tilde, calc_lds_b_tilde,
+                              calc_lds_d_tilde, sample_lds_a_tilde, sample_lds_b_tilde)
+from msdsl.interp.interp import calc_interp_w
+from msdsl.eqn.lds import LDS
 
 
 A = np.array([[-8.7, -6.5], [4.3, 2.1]], dtype=float)
@@ -58,3 +61,61 @@ def test_g_calc(j, k, t):
         expt[idx, 0] = quad(func, 0, t)[0]
 
     assert np.all(np.isclose(meas, expt))
+
+
+# defective matrix, for which the Schur fallback is used
+A_def = np.array([[-2.0, 1.0], [0.0, -2.0]], dtype=float)
+
+
+@pytest.mark.parametrize('A_test', [A, A_def])
+def test_sample_lds(A_test):
+    tvec = np.linspace(0, 1, 37)
+    W = calc_interp_w(npts=npts, order=order)
+
+    meas = sample_lds_a_tilde(A_test, tvec)
+    expt = np.array([calc_lds_a_tilde(A_test, t) for t in tvec])
+    assert np.allclose(meas, expt)
+
+    meas = sample_lds_b_tilde(A_test, B, W, tvec)
+    expt = np.array([[elem.flatten() for elem in calc_lds_b_tilde(A_test, B, W, t)] for t in tvec])
+    assert np.allclose(meas, expt)
+
+
+@pytest.mark.parametrize('A_test', [A, A_def])
+def test_discretize_batch(A_test):
+    lds = LDS(A=A_test, B=B, C=C, D=D)
+    dts = [0.01, 0.1, 1.0]
+    for dt, meas in zip(dts, lds.discretize_batch(dts)):
+        expt = lds.discretize(dt)
+        for name in 'ABCD':
+            assert np.allclose(getattr(meas, name), getattr(expt, name))
+
+
+def test_discretize_batch_singular():
+    # integrator: the ZOH input matrix is dt*B even though A cannot be inverted
+    lds = LDS(A=np.zeros((1, 1)), B=np.ones((1, 1)))
+    meas = lds.discretize_batch([0.5, 2.0])
+    assert np.allclose(meas[0].A, 1) and np.allclose(meas[0].B, 0.5)
+    assert np.allclose(meas[1].A, 1) and np.allclose(meas[1].B, 2.0)
+
+
+@pytest.mark.parametrize('t', [0.0, 0.123, 0.456, 1.0])
+def test_b_tilde_calc(t):
+    # compare against a direct sum of calc_lds_g terms
+    W = calc_interp_w(npts=npts, order=order)
+    meas = calc_lds_b_tilde(A, B, W, t)
+    for i in range(npts):
+        expt = sum(W[j, k, i]*calc_lds_g(A, B, th, j, k, t) for j in range(npts) for k in range(order+1))
+        assert np.allclose(meas[i], expt)
+
+
+def test_d_tilde_calc():
+    # compare against a direct sum of calc_lds_f terms
+    W = calc_interp_w(npts=npts, order=order)
+    meas = calc_lds_d_tilde(A, B, C, D, W)
+    for p in range(npts):
+        for i in range(npts):
+            expt = D[0, 0]*W[p, 0, i]
+            for j in range(p):
+                expt += sum(W[j, k, i]*calc_lds_f(A, B, C, th, p, j, k)[0, 0] for k in range(order+1))
+            assert np.isclose(meas[p, i], expt)
@@ -18,3 +18,32 @@ def test_lsfr(n):
 
     # check that the first pass is exactly equal to the second pass
     assert passes[0] == passes[1]
+
+@pytest.mark.parametrize('n', [3, 7, 16, 32, 63])
+def test_lfsr_sequence(n, length=1000):
+    lfsr = LFSR(n)
+    inits = [0, 1, (1<<n)-2]
+
+    # compare to the state update applied one cycle at a time
+    results = lfsr.sequence(inits, length)
+    for k, init in enumerate(inits):
+        state = init
+        expct = []
+        for _ in range(length):
+            expct.append(state)
+            state = lfsr.next_state(state)
+        assert list(results[:, k]) == expct
+
+@pytest.mark.parametrize('n', [5, 17, 32, 100])
+def test_lfsr_jump(n):
+    lfsr = LFSR(n)
+
+    # jump ahead by a small number of steps
+    state = 1
+    for k in range(100):
+        assert lfsr.jump(1, k) == state
+        state = lfsr.next_state(state)
+
+    # jumping by the period returns to the same state, and jumping backwards undoes a jump
+    assert lfsr.jump(3, (1<<n)-1) == 3
+    assert lfsr.jump(lfsr.jump(3, 1<<(n//2)), -(1<<(n//2))) == 3
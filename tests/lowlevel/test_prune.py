@@ -0,0 +1,83 @@
+import numpy as np
+from pathlib import Path
+from msdsl import MixedSignalModel, VerilogGenerator, RangeOf
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build'
+
+def compile_text(m, **kwargs):
+    gen = VerilogGenerator()
+    m.compile(gen, **kwargs)
+    return gen.text
+
+def test_prune_unused():
+    # build model with an unused intermediate signal
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=8)
+    m.add_digital_output('y', width=9)
+    m.set_this_cycle('used_sig', a + 1)
+    m.set_this_cycle('unused_sig', a + 2)
+    m.set_this_cycle(m.y, m.used_sig)
+
+    # the unused signal only appears if pruning is disabled
+    assert 'unused_sig' not in compile_text(m)
+    assert 'unused_sig' in compile_text(m, prune=False)
+    assert m.find_live_signals() >= {'a', 'y', 'used_sig'}
+    assert 'unused_sig' not in m.find_live_signals()
+
+def test_prune_roots():
+    # build model with a probe, a declared state, and a register that are not read by any output
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=8)
+    m.set_this_cycle('probed_sig', a + 1)
+    m.add_probe(m.probed_sig)
+    m.add_digital_state('state_sig', width=9)
+    m.set_this_cycle(m.state_sig, a + 2)
+    m.add_counter('count_sig', width=4)
+
+    # all of them are kept
+    text = compile_text(m)
+    for name in ['probed_sig', 'state_sig', 'count_sig']:
+        assert name in text
+
+def test_prune_format_deps():
+    # the range of an intermediate signal refers to another signal, which is kept even though it is not read
+    m = MixedSignalModel('model')
+    x = m.add_analog_input('x')
+    m.add_analog_output('y')
+    m.set_this_cycle('scaled_sig', 2*x)
+    m.set_this_cycle('copy_sig', x, range_=RangeOf('scaled_sig'))
+    m.set_this_cycle(m.y, m.copy_sig)
+    assert 'scaled_sig' in m.find_live_signals()
+    assert '`MUL_CONST_REAL' in compile_text(m)
+
+def test_prune_tables():
+    # build model in which one table is read by a ROM driving an output and the other is not used
+    m = MixedSignalModel('model', build_dir=BUILD_DIR / 'prune_tables')
+    addr = m.add_digital_input('addr', width=3)
+    m.add_analog_output('y')
+    used = m.make_real_table(np.linspace(-1, 1, 8))
+    unused = m.make_real_table(np.linspace(0, 1, 8))
+    m.set_from_sync_rom(m.y, used, addr)
+    m.set_from_sync_rom('unused_rom', unused, addr)
+
+    # only the table that is used is written
+    assert m.find_live_tables() == [used]
+    for table in [used, unused]:
+        if table.path.exists():
+            table.path.unlink()
+    m.compile_to_file(VerilogGenerator())
+    assert used.path.exists()
+    assert not unused.path.exists()
+
+def test_prune_control_by_name():
+    # the reset is given by name, so the signal that drives it must be kept
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a')
+    b = m.add_digital_input('b')
+    m.add_digital_output('x')
+    m.set_this_cycle('myrst', a & b)
+    m.set_next_cycle(m.x, a, rst='myrst')
+
+    assert 'myrst' in m.find_live_signals()
+    text = compile_text(m)
+    assert 'myrst' in text.split('MEM_INTO_DIGITAL')[0]
@@ -0,0 +1,89 @@
+import pytest
+from pathlib import Path
+import numpy as np
+from msdsl import MixedSignalModel, Deriv, Simulator, PythonGenerator, to_sint, lcg_op
+from msdsl.expr.expr import array
+from msdsl.expr.format import RealFormat
+from msdsl.generator.python import load_module
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build'
+
+def run_module(module, inputs, n, lanes=None, **params):
+    # simulate the generated module, collecting all outputs
+    state = module.init_state(lanes=lanes, **params)
+    shape = () if lanes is None else (lanes,)
+    results = {}
+    for k in range(n):
+        outputs = module.step(state, {name: value[k] for name, value in inputs.items()})
+        for name, value in outputs.items():
+            results.setdefault(name, []).append(np.broadcast_to(value, shape))
+    return {name: np.array(values) for name, values in results.items()}
+
+def compile_model(m, name):
+    filename = m.compile_to_file(PythonGenerator(), filename=BUILD_DIR / f'{name}.py')
+    return load_module(filename)
+
+@pytest.mark.parametrize('tau', [1e-6, 2.5e-6])
+def test_python_gen_rc(tau, dt=0.1e-6, n=50):
+    # build model
+    m = MixedSignalModel('model', dt=dt)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+
+    # compare the generated code to the simulator
+    x_vals = np.random.uniform(-1, 1, n)
+    results = run_module(compile_model(m, 'python_gen_rc'), {'x': x_vals}, n=n)
+    expct = Simulator(m).run({'x': x_vals})
+    assert np.array_equal(results['y'], expct['y'])
+
+def test_python_gen_digital(width=5, n=100):
+    # build model
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=width)
+    ce = m.add_digital_input('ce')
+    rst = m.add_digital_input('rst')
+    m.add_counter('count', width=width, loop=True)
+    state = m.lfsr_signal(width, init=1)
+    acc = m.add_digital_state('acc', width=width, signed=True, init=3)
+    m.set_next_cycle(acc, acc + to_sint(a, width=width+1), ce=ce, rst=rst)
+    m.add_digital_output('z', width=2*width)
+    m.set_this_cycle(m.z, (state << width) | (a ^ m.count))
+    m.add_digital_output('rand', width=32)
+    m.set_this_cycle(m.rand, lcg_op(seed=42))
+    m.add_probe(acc)
+
+    # compare the generated code to the simulator
+    inputs = {'a': np.random.randint(0, 1<<width, n), 'ce': np.random.randint(0, 2, n),
+              'rst': (np.random.uniform(size=n) < 0.1).astype(int)}
+    results = run_module(compile_model(m, 'python_gen_digital'), inputs, n=n)
+    expct = Simulator(m).run(inputs, outputs=['z', 'rand', 'acc'])
+    for name in ['z', 'rand', 'acc']:
+        assert list(results[name]) == list(expct[name])
+
+def test_python_gen_memories(lanes=3, n=30):
+    # build model
+    m = MixedSignalModel('model')
+    addr = m.add_digital_input('addr', width=3)
+    sel = m.add_digital_input('sel', width=2)
+    we = m.add_digital_input('we')
+    din = m.add_digital_input('din', width=8, signed=True)
+    x = m.add_analog_input('x')
+    gain = m.add_real_param('gain', default=2.0)
+    m.add_analog_output('rom')
+    m.add_analog_output('ram')
+    m.add_analog_output('y')
+    table = m.make_real_table(np.linspace(-1.0, 1.0, 8), dir=BUILD_DIR)
+    m.set_from_sync_rom(m.rom, table, addr)
+    m.set_from_sync_ram(m.ram, RealFormat(range_=4, width=8, exponent=-5), addr, we=we, din=din)
+    m.set_this_cycle(m.y, gain*array([0.5, -1.0, x], sel))
+
+    # compare the generated code to the simulator, with a different gain in each lane
+    gains = np.linspace(-1, 1, lanes)
+    inputs = {'addr': np.random.randint(0, 8, (n, lanes)), 'sel': np.random.randint(0, 4, (n, lanes)),
+              'we': np.random.randint(0, 2, (n, lanes)), 'din': np.random.randint(-128, 128, (n, lanes)),
+              'x': np.random.uniform(-1, 1, (n, lanes))}
+    results = run_module(compile_model(m, 'python_gen_memories'), inputs, n=n, lanes=lanes, gain=gains)
+    expct = Simulator(m, lanes=lanes, params={'gain': gains}).run(inputs)
+    for name in ['rom', 'ram', 'y']:
+        assert np.array_equal(results[name], expct[name])
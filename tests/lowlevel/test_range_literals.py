@@ -0,0 +1,46 @@
+import re
+import pytest
+from msdsl import MixedSignalModel, VerilogGenerator, RangeOf
+
+def build_model():
+    # model whose internal ranges are defined in terms of the ranges of its analog I/Os and parameters
+    m = MixedSignalModel('model')
+    x = m.add_analog_input('x')
+    m.add_analog_output('y')
+    k = m.add_real_param('k', default=2.0)
+    m.set_this_cycle('a', k*x)
+    m.set_this_cycle('b', x + m.a, range_=RangeOf('a'))
+    m.set_this_cycle(m.y, m.b)
+    return m
+
+def make_real_ranges(text):
+    return dict(re.findall(r'`MAKE_REAL\((\w+), (.+)\);', text))
+
+def test_range_literals():
+    # with ranges (and the parameter value), internal ranges are written out as numbers
+    gen = VerilogGenerator(params={'k': 2.0})
+    build_model().compile(gen, ranges={'x': 1.5, 'y': 10.0})
+    ranges = make_real_ranges(gen.text)
+    assert float(ranges['a']) == 1.01*2.0*1.5
+    assert float(ranges['b']) == float(ranges['a'])
+    assert not any('`' in range_ for range_ in ranges.values())
+
+def test_range_literals_param():
+    # without the parameter value, ranges that depend on the parameter are left as expressions
+    gen = VerilogGenerator()
+    build_model().compile(gen, ranges={'x': 1.5, 'y': 10.0})
+    ranges = make_real_ranges(gen.text)
+    assert '`RANGE_PARAM_REAL' in ranges['a']
+
+def test_range_symbolic():
+    # without ranges, the ranges are compiled to SystemVerilog expressions
+    gen = VerilogGenerator()
+    build_model().compile(gen)
+    ranges = make_real_ranges(gen.text)
+    assert '`RANGE_PARAM_REAL(x)' in ranges['a']
+
+def test_range_literals_invalid():
+    # invalid ranges are reported, rather than falling back to SystemVerilog expressions
+    gen = VerilogGenerator(params={'k': 2.0})
+    with pytest.raises(TypeError):
+        build_model().compile(gen, ranges={'x': '1.5', 'y': 10.0})
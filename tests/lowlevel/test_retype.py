@@ -0,0 +1,28 @@
+from msdsl import MixedSignalModel, DigitalSignal, AnalogInput
+from msdsl.model import Bus
+from msdsl.expr.expr import to_uint, to_sint
+
+def test_retype_shallow():
+    # changing the width of an expression does not copy its operands or modify the original
+    a = DigitalSignal('a', width=8)
+    b = DigitalSignal('b', width=8)
+    expr = a + b
+    wide = to_uint(expr, width=12)
+    assert wide is not expr
+    assert wide.format_.width == 12 and expr.format_.width == 9
+    assert all(new is old for new, old in zip(wide.operands, expr.operands))
+
+    # same for signed integers
+    s = DigitalSignal('s', width=8, signed=True)
+    expr = s - a
+    wide = to_sint(expr, width=16)
+    assert wide.format_.width == 16 and expr.format_.width != 16
+    assert all(new is old for new, old in zip(wide.operands, expr.operands))
+
+def test_bus_signals():
+    # each signal in a bus is a separate object with its own name
+    m = MixedSignalModel('model')
+    bus = m.add_signal(Bus(AnalogInput('x'), 3))
+    assert [signal.name for signal in bus] == ['x_0', 'x_1', 'x_2']
+    assert all(isinstance(signal, AnalogInput) for signal in bus)
+    assert len(set(id(signal) for signal in bus)) == 3
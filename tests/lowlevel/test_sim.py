@@ -0,0 +1,280 @@
+import pytest
+from pathlib import Path
+from math import exp
+import numpy as np
+from svreal import RealType
+from msdsl import MixedSignalModel, Deriv, Simulator, to_sint, mt19937, lcg_op, split_chunks
+from msdsl.expr.expr import array
+from msdsl.expr.format import RealFormat
+from msdsl.lfsr import LFSR
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build'
+
+@pytest.mark.parametrize('tau', [1e-6, 2.5e-6])
+def test_sim_rc(tau, dt=0.1e-6, n=50):
+    # build model
+    m = MixedSignalModel('model', dt=dt)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+
+    # run simulation
+    results = Simulator(m).run({'x': 1.0}, n=n)
+
+    # compare to the exact step response (note that the output lags by one cycle)
+    expct = [1-exp(-k*dt/tau) for k in range(n)]
+    assert np.allclose(results['y'], expct)
+
+@pytest.mark.parametrize('width', [3, 5, 8])
+def test_sim_counter_and_lfsr(width, n=300):
+    # build model
+    m = MixedSignalModel('model')
+    m.add_counter('count', width=width, loop=True)
+    state = m.lfsr_signal(width, init=1)
+
+    # run simulation
+    results = Simulator(m).run(outputs=['count', state.name], n=n)
+
+    # check counter
+    assert list(results['count']) == [k % (1<<width) for k in range(n)]
+
+    # check LFSR against the reference implementation
+    lfsr = LFSR(width)
+    expct = [1]
+    for _ in range(n-1):
+        expct.append(lfsr.next_state(expct[-1]))
+    assert list(results[state.name]) == expct
+
+def test_sim_sync_rom(n=20):
+    # build model
+    m = MixedSignalModel('model')
+    addr = m.add_digital_input('addr', width=4)
+    y = m.add_analog_output('y')
+    vals = np.linspace(-1.0, 1.0, 16)
+    table = m.make_real_table(vals, dir=BUILD_DIR)
+    m.set_from_sync_rom(y, table, addr)
+
+    # run simulation
+    addr_vals = np.random.randint(0, 16, n)
+    results = Simulator(m).run({'addr': addr_vals})
+
+    # ROM output is delayed by one cycle
+    assert results['y'][0] == 0
+    assert np.allclose(results['y'][1:], vals[addr_vals[:-1]], atol=1e-3)
+
+def test_sim_array_and_params(n=10):
+    # build model
+    m = MixedSignalModel('model')
+    sel = m.add_digital_input('sel', width=2)
+    x = m.add_analog_input('x')
+    gain = m.add_real_param('gain', default=2.0)
+    y = m.add_analog_output('y')
+    z = m.add_digital_output('z', width=8, signed=True)
+    m.set_this_cycle(y, gain*array([0.0, 1.0, x], sel))
+    m.set_this_cycle(z, to_sint(x, width=8))
+
+    # run simulation with default and overridden parameter values
+    sel_vals = np.arange(n) % 4
+    x_vals = np.linspace(-5.5, 5.5, n)
+    for gain_val, params in [(2.0, None), (-3.0, {'gain': -3.0})]:
+        results = Simulator(m, params=params).run({'sel': sel_vals, 'x': x_vals})
+        expct = gain_val*np.array([[0.0, 1.0, xv, 0.0][sv] for sv, xv in zip(sel_vals, x_vals)])
+        assert np.allclose(results['y'], expct)
+        assert list(results['z']) == list(np.floor(x_vals).astype(int))
+
+def test_sim_comb_loop():
+    m = MixedSignalModel('model')
+    x = m.add_digital_signal('x')
+    y = m.add_digital_signal('y')
+    m.set_this_cycle(x, ~y)
+    m.set_this_cycle(y, ~x)
+    with pytest.raises(Exception, match='Combinational loop'):
+        Simulator(m)
+
+def test_sim_lanes(lanes=4, n=25):
+    # build model
+    m = MixedSignalModel('model')
+    x = m.add_analog_input('x')
+    gain = m.add_real_param('gain', default=1.0)
+    offset = m.add_digital_param('offset', width=8, default=0)
+    y = m.add_analog_output('y')
+    z = m.add_digital_state('z', width=8, init=0)
+    m.set_this_cycle(y, gain*x)
+    m.set_next_cycle(z, z + offset)
+
+    # per-lane values
+    gains = np.linspace(-1.0, 1.0, lanes)
+    offsets = np.arange(lanes) + 1
+    inits = 10*np.arange(lanes)
+    x_vals = np.random.uniform(-1.0, 1.0, (n, lanes))
+
+    # simulate all lanes at once
+    sim = Simulator(m, params={'gain': gains, 'offset': offsets}, lanes=lanes, inits={'z': inits})
+    results = sim.run({'x': x_vals}, outputs=['y', 'z'])
+    assert results['y'].shape == (n, lanes)
+    assert results['z'].shape == (n, lanes)
+
+    # compare to simulating each lane separately
+    for k in range(lanes):
+        sim = Simulator(m, params={'gain': gains[k], 'offset': offsets[k]}, inits={'z': inits[k]})
+        expct = sim.run({'x': x_vals[:, k]}, outputs=['y', 'z'])
+        assert np.allclose(results['y'][:, k], expct['y'])
+        assert list(results['z'][:, k]) == list(expct['z'])
+
+@pytest.mark.parametrize('real_type', [RealType.FloatReal, RealType.FixedPoint])
+@pytest.mark.parametrize('lanes', [None, 3])
+def test_sim_run_vs_step(real_type, lanes, n=200):
+    # build model with feed-forward signals (which run() computes for all cycles at once) as well as signals that
+    # depend on the state
+    m = MixedSignalModel('model', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    sel = m.add_digital_input('sel', width=2)
+    gain = m.add_real_param('gain', default=0.7)
+    m.add_analog_output('y')
+    m.add_analog_output('w')
+    m.add_digital_output('z', width=8, signed=True)
+    u = m.set_this_cycle('u', gain*array([0.5*x, x, -x], sel) + 0.25, range_=3.0)
+    m.add_eqn_sys([Deriv(m.y) == (u-m.y)/1e-6])
+    s = m.add_analog_state('s', range_=4.0)
+    m.set_next_cycle(s, 0.5*s + m.y - 0.1*x, ce=(sel != 0))
+    m.set_this_cycle(m.w, s*m.y + u)
+    m.set_this_cycle(m.z, to_sint(8*x, width=8))
+
+    # run() gives the same results as simulating one cycle at a time with step()
+    inputs = {'x': np.random.uniform(-1, 1, n), 'sel': np.random.randint(0, 4, n)}
+    args = dict(lanes=lanes, real_type=real_type, ranges={'x': 1.0, 'y': 4.0, 'w': 20.0})
+    results = Simulator(m, **args).run(inputs, outputs=['y', 'w', 'z', 'u'])
+    sim = Simulator(m, **args)
+    for k in range(n):
+        env = sim.step({name: value[k] for name, value in inputs.items()})
+        for name in ['y', 'w', 'z', 'u']:
+            expct = np.broadcast_to(env[name], sim.shape)
+            if name != 'z':
+                expct = sim.evaluator.decode_real(expct, m.signals[name])
+            assert np.array_equal(results[name][k], expct)
+
+def test_sim_lcg(n=50):
+    # build model
+    m = MixedSignalModel('model')
+    m.random_uint('out', gen_type='lcg')
+
+    # run simulation
+    seeds = [0, 1, 12345, (1<<32)-1]
+    results = Simulator(m, lanes=len(seeds), seeds={'out': seeds}).run(outputs=['out'], n=n)
+
+    # compare to the LCG equation
+    for k, seed in enumerate(seeds):
+        expct = [seed]
+        for _ in range(n-1):
+            expct.append((69069*expct[-1] + 1) & 0xffffffff)
+        assert list(results['out'][:, k]) == expct
+
+def test_sim_mt19937(n=21000, m_out=700):
+    # build model.  clock enable is held low in the first cycle, so that the seed is loaded
+    # before the generator starts running.
+    m = MixedSignalModel('model')
+    cke = m.add_digital_input('cke')
+    m.add_digital_output('out', width=32)
+    m.set_this_cycle(m.out, mt19937(cke=cke, seed=m.add_digital_param('seed', width=32)))
+
+    # run simulation
+    seeds = [1, 5489, 987654321]
+    cke_vals = np.ones(n, dtype=np.int64)
+    cke_vals[0] = 0
+    sim = Simulator(m, lanes=len(seeds), params={'seed': seeds})
+    results = sim.run({'cke': cke_vals}, outputs=['out'])
+
+    # compare to a reference implementation once the generator has started
+    for k, seed in enumerate(seeds):
+        data = results['out'][:, k]
+        start = np.argmax(data != 0)
+        assert 0 < start < n-m_out
+        expct = np.random.RandomState(seed).randint(0, 1<<32, size=m_out, dtype=np.uint32)
+        assert list(data[start:start+m_out]) == list(expct)
+
+@pytest.mark.parametrize('tau', [1e-6, 2.5e-6])
+def test_sim_fixed_rc(tau, dt=0.1e-6, n=50):
+    # build model
+    m = MixedSignalModel('model', dt=dt)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+
+    # run simulation
+    sim = Simulator(m, real_type=RealType.FixedPoint, ranges={'x': 1.5, 'y': 1.5})
+    results = sim.run({'x': 1.0}, n=n)
+
+    # output is quantized to the format of the output (MAKE_REAL with a range of 1.5 has an exponent of -23)
+    assert np.all(np.ldexp(results['y'], 23) == np.round(np.ldexp(results['y'], 23)))
+
+    # compare to the exact step response, allowing for quantization error.  most of the error comes from the
+    # coefficients of the update equation, which are represented with only 18 bits.
+    expct = [1-exp(-k*dt/tau) for k in range(n)]
+    assert np.allclose(results['y'], expct, atol=1e-4)
+
+def test_sim_fixed_arith():
+    # build model
+    m = MixedSignalModel('model')
+    a = m.add_analog_input('a')
+    b = m.add_analog_input('b')
+    y = m.add_analog_output('y')
+    m.set_this_cycle(y, a + 0.1*b)
+
+    # run simulation
+    sim = Simulator(m, real_type=RealType.FixedPoint, ranges={'a': 1.0, 'b': 2.0, 'y': 2.0})
+    results = sim.run({'a': [0.25], 'b': [-1.5]})
+
+    # the constant 0.1 is represented with 18 bits and an exponent of -20, so the product is
+    # round(0.1*(2**20))*(-1.5)*(2**-20), which is then truncated to an exponent of -23 when it is added to "a".
+    # the output has an exponent of -22, so one more bit is truncated.
+    assert results['y'][0] == ((2097152 + (-10066368 >> 3)) >> 1)*(2**-22)
+
+def test_sim_fixed_overflow(n=10):
+    # build model
+    m = MixedSignalModel('model')
+    x = m.add_analog_state('x', range_=1.0)
+    m.add_analog_output('y')
+    m.set_next_cycle(x, x + 0.3)
+    m.set_this_cycle(m.y, x)
+
+    # run simulation.  the state can only represent values in the range [-2, 2), since its
+    # width is 25 and its exponent is -23, so it should wrap around.
+    sim = Simulator(m, real_type=RealType.FixedPoint, ranges={'y': 4.0})
+    results = sim.run(n=n)
+
+    # compute expected results.  the constant 0.3 has an exponent of -25, so two bits are truncated when it is
+    # added to the state.  similarly, two more bits are truncated when the state is assigned to the output.
+    step = round(0.3*(2**25)) >> 2
+    expct = [(((((k*step) + (1<<24)) % (1<<25)) - (1<<24)) >> 2)*(2**-21) for k in range(n)]
+    assert list(results['y']) == expct
+    assert min(results['y']) < 0
+
+def test_sim_stream(n=1000, chunk_size=64):
+    # build model with several kinds of state: a history chain, a sync ROM, a RAM, a random number generator,
+    # and an analog state variable
+    m = MixedSignalModel('model', dt=0.1e-6)
+    x = m.add_analog_input('x')
+    addr = m.add_digital_input('addr', width=3)
+    we = m.add_digital_input('we')
+    din = m.add_digital_input('din', width=8, signed=True)
+    m.add_analog_output('y')
+    m.add_analog_output('rom')
+    m.add_analog_output('ram')
+    m.add_digital_output('rand', width=32)
+    m.add_digital_output('hist', width=3)
+    m.add_eqn_sys([Deriv(m.y) == (x-m.y)/1e-6])
+    table = m.make_real_table(np.linspace(-1.0, 1.0, 8), dir=BUILD_DIR)
+    m.set_from_sync_rom(m.rom, table, addr)
+    m.set_from_sync_ram(m.ram, RealFormat(range_=4, width=8, exponent=-5), addr, we=we, din=din)
+    m.set_this_cycle(m.rand, lcg_op(seed=123))
+    hist = m.make_history(addr, 5)
+    m.set_this_cycle(m.hist, hist[-1])
+
+    # compare a chunked simulation to a simulation of the whole waveform
+    inputs = {'x': np.random.uniform(-1, 1, n), 'addr': np.random.randint(0, 8, n), 'we': np.random.randint(0, 2, n),
+              'din': np.random.randint(-128, 128, n)}
+    expct = Simulator(m).run(inputs)
+    chunks = list(Simulator(m).stream(split_chunks(inputs, chunk_size)))
+    assert len(chunks) == (n+chunk_size-1)//chunk_size
+    for name, value in expct.items():
+        assert np.array_equal(np.concatenate([chunk[name] for chunk in chunks]), value)
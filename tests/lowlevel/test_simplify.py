@@ -1,5 +1,6 @@
 from msdsl import AnalogSignal, distribute_mult
-from msdsl.expr.simplify import extract_coeffs
+from msdsl.expr.expr import wrap_constant
+from msdsl.expr.simplify import extract_coeffs, linear_coeffs
 
 
 def test_simplify():
@@ -42,3 +43,30 @@ def test_simplify():
         'c': 46,
         'd': 34.5
     }
+
+def test_linear_coeffs():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+    c = AnalogSignal('c')
+    d = AnalogSignal('d')
+
+    # same expression as above, analyzed without distributing the multiplication first
+    e = a-(b-12*(c-d))+b+34*c+46.5*d
+    coeffs, others = linear_coeffs([(1, e)])
+    assert len(others) == 0
+    assert coeffs == {'a': 1, 'b': 0, 'c': 46, 'd': 34.5}
+
+    # both sides of an equation
+    coeffs, others = linear_coeffs([(+1, 2*(a+b)), (-1, 3*(b-0.5*c))])
+    assert len(others) == 0
+    assert coeffs == {'a': 2, 'b': -1, 'c': 1.5}
+
+    # non-linear terms are returned separately
+    coeffs, others = linear_coeffs([(+1, a*b + 2*c)])
+    assert coeffs == {'c': 2}
+    assert len(others) == 1 and others[0][0] == 1
+
+    # zero terms are ignored
+    coeffs, others = linear_coeffs([(+1, a), (-1, wrap_constant(0))])
+    assert len(others) == 0
+    assert coeffs == {'a': 1}
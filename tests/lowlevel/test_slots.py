@@ -0,0 +1,40 @@
+from copy import copy, deepcopy
+from msdsl import AnalogSignal, DigitalSignal
+from msdsl.expr.expr import Sum, Constant, wrap_constant
+from msdsl.expr.format import RealFormat, UIntFormat, intern_format
+from msdsl.expr.analyze import expr_key
+
+def test_slots():
+    # expressions, signals, and formats do not have a per-instance __dict__
+    a = AnalogSignal('a')
+    b = DigitalSignal('b', width=8)
+    expr = 2*a + (b > 3)
+    for obj in [a, b, expr, expr.operands[0], wrap_constant(1.5), expr.format_, b.format_]:
+        assert not hasattr(obj, '__dict__'), obj.__class__.__name__
+
+    # copies still work
+    assert isinstance(copy(expr), Sum)
+    assert deepcopy(b[7:4]).msb == 7
+
+    # the attributes of operators are included in their keys
+    assert expr_key(b[7:4]) != expr_key(b[6:3])
+
+def test_interned_formats():
+    # formats with the same numeric settings are shared
+    assert (DigitalSignal('a') > 1).format_ is (DigitalSignal('b') < 2).format_
+    assert UIntFormat.from_values([0, 5]) is UIntFormat.from_values([5, 1, 0])
+    assert RealFormat.from_value(2.0) is RealFormat.from_value(-2.0)
+    assert RealFormat.from_value(1) is not RealFormat.from_value(1.0)
+
+    # symbolic ranges are not interned
+    fmt = RealFormat(range_=AnalogSignal('a').format_.range_)
+    assert intern_format(fmt) is fmt
+
+def test_interned_constants():
+    # small integer-valued constants are shared, while keeping their types separate
+    assert wrap_constant(1) is wrap_constant(1)
+    assert wrap_constant(-1.0) is wrap_constant(-1.0)
+    assert wrap_constant(1) is not wrap_constant(1.0)
+    assert wrap_constant(0.0) is not wrap_constant(-0.0)
+    assert wrap_constant(0.5) is not wrap_constant(0.5)
+    assert isinstance(wrap_constant(1e9), Constant)
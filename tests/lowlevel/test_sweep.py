@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+from msdsl import MixedSignalModel, Deriv, sweep_models
+
+BUILD_DIR = Path(__file__).resolve().parent / 'build' / 'sweep'
+
+def rc_model(module_name, build_dir, tau, dt=0.1e-6):
+    m = MixedSignalModel(module_name, dt=dt, build_dir=build_dir)
+    x = m.add_analog_input('x')
+    y = m.add_analog_output('y')
+    m.add_eqn_sys([Deriv(y) == (x-y)/tau])
+    return m
+
+def test_sweep(taus=(1e-6, 2e-6, 5e-6)):
+    variants = [dict(tau=tau) for tau in taus] + [dict(tau=1e-6, bad_param=0)]
+    manifest = sweep_models(rc_model, variants, build_dir=BUILD_DIR, max_workers=2)
+
+    # each variant is written to its own directory
+    results = manifest['variants']
+    assert [result['name'] for result in results] == [f'variant_{k}' for k in range(len(variants))]
+    for result in results[:-1]:
+        assert result['error'] is None
+        assert Path(result['build_dir']) == BUILD_DIR / result['name']
+        filename = Path(result['files'][0])
+        assert filename.parent == BUILD_DIR / result['name']
+        assert f'module {result["name"]}' in filename.read_text()
+        assert result['build_time'] >= 0 and result['compile_time'] >= 0
+
+    # failures are recorded in the manifest
+    assert 'bad_param' in results[-1]['error']
+
+    # the manifest is written to the top-level build directory
+    with open(BUILD_DIR / 'manifest.json', 'r') as f:
+        assert json.load(f)['variants'][0]['files'] == results[0]['files']
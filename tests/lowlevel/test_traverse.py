@@ -0,0 +1,63 @@
+import sys
+from msdsl import MixedSignalModel, VerilogGenerator, AnalogSignal, DigitalSignal, distribute_mult
+from msdsl.expr.expr import Sum
+from msdsl.expr.analyze import walk_expr
+from msdsl.generator.tree_op import tree_op
+
+# deeper than the default recursion limit
+DEPTH = 3*sys.getrecursionlimit()
+
+def recursive_tree_op(operands, operator):
+    # reference implementation
+    if len(operands) == 1:
+        return operands[0]
+    else:
+        a = recursive_tree_op(operands[:len(operands) // 2], operator=operator)
+        b = recursive_tree_op(operands[len(operands) // 2:], operator=operator)
+        return operator(a, b)
+
+def test_tree_op():
+    for n in range(1, 20):
+        calls, expct_calls = [], []
+        def op(a, b, calls):
+            calls.append((a, b))
+            return f'({a}+{b})'
+        result = tree_op(list(range(n)), operator=lambda a, b: op(a, b, calls))
+        expct = recursive_tree_op(list(range(n)), operator=lambda a, b: op(a, b, expct_calls))
+        assert result == expct
+        assert calls == expct_calls
+
+def test_deep_compile():
+    # build model with a deeply nested expression
+    m = MixedSignalModel('model')
+    a = m.add_digital_input('a', width=8)
+    b = m.add_digital_input('b', width=8)
+    m.add_digital_output('z', width=8)
+    expr = a
+    for _ in range(DEPTH):
+        expr = (expr ^ b) & a
+    m.set_this_cycle(m.z, expr)
+
+    # each operation is compiled once
+    gen = VerilogGenerator()
+    m.compile(gen)
+    assert gen.text.count('&') == gen.text.count('^') == DEPTH
+
+def test_deep_walk():
+    a = DigitalSignal('a', width=8)
+    b = DigitalSignal('b', width=8)
+    expr = a
+    for _ in range(DEPTH):
+        expr = (expr ^ b) & a
+    assert len(walk_expr(expr, lambda e: isinstance(e, DigitalSignal))) == 2*DEPTH+1
+
+def test_deep_distribute_mult():
+    a = AnalogSignal('a')
+    b = AnalogSignal('b')
+    expr = a
+    for _ in range(DEPTH):
+        expr = (expr + b)*a
+
+    # none of the products are by constants, so the expression is not changed
+    assert distribute_mult(expr) is expr
+    assert isinstance(distribute_mult(0.5*(expr + b)), Sum)